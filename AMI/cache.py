@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Process-wide cache of metadata tables
+
+Tables parsed from metadata files (see AMI.turns.TABLES) are shared by all
+protocol instances of the process, and evicted in least recently used order
+once their total size exceeds `CACHE.maxsize` bytes.
+
+>>> from AMI.cache import CACHE, warmup
+>>> warmup(subsets=['train', 'development'])  # load tables in background
+>>> CACHE.cache_info()
+CacheInfo(hits=0, misses=6, evictions=0, maxsize=536870912, currsize=...)
+"""
+
+import os
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from collections import namedtuple
+
+from .util import DATA_DIR
+from .turns import TABLES
+
+
+CacheInfo = namedtuple('CacheInfo',
+                       ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class TableCache:
+    """Thread-safe LRU cache of metadata tables
+
+    Tables are keyed by path, modification time and size of the file they
+    were read from. Concurrent requests for a table being loaded wait for it
+    instead of reading the file again.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum total size of cached tables, in bytes (see `nbytes` of
+        AMI.turns.Turns and AMI.turns.Trials). Defaults to 512MB. The most
+        recently used table is always kept, even if larger than that.
+    """
+
+    def __init__(self, maxsize=512 * 2 ** 20):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Empty cache and reset statistics"""
+        with self._lock:
+            self._tables = OrderedDict()
+            self._loading = {}
+            self.currsize = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.evictions,
+                         self.maxsize, self.currsize)
+
+    def __len__(self):
+        return len(self._tables)
+
+    def get(self, path, read):
+        """Get table read from `path` with `read(path)`"""
+
+        path = Path(path).resolve()
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+        while True:
+            with self._lock:
+                table = self._tables.get(key)
+                if table is not None:
+                    self._tables.move_to_end(key)
+                    self.hits += 1
+                    return table
+                loading = self._loading.get(key)
+                if loading is None:
+                    self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # another thread is reading this table: wait and check again
+            loading.wait()
+
+        try:
+            table = read(path)
+            with self._lock:
+                self._tables[key] = table
+                self.currsize += table.nbytes
+                self._evict()
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+        return table
+
+    def _evict(self):
+        while self.currsize > self.maxsize and len(self._tables) > 1:
+            _, table = self._tables.popitem(last=False)
+            self.currsize -= table.nbytes
+            self.evictions += 1
+
+
+CACHE = TableCache()
+
+
+def _read_in(executor, read):
+    """Wrap `read` so that files are parsed by `executor`"""
+    def read_in(path):
+        return executor.submit(read, path).result()
+    return read_in
+
+
+def warmup(subsets=('train', 'development', 'test'), kinds=TABLES,
+           data_dir=None, background=True, workers=None):
+    """Load metadata tables into the process-wide cache concurrently
+
+    Parsing text is CPU-bound: tables are parsed in worker processes (so
+    that they do not compete with the main thread for the GIL), and sent
+    back to the process-wide cache.
+
+    Parameters
+    ----------
+    subsets : iterable, optional
+        Among 'train', 'development' and 'test'. Defaults to all of them.
+    kinds : iterable, optional
+        Tables to load, among 'annotated', 'annotation', 'enrolments' and
+        'trials'. Defaults to all of them. Missing files are skipped.
+    data_dir : Path, optional
+        Metadata directory. Defaults to bundled metadata.
+    background : bool, optional
+        Return immediately instead of waiting for tables to be loaded.
+    workers : int, optional
+        Number of worker processes. Defaults to one per table, up to the
+        number of CPUs. Set to 0 to parse tables in threads instead.
+
+    Returns
+    -------
+    futures : list of concurrent.futures.Future
+        One per loaded table.
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures import ProcessPoolExecutor
+    from .protocols import _SUBSETS
+
+    data_dir = Path(DATA_DIR if data_dir is None else data_dir)
+
+    tasks = []
+    for subset in subsets:
+        if subset not in _SUBSETS:
+            msg = (f'Unknown subset "{subset}" (use one of '
+                   f'{", ".join(_SUBSETS)}).')
+            raise ValueError(msg)
+        for kind in kinds:
+            source, read = TABLES[kind]
+            path = data_dir / source.format(subset=_SUBSETS[subset])
+            if path.exists():
+                tasks.append((path, read))
+
+    if workers is None:
+        workers = min(len(tasks), os.cpu_count() or 1)
+    processes = ProcessPoolExecutor(max_workers=workers) if workers else None
+
+    # threads only wait for worker processes (or parse when workers is 0),
+    # so that concurrent CACHE.get calls wait for tables being loaded.
+    executor = ThreadPoolExecutor(max_workers=max(1, len(tasks)))
+    futures = [executor.submit(CACHE.get, path,
+                               read if processes is None else
+                               _read_in(processes, read))
+               for path, read in tasks]
+    executor.shutdown(wait=not background)
+
+    if processes is not None:
+        if background:
+            # worker processes exit once all tables are loaded
+            threading.Thread(target=_shutdown, args=(processes, futures),
+                             daemon=True).start()
+        else:
+            processes.shutdown()
+
+    return futures
+
+
+def _shutdown(executor, futures):
+    from concurrent.futures import wait
+    wait(futures)
+    executor.shutdown()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Resumable protocol iteration
+
+Resumable iterators yield the same (preprocessed) items as protocol
+iterators, and can save their position as a small JSON-serializable
+checkpoint at any time. Resuming from a checkpoint seeks directly to the
+next item (items are built by index, see `_iter_items` of AMI protocols)
+instead of replaying the whole stream.
+
+>>> from AMI.checkpoint import Resumable
+>>> trials = Resumable(protocol, subset='test', trials=True)
+>>> for current_trial in trials:
+...     process(current_trial)
+...     save(trials.checkpoint())
+>>> # ... after preemption
+>>> trials = Resumable.resume(protocol, load())
+"""
+
+from .protocols import _SUBSETS
+from .protocols import SpeakerSpotting
+
+# protocol attributes that change the content of items
+PARAMETERS = {'diarization': True,
+              'columnar': False,
+              'frames': None,
+              'packed_frames': False,
+              'regions': False}
+
+
+def get_parameters(protocol):
+    """Get (JSON-serializable) protocol parameters"""
+    return {name: getattr(protocol, name, default)
+            for name, default in PARAMETERS.items()}
+
+
+class Resumable:
+    """Resumable iterator over protocol items
+
+    Parameters
+    ----------
+    protocol : AMI protocol
+    subset : {'train', 'development', 'test'}, optional
+        Defaults to 'train'.
+    trials : bool, optional
+        Iterate over trials of speaker spotting protocols instead of
+        sessions.
+    index : int, optional
+        Index of the first item. Defaults to 0.
+    """
+
+    def __init__(self, protocol, subset='train', trials=False, index=0):
+
+        if trials and not isinstance(protocol, SpeakerSpotting):
+            raise ValueError('Only speaker spotting protocols have trials.')
+
+        self.protocol = protocol
+        self.subset = subset
+        self.trials = trials
+        self.index = index
+        self._length = protocol._num_items(subset, trials=trials)
+        self._items = None
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._items is None:
+            indices = range(self.index, self._length)
+            self._items = self.protocol._iter_items(self.subset, indices,
+                                                    trials=self.trials)
+        current_item = next(self._items)
+        self.index += 1
+        return self.protocol.preprocess(current_item)
+
+    def _key(self):
+        from .snapshot import get_key
+        kind = 'trials' if self.trials else 'files'
+        return get_key(self.protocol._data_dir, _SUBSETS[self.subset],
+                       kind)[:16]
+
+    def checkpoint(self):
+        """Get current position
+
+        Returns
+        -------
+        checkpoint : dict
+            JSON-serializable position: protocol, subset, kind of items,
+            index of the next item, protocol parameters, and a key of the
+            metadata files.
+        """
+        return {'protocol': type(self.protocol).__name__,
+                'subset': self.subset,
+                'trials': self.trials,
+                'index': self.index,
+                'parameters': get_parameters(self.protocol),
+                'key': self._key()}
+
+    @classmethod
+    def resume(cls, protocol, checkpoint):
+        """Resume iteration from checkpoint
+
+        Raises
+        ------
+        ValueError
+            When `protocol` (its class, parameters, or metadata files)
+            differs from the one used to get `checkpoint`, since it would
+            not yield the same items.
+        """
+
+        name = type(protocol).__name__
+        if name != checkpoint['protocol']:
+            raise ValueError(
+                f'Checkpoint was saved for a "{checkpoint["protocol"]}" '
+                f'protocol (not "{name}").')
+
+        parameters = get_parameters(protocol)
+        for key, value in checkpoint['parameters'].items():
+            if parameters.get(key) != value:
+                raise ValueError(
+                    f'Checkpoint was saved with "{key}" set to {value!r} '
+                    f'(not {parameters.get(key)!r}).')
+
+        iterator = cls(protocol, subset=checkpoint['subset'],
+                       trials=checkpoint['trials'],
+                       index=checkpoint['index'])
+
+        if iterator._key() != checkpoint['key']:
+            raise ValueError('Checkpoint was saved with different metadata.')
+
+        return iterator
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Columnar (NumPy) counterparts of pyannote.core Timeline and Annotation
+
+When the `columnar` attribute of an AMI protocol is set to True, 'annotated',
+'annotation', and 'reference' keys are ColumnarTimeline and ColumnarAnnotation
+instances instead of pyannote.core objects. They can be converted on demand
+with `to_timeline`, `to_annotation`, or `to_pyannote` for a whole item.
+"""
+
+import numpy as np
+
+
+def _intersect(start, end, segment):
+    """Clip (start, end) arrays to segment, dropping empty intersections
+
+    This mimics Timeline.crop and Annotation.crop "intersection" mode.
+    """
+    from pyannote.core.segment import SEGMENT_PRECISION
+    start = np.maximum(start, segment.start)
+    end = np.minimum(end, segment.end)
+    keep = (end - start) > SEGMENT_PRECISION
+    return keep, start[keep], end[keep]
+
+
+def get_codes(labels):
+    """Map labels to their code (i.e. their index in `labels`)"""
+    return {label: code for code, label in enumerate(labels)}
+
+
+class ColumnarTimeline:
+    """Columnar timeline
+
+    Parameters
+    ----------
+    uri : str
+    start, end : (n, ) float64 np.ndarray
+    """
+
+    __slots__ = ('uri', 'start', 'end')
+
+    def __init__(self, uri, start, end):
+        self.uri = uri
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return len(self.start)
+
+    def __bool__(self):
+        return len(self.start) > 0
+
+    def __iter__(self):
+        from pyannote.core import Segment
+        for start, end in zip(self.start.tolist(), self.end.tolist()):
+            yield Segment(start=start, end=end)
+
+    def crop(self, segment):
+        """Crop to pyannote.core.Segment (in "intersection" mode)"""
+        _, start, end = _intersect(self.start, self.end, segment)
+        return ColumnarTimeline(self.uri, start, end)
+
+    def duration(self):
+        return float(np.sum(self.end - self.start))
+
+    def to_timeline(self):
+        from pyannote.core import Timeline
+        return Timeline(segments=list(self), uri=self.uri)
+
+
+class ColumnarAnnotation:
+    """Columnar annotation
+
+    Parameters
+    ----------
+    uri : str
+    start, end : (n, ) float64 np.ndarray
+    label : (n, ) int32 np.ndarray
+        Codes into `labels`.
+    labels : list
+        Label vocabulary, shared by all items of a protocol subset.
+    codes : dict, optional
+        Maps labels to their code. Built from `labels` on first use when not
+        provided: pass the same dictionary to all items sharing `labels`.
+    """
+
+    __slots__ = ('uri', 'start', 'end', 'label', 'labels', 'codes')
+
+    def __init__(self, uri, start, end, label, labels, codes=None):
+        self.uri = uri
+        self.start = start
+        self.end = end
+        self.label = label
+        self.labels = labels
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.start)
+
+    def __bool__(self):
+        return len(self.start) > 0
+
+    def crop(self, segment):
+        """Crop to pyannote.core.Segment (in "intersection" mode)"""
+        keep, start, end = _intersect(self.start, self.end, segment)
+        return ColumnarAnnotation(self.uri, start, end, self.label[keep],
+                                  self.labels, codes=self.codes)
+
+    def get_timeline(self):
+        return ColumnarTimeline(self.uri, self.start, self.end)
+
+    def label_timeline(self, label):
+        """Get timeline of `label` turns (empty if `label` is unknown)"""
+        if self.codes is None:
+            self.codes = get_codes(self.labels)
+        code = self.codes.get(label, None)
+        if code is None:
+            keep = np.zeros(len(self.start), dtype=bool)
+        else:
+            keep = self.label == code
+        return ColumnarTimeline(self.uri, self.start[keep], self.end[keep])
+
+    def to_annotation(self):
+        from pyannote.core import Segment, Annotation
+        annotation = Annotation(uri=self.uri)
+        labels = self.labels
+        for t, (start, end, code) in enumerate(zip(self.start.tolist(),
+                                                    self.end.tolist(),
+                                                    self.label.tolist())):
+            annotation[Segment(start=start, end=end), t] = labels[code]
+        return annotation
+
+
+def to_pyannote(current_item):
+    """Convert columnar values of a protocol item to pyannote.core objects
+
+    Returns a new dictionary, other values are left untouched.
+    """
+    converted = dict(current_item)
+    for key, value in current_item.items():
+        if isinstance(value, ColumnarTimeline):
+            converted[key] = value.to_timeline()
+        elif isinstance(value, ColumnarAnnotation):
+            converted[key] = value.to_annotation()
+    return converted
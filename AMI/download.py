@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Download AMI Mix-Headset audio files
+
+Usage: python -m AMI.download [options] [<root>]
+
+Files are stored in <root>/amicorpus/<meeting>/audio/<uri>.wav (<root>
+defaults to current directory). Downloads run concurrently over persistent
+connections, interrupted downloads are resumed with range requests, and
+malformed wav headers are fixed on the fly (see AMI.wav).
+"""
+
+import os
+import sys
+import argparse
+import threading
+import http.client
+from pathlib import Path
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from .util import get_uris
+from .wav import HEADER_SIZE
+from .wav import CANONICAL_HEADER_SIZE
+from .wav import TAIL_SIZE
+from .wav import parse_header
+from .wav import get_data_size
+from .wav import canonical_header
+
+
+AMI_URL = 'http://groups.inf.ed.ac.uk/ami/AMICorpusMirror/'
+
+CHUNK_SIZE = 1 << 20
+
+
+class Downloader:
+    """Download (and fix) AMI Mix-Headset audio files
+
+    Parameters
+    ----------
+    root : str or Path
+        Files are downloaded to root/amicorpus/<meeting>/audio/<uri>.wav
+    url : str, optional
+        Base URL of AMI corpus mirror. Defaults to the official one.
+    workers : int, optional
+        Number of concurrent downloads. Defaults to 8.
+    """
+
+    def __init__(self, root, url=AMI_URL, workers=8):
+        self.root = Path(root) / 'amicorpus'
+        self.url = urlsplit(url)
+        self.workers = workers
+        # one persistent connection per worker thread
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if self.url.scheme == 'https':
+                Connection = http.client.HTTPSConnection
+            else:
+                Connection = http.client.HTTPConnection
+            connection = Connection(self.url.netloc, timeout=60)
+            self._local.connection = connection
+        return connection
+
+    def _request(self, path, start, end=None):
+        """Send range request and return response"""
+
+        byte_range = f'bytes={start}-' if end is None else \
+                     f'bytes={start}-{end - 1}'
+        headers = {'Range': byte_range, 'Connection': 'keep-alive'}
+
+        # retry once as servers may close idle keep-alive connections
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+                continue
+            break
+
+        if response.status not in (200, 206):
+            response.read()
+            msg = f'GET {path} failed with status {response.status}.'
+            raise IOError(msg)
+
+        # servers ignoring range requests send the whole file
+        if response.status == 200 and start > 0:
+            skip = start
+            while skip > 0:
+                skip -= len(response.read(min(skip, CHUNK_SIZE)))
+
+        return response
+
+    def url_path(self, uri):
+        meeting = uri.split('.')[0]
+        base = self.url.path.rstrip('/')
+        return f'{base}/amicorpus/{meeting}/audio/{uri}.wav'
+
+    def path(self, uri):
+        meeting = uri.split('.')[0]
+        return self.root / meeting / 'audio' / f'{uri}.wav'
+
+    def download(self, uri):
+        """Download one file
+
+        Returns
+        -------
+        downloaded : bool
+            False when file was already there.
+        """
+
+        path = self.path(uri)
+        if path.exists():
+            return False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + '.part')
+        url_path = self.url_path(uri)
+
+        # get remote header and remote file size
+        response = self._request(url_path, 0, HEADER_SIZE)
+        prefix = response.read(HEADER_SIZE)
+        if response.status == 206:
+            content_range = response.getheader('Content-Range')
+            file_size = int(content_range.rsplit('/', 1)[1])
+        else:
+            # range not supported: do not download the whole file twice
+            file_size = int(response.getheader('Content-Length'))
+            self._connection().close()
+            self._local.connection = None
+        header = parse_header(prefix)
+
+        # declared "data" size cannot be trusted: look for trailing chunks
+        tail, tail_offset = b'', None
+        available = file_size - header.data_offset
+        if header.data_size == 0 or header.data_size > available:
+            tail_offset = max(header.data_offset, file_size - TAIL_SIZE)
+            if file_size <= len(prefix):
+                tail = prefix[tail_offset:file_size]
+            else:
+                response = self._request(url_path, tail_offset, file_size)
+                tail = response.read()
+        data_size = get_data_size(header, file_size, tail=tail,
+                                  tail_offset=tail_offset)
+
+        # local file is made of a canonical header followed by audio data.
+        # resuming at local position p means resuming at remote position
+        # p - CANONICAL_HEADER_SIZE + header.data_offset
+        done = 0
+        if partial.exists():
+            done = max(0, partial.stat().st_size - CANONICAL_HEADER_SIZE)
+        done = min(done, data_size)
+
+        with open(partial, 'r+b' if done else 'wb') as fp:
+            fp.write(canonical_header(header, data_size))
+            fp.seek(CANONICAL_HEADER_SIZE + done)
+            fp.truncate()
+
+            if done < data_size:
+                start = header.data_offset + done
+                end = header.data_offset + data_size
+                response = self._request(url_path, start, end)
+                remaining = data_size - done
+                while remaining > 0:
+                    chunk = response.read(min(remaining, CHUNK_SIZE))
+                    if not chunk:
+                        msg = f'Connection closed while downloading {uri}.'
+                        raise IOError(msg)
+                    fp.write(chunk)
+                    remaining -= len(chunk)
+                # drain response so that connection can be reused
+                response.read()
+
+        os.replace(partial, path)
+        return True
+
+    def __call__(self, uris=None):
+        """Download files concurrently
+
+        Parameters
+        ----------
+        uris : iterable, optional
+            Defaults to all files used by the AMI protocols.
+
+        Returns
+        -------
+        failed : dict
+            Maps uri to exception for downloads that failed.
+        """
+
+        if uris is None:
+            uris = get_uris()
+
+        failed = {}
+
+        def task(uri):
+            try:
+                downloaded = self.download(uri)
+            except Exception as e:
+                failed[uri] = e
+                print(f'{uri}: failed ({e})', file=sys.stderr)
+            else:
+                status = 'done' if downloaded else 'skipped'
+                print(f'{uri}: {status}', file=sys.stderr)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for _ in executor.map(task, uris):
+                pass
+
+        return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Download AMI Mix-Headset audio files.')
+    parser.add_argument('root', nargs='?', default='.',
+                        help='download to <root>/amicorpus')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='number of concurrent downloads')
+    parser.add_argument('--url', default=AMI_URL,
+                        help='base URL of AMI corpus mirror')
+    args = parser.parse_args()
+
+    downloader = Downloader(args.root, url=args.url, workers=args.workers)
+    failed = downloader()
+
+    root = Path(args.root).resolve() / 'amicorpus'
+    print('#####################################')
+    print('Now resolve audio paths with AudioFinder:')
+    print('>>> from AMI.finder import AudioFinder')
+    print(f">>> preprocessors = {{'audio': AudioFinder('{root}')}}")
+    print('#####################################')
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Header-only audio duration probe
+
+Usage: python -m AMI.duration [--tolerance=<seconds>] <amicorpus>
+
+Reads only the header of every Mix-Headset file (in parallel) and checks
+that audio duration matches the end of the last annotated region in UEM
+files. Mismatching uris are printed on standard output.
+"""
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from .util import DATA_DIR
+from .util import SUBSETS
+from .util import get_cache_dir
+from .wav import read_data_size
+from .finder import AudioFinder
+
+
+def probe(path):
+    """Get duration (in seconds) of wav file without decoding it"""
+    header, data_size = read_data_size(path)
+    frame_size = header.num_channels * header.sample_width
+    return data_size // frame_size / header.sample_rate
+
+
+def get_uem_durations(data_dir=None):
+    """Get {uri: end of last annotated region} from UEM files"""
+
+    data_dir = Path(DATA_DIR if data_dir is None else data_dir)
+
+    durations = {}
+    for subset in SUBSETS:
+        uem = data_dir / 'speaker_diarization' / f'{subset}.uem'
+        with open(uem, 'r') as fp:
+            for line in fp:
+                raw_uri, _, _, end = line.split()
+                uri = f'{raw_uri}.Mix-Headset'
+                durations[uri] = max(float(end), durations.get(uri, 0.))
+    return durations
+
+
+class AudioDuration:
+    """Cached audio duration preprocessor
+
+    Durations are probed from wav headers and cached on disk (along with
+    file size and modification time) so that loaders can allocate buffers
+    without decoding anything. The first time a duration is needed, every
+    available file referenced by UEM files is probed at once, in parallel.
+
+    Parameters
+    ----------
+    finder : callable
+        Audio path preprocessor (e.g. AMI.finder.AudioFinder)
+    workers : int, optional
+        Number of files probed concurrently. Defaults to 8.
+    data_dir : str or Path, optional
+        Metadata directory whose UEM files list the files probed at once.
+        Defaults to the one of `finder` (i.e. the bundled AMI metadata,
+        unless `finder` was given another `data_dir`).
+
+    Usage
+    -----
+    >>> finder = AudioFinder('/path/to/amicorpus')
+    >>> preprocessors = {'audio': finder, 'duration': AudioDuration(finder)}
+    """
+
+    def __init__(self, finder, workers=8, data_dir=None):
+        self.finder = finder
+        self.workers = workers
+        if data_dir is None:
+            data_dir = getattr(finder, 'data_dir', None)
+        self.data_dir = data_dir
+        self._path = get_cache_dir() / 'durations.json'
+        try:
+            with open(self._path, 'r') as fp:
+                self._cache = json.load(fp)
+        except (OSError, ValueError):
+            self._cache = {}
+        self._durations = {}
+
+    def probe(self, uris):
+        """Probe (and cache) duration of many files at once
+
+        Returns
+        -------
+        durations : dict
+            uri → duration (in seconds) mapping
+        """
+
+        todo = {}
+        for uri in uris:
+            if uri in self._durations:
+                continue
+            path = os.path.abspath(self.finder({'uri': uri}))
+            stat = os.stat(path)
+            cached = self._cache.get(path, None)
+            if cached is not None and \
+               cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+                self._durations[uri] = cached[2]
+            else:
+                todo[uri] = (path, stat)
+
+        if todo:
+            pending = list(todo)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                paths = [todo[uri][0] for uri in pending]
+                for uri, duration in zip(pending, executor.map(probe, paths)):
+                    path, stat = todo[uri]
+                    self._durations[uri] = duration
+                    self._cache[path] = [stat.st_size, stat.st_mtime_ns,
+                                         duration]
+            self._save()
+
+        return {uri: self._durations[uri] for uri in uris}
+
+    def _save(self):
+        tmp = self._path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'w') as fp:
+            json.dump(self._cache, fp)
+        os.replace(tmp, self._path)
+
+    def _available(self, uri):
+        try:
+            return os.path.exists(self.finder({'uri': uri}))
+        except (LookupError, OSError, ValueError):
+            return False
+
+    def __call__(self, current_file):
+        uri = current_file['uri']
+        if uri not in self._durations:
+            # probe all files (and save the cache) once, rather than one
+            # file at a time
+            uris = [other for other in get_uem_durations(self.data_dir)
+                    if other != uri and other not in self._durations
+                    and self._available(other)]
+            self.probe([uri] + uris)
+        return self._durations[uri]
+
+
+def check(finder, tolerance=0.1, workers=8):
+    """Compare audio durations with UEM files
+
+    Parameters
+    ----------
+    finder : AudioFinder
+    tolerance : float, optional
+        Maximum accepted difference (in seconds). Defaults to 0.1.
+    workers : int, optional
+        Number of files probed concurrently. Defaults to 8.
+
+    Returns
+    -------
+    mismatches : dict
+        uri → (audio duration, UEM end) mapping for mismatching files.
+    """
+
+    expected = get_uem_durations()
+    uris = [uri for uri in sorted(expected) if uri in finder.paths]
+    durations = AudioDuration(finder, workers=workers).probe(uris)
+    return {uri: (durations[uri], expected[uri]) for uri in uris
+            if abs(durations[uri] - expected[uri]) > tolerance}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare AMI audio durations with UEM files.')
+    parser.add_argument('root', help='path to "amicorpus" directory')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='maximum accepted difference (in seconds)')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='number of files probed concurrently')
+    args = parser.parse_args()
+
+    finder = AudioFinder(args.root, strict=False)
+    mismatches = check(finder, tolerance=args.tolerance,
+                       workers=args.workers)
+    for uri, (duration, end) in sorted(mismatches.items()):
+        print(f'{uri}: audio is {duration:.3f}s long '
+              f'but UEM ends at {end:.3f}s')
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
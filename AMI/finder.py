@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+import os
+import json
+from pathlib import Path
+
+from .util import get_cache_dir
+from .util import get_uris
+
+
+class AudioFinder:
+    """Resolve path to AMI audio files from a single scan of the corpus
+
+    `pyannote.database.FileFinder` with the usual
+    '/path/to/amicorpus/*/audio/{uri}.wav' template runs one glob per
+    protocol item. AudioFinder lists the corpus directory once, checks that
+    every uri used by the protocols was found, and caches the resulting
+    uri → path mapping on disk so that path resolution is a dict lookup.
+
+    Parameters
+    ----------
+    root : str or Path
+        Path to "amicorpus" directory, as created by the download script.
+    cache : bool, optional
+        Whether to cache the uri → path mapping on disk. Defaults to True.
+    strict : bool, optional
+        Raise FileNotFoundError when some uris are missing from the corpus.
+        Defaults to True. When False, missing uris only fail when resolved.
+    data_dir : str or Path, optional
+        Metadata directory listing the uris used by the protocols (see the
+        `data_dir` protocol attribute). Defaults to the bundled metadata.
+
+    Usage
+    -----
+    >>> from pyannote.database import get_protocol
+    >>> from AMI.finder import AudioFinder
+    >>> preprocessors = {'audio': AudioFinder('/path/to/amicorpus')}
+    >>> protocol = get_protocol('AMI.SpeakerDiarization.MixHeadset',
+    ...                         preprocessors=preprocessors)
+    """
+
+    def __init__(self, root, cache=True, strict=True, data_dir=None):
+        self.root = Path(root).expanduser().resolve()
+        self.cache = cache
+        self.strict = strict
+        self.data_dir = data_dir
+
+        uris = get_uris(data_dir=data_dir)
+
+        paths = self._load() if self.cache else None
+        if paths is None or any(uri not in paths for uri in uris):
+            paths = self._scan()
+            if self.cache:
+                self._save(paths)
+
+        missing = [uri for uri in uris if uri not in paths]
+        if missing and self.strict:
+            msg = (f'{len(missing)} AMI audio file(s) could not be found in '
+                   f'"{self.root}" (e.g. {missing[0]}.wav).')
+            raise FileNotFoundError(msg)
+
+        self.paths = paths
+
+    def _signature(self):
+        # root directory modification time changes whenever a meeting
+        # directory is added or removed, and <meeting>/audio directory
+        # modification time whenever one of its files is added, removed or
+        # renamed
+        signature = {'.': os.stat(self.root).st_mtime_ns}
+        with os.scandir(self.root) as meetings:
+            for meeting in meetings:
+                audio_dir = os.path.join(meeting.path, 'audio')
+                try:
+                    signature[meeting.name] = os.stat(audio_dir).st_mtime_ns
+                except OSError:
+                    continue
+        return signature
+
+    def _scan(self):
+        """Map uri to path with one directory listing per meeting"""
+        paths = {}
+        with os.scandir(self.root) as meetings:
+            for meeting in meetings:
+                if not meeting.is_dir():
+                    continue
+                audio_dir = os.path.join(meeting.path, 'audio')
+                if not os.path.isdir(audio_dir):
+                    continue
+                with os.scandir(audio_dir) as entries:
+                    for entry in entries:
+                        uri, ext = os.path.splitext(entry.name)
+                        if ext == '.wav':
+                            paths[uri] = entry.path
+        return paths
+
+    @property
+    def _cache_path(self):
+        return get_cache_dir() / 'audio_paths.json'
+
+    def _load(self):
+        try:
+            with open(self._cache_path, 'r') as fp:
+                cached = json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+        cached = cached.get(str(self.root), None)
+        if cached is None or cached['signature'] != self._signature():
+            return None
+        return cached['paths']
+
+    def _save(self, paths):
+        try:
+            with open(self._cache_path, 'r') as fp:
+                cached = json.load(fp)
+        except (OSError, ValueError):
+            cached = {}
+
+        cached[str(self.root)] = {'signature': self._signature(),
+                                  'paths': paths}
+
+        # write to temporary file first so that concurrent readers never
+        # see a partially written cache
+        tmp = self._cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'w') as fp:
+            json.dump(cached, fp)
+        os.replace(tmp, self._cache_path)
+
+    def __call__(self, current_file):
+        uri = current_file['uri']
+        try:
+            return self.paths[uri]
+        except KeyError:
+            msg = f'Could not find audio file for "{uri}" in "{self.root}".'
+            raise FileNotFoundError(msg)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Frame-level speaker activity
+
+Set the `frames` attribute of an AMI protocol to a frame step (in seconds)
+to get, for every file (or session), a 'frames' key containing a
+FrameActivity instance: a (num_frames, num_speakers) uint8 matrix where
+frame i covers [i x step, (i + 1) x step) and is active for a speaker when
+one of the speaker turns covers its middle.
+
+Matrices are computed once (vectorized) and cached on disk as .npy files,
+memory-mapped when loaded. Set the `packed_frames` attribute to True to
+store them bit-packed along the speaker axis (eight times smaller).
+"""
+
+import os
+import numpy as np
+
+from .util import get_cache_dir
+
+
+def rasterize(start, end, label, num_labels, step, num_frames):
+    """Convert speech turns to (num_frames, num_labels) uint8 activity
+
+    Parameters
+    ----------
+    start, end : (n, ) float np.ndarray
+    label : (n, ) int np.ndarray
+        Values in [0, num_labels).
+    step : float
+    num_frames : int
+    """
+    # frame i is active when turn covers its middle (i + 0.5) x step
+    first = np.clip(np.ceil(start / step - 0.5), 0, num_frames).astype(int)
+    last = np.clip(np.ceil(end / step - 0.5), 0, num_frames).astype(int)
+
+    # +1 at first active frame, -1 after last active frame, then cumsum
+    # (this also handles overlapping turns of the same speaker)
+    delta = np.zeros((num_frames + 1, num_labels), dtype=np.int32)
+    np.add.at(delta, (first, label), 1)
+    np.add.at(delta, (last, label), -1)
+    return (np.cumsum(delta[:-1], axis=0) > 0).astype(np.uint8)
+
+
+class FrameActivity:
+    """Frame-level speaker activity
+
+    Parameters
+    ----------
+    data : (num_frames, num_labels) uint8 np.ndarray
+        When `packed` is True, data is bit-packed along second axis.
+    labels : list
+        Speaker labels, one per column.
+    step : float
+        Frame step, in seconds.
+    start : float, optional
+        Time of first frame. Defaults to 0.
+    packed : bool, optional
+        Whether data is bit-packed. Defaults to False.
+    """
+
+    __slots__ = ('_data', 'labels', 'step', 'start', 'packed')
+
+    def __init__(self, data, labels, step, start=0., packed=False):
+        self._data = data
+        self.labels = labels
+        self.step = step
+        self.start = start
+        self.packed = packed
+
+    @property
+    def data(self):
+        """(num_frames, num_labels) uint8 activity matrix"""
+        if self.packed:
+            return np.unpackbits(self._data, axis=1,
+                                 count=len(self.labels))
+        return self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def crop(self, segment):
+        """Crop to pyannote.core.Segment (zero-copy)"""
+        first = int(round((segment.start - self.start) / self.step))
+        last = int(round((segment.end - self.start) / self.step))
+        first, last = max(0, first), min(len(self._data), last)
+        return FrameActivity(self._data[first:last], self.labels, self.step,
+                             start=self.start + first * self.step,
+                             packed=self.packed)
+
+    def vad(self):
+        """(num_frames, ) voice activity detection targets"""
+        return np.any(self.data, axis=1).astype(np.uint8)
+
+    def overlap(self):
+        """(num_frames, ) overlapped speech detection targets"""
+        return (np.sum(self.data, axis=1) > 1).astype(np.uint8)
+
+    def count(self):
+        """(num_frames, ) number of active speakers"""
+        return np.sum(self.data, axis=1, dtype=np.uint8)
+
+
+def load_activity(raw_uri, Annotations, indices, duration, step, key,
+                  packed=False):
+    """Load (or compute and cache) frame-level activity of one file
+
+    Parameters
+    ----------
+    raw_uri : str
+        File identifier (without '.Mix-Headset' suffix).
+    Annotations : AMI.turns.Turns
+        Speech turns table.
+    indices : np.ndarray
+        Indices of speech turns of this file.
+    duration : float
+        File duration, used to determine the number of frames.
+    step : float
+        Frame step, in seconds.
+    key : str
+        Cache key. Should change when speech turns change.
+    packed : bool, optional
+        Whether to use bit-packed storage.
+
+    Returns
+    -------
+    activity : FrameActivity
+    """
+
+    codes, label = np.unique(Annotations.label[indices], return_inverse=True)
+    labels = [Annotations.labels[code] for code in codes]
+
+    suffix = 'bits.npy' if packed else 'npy'
+    path = get_cache_dir() / 'frames' / key / f'{step:g}' / \
+        f'{raw_uri}.{suffix}'
+
+    try:
+        data = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        num_frames = int(np.ceil(duration / step))
+        data = rasterize(Annotations.start[indices],
+                         Annotations.end[indices],
+                         label, len(labels), step, num_frames)
+        if packed:
+            data = np.packbits(data, axis=1)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(tmp, 'wb') as fp:
+            np.save(fp, data)
+        os.replace(tmp, path)
+        data = np.load(path, mmap_mode='r')
+
+    return FrameActivity(data, labels, step, packed=packed)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+class _Lazy:
+    """Placeholder for a value computed on first access"""
+
+    __slots__ = ('func', )
+
+    def __init__(self, func):
+        self.func = func
+
+
+class LazyFile(dict):
+    """Protocol item whose values may be computed on first access
+
+    Lazy values are registered with `lazy(key, func)`: `func` is called
+    (without argument) the first time `key` is accessed, and its result is
+    memoized. Lazy keys behave as regular keys otherwise (e.g. `key in
+    current_file` is True and `current_file.keys()` lists them, in insertion
+    order).
+
+    `copy()` keeps values lazy. Converting a LazyFile to a dict (or pickling
+    it) evaluates all its values.
+    """
+
+    def lazy(self, key, func):
+        """Register lazy value"""
+        dict.__setitem__(self, key, _Lazy(func))
+
+    def is_lazy(self, key):
+        """Whether `key` has not been evaluated yet"""
+        return isinstance(dict.get(self, key), _Lazy)
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, _Lazy):
+            value = value.func()
+            dict.__setitem__(self, key, value)
+        return value
+
+    # overriding __iter__ makes dict(), {**...} and dict.update() go
+    # through keys() and __getitem__, i.e. evaluate lazy values
+    def __iter__(self):
+        return dict.__iter__(self)
+
+    def keys(self):
+        return dict.keys(self)
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def pop(self, key, *default):
+        value = dict.pop(self, key, *default)
+        if isinstance(value, _Lazy):
+            value = value.func()
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        if isinstance(value, _Lazy):
+            value = value.func()
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self):
+        return LazyFile(dict.items(self))
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (dict, (dict(self.items()), ))
+
+    def __repr__(self):
+        return '{' + ', '.join(
+            f'{key!r}: <lazy>' if isinstance(value, _Lazy) else
+            f'{key!r}: {value!r}' for key, value in dict.items(self)) + '}'
@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Streaming batch loader
+
+Usage: python -m AMI.loader [options] <amicorpus>
+
+Yields batches of fixed-duration waveform chunks, drawn uniformly over
+annotated regions (see `AMI.samplers.ChunkSampler`), along with aligned
+frame-level speaker activity:
+
+    audio : (batch_size, num_samples) float32 np.ndarray
+    labels : (batch_size, num_frames, num_speakers) uint8 np.ndarray
+
+Audio samples are read straight into a pool of preallocated buffers (only
+the chunk is read, using RIFF/WAVE headers from `AMI.wav`), and frame labels
+of the whole batch are rasterized at once. Batches can be prepared ahead of
+time by a pool of worker threads.
+"""
+
+import sys
+import time
+import itertools
+import queue
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .frames import rasterize
+from .samplers import ChunkSampler
+from .wav import WavError
+from .wav import read_data_size
+
+
+class _Buffers:
+    """Preallocated arrays of one batch"""
+
+    __slots__ = ('audio', 'labels', 'samples')
+
+    def __init__(self, batch_size, num_samples, num_frames, num_speakers):
+        self.audio = np.zeros((batch_size, num_samples), dtype=np.float32)
+        self.labels = np.zeros((batch_size, num_frames, num_speakers),
+                               dtype=np.uint8)
+        # raw 16-bit samples of one chunk (grown for multi-channel files)
+        self.samples = np.empty(num_samples, dtype=np.int16)
+
+
+class BatchLoader:
+    """Batches of (audio chunk, frame labels) arrays
+
+    Parameters
+    ----------
+    protocol : AMI protocol
+        Any AMI protocol with an 'audio' preprocessor (e.g.
+        `AMI.finder.AudioFinder`) returning the path to wav files.
+    subset : {'train', 'development', 'test'}, optional
+        Defaults to 'train'.
+    batch_size : int, optional
+        Defaults to 32.
+    duration : float, optional
+        Chunk duration, in seconds. Defaults to 2.
+    step : float, optional
+        Frame step, in seconds. Defaults to 0.01.
+    num_speakers : int, optional
+        Number of speaker columns. Speakers of a chunk are sorted by label
+        and extra speakers are dropped. Defaults to 4.
+    sample_rate : int, optional
+        Expected sample rate. Defaults to 16000.
+    seed : int, optional
+        Random seed. Batches do not depend on the number of workers.
+    workers : int, optional
+        Number of worker threads preparing batches ahead of time. Defaults
+        to 0 (batches are prepared on demand).
+    prefetch : int, optional
+        Number of batches prepared ahead of time (when `workers` > 0).
+        Defaults to 2.
+    num_batches : int, optional
+        Stop after that many batches. Defaults to iterating forever.
+
+    Usage
+    -----
+    >>> loader = BatchLoader(protocol, batch_size=32, seed=42, workers=4)
+    >>> for audio, labels in loader:
+    ...     pass
+    >>> loader.throughput   # chunks/s
+
+    Yielded arrays are reused: they are only valid until the next batch is
+    requested (copy them to keep them longer).
+    """
+
+    def __init__(self, protocol, subset='train', batch_size=32, duration=2.,
+                 step=0.01, num_speakers=4, sample_rate=16000, seed=None,
+                 workers=0, prefetch=2, num_batches=None):
+
+        if 'audio' not in protocol.preprocessors:
+            msg = 'Protocol has no "audio" preprocessor.'
+            raise ValueError(msg)
+
+        self.protocol = protocol
+        self.sampler = ChunkSampler(protocol, subset=subset,
+                                    duration=duration, seed=seed)
+
+        self.batch_size = batch_size
+        self.duration = duration
+        self.step = step
+        self.num_speakers = num_speakers
+        self.sample_rate = sample_rate
+        self.workers = workers
+        self.prefetch = max(1, prefetch)
+        self.num_batches = num_batches
+
+        self.num_samples = int(round(duration * sample_rate))
+        self.num_frames = int(round(duration / step))
+
+        # speech turns of every file (as codes into `sampler.uris`)
+        groups = self.sampler._groups
+        empty = np.array([], dtype=int)
+        self._rows = [groups.get(raw_uri, empty)
+                      for raw_uri in self.sampler._raw_uris]
+
+        # uri → (path, header, number of frames)
+        self._files = {}
+
+        self.chunks = 0
+        self.elapsed = 0.
+
+    @property
+    def throughput(self):
+        """Number of chunks per second (including consumer time), so far"""
+        return self.chunks / self.elapsed if self.elapsed > 0 else 0.
+
+    def _file(self, uri):
+        try:
+            return self._files[uri]
+        except KeyError:
+            pass
+
+        path = self.protocol.preprocessors['audio']({'uri': uri,
+                                                     'database': 'AMI'})
+        header, data_size = read_data_size(path)
+
+        if header.sample_width != 2:
+            msg = f'"{path}" is not 16-bit PCM.'
+            raise WavError(msg)
+        if header.sample_rate != self.sample_rate:
+            msg = (f'"{path}" sample rate is {header.sample_rate}Hz '
+                   f'(not {self.sample_rate}Hz).')
+            raise WavError(msg)
+
+        frame_size = header.num_channels * header.sample_width
+        num_frames = data_size // frame_size
+        self._files[uri] = (path, header, num_frames)
+        return self._files[uri]
+
+    def _read(self, buffers, b, uri, start):
+        """Read chunk into row `b` of audio buffer (zero-padded)"""
+
+        path, header, num_frames = self._file(uri)
+        num_channels = header.num_channels
+
+        first = int(round(start * self.sample_rate))
+        begin, end = max(0, first), min(first + self.num_samples, num_frames)
+        n = max(0, end - begin)
+
+        out = buffers.audio[b]
+        out[:begin - first] = 0.
+        out[begin - first + n:] = 0.
+        if n == 0:
+            return
+
+        if buffers.samples.size < self.num_samples * num_channels:
+            buffers.samples = np.empty(self.num_samples * num_channels,
+                                       dtype=np.int16)
+        samples = buffers.samples[:n * num_channels]
+
+        with open(path, 'rb', buffering=0) as fp:
+            fp.seek(header.data_offset + begin * 2 * num_channels)
+            fp.readinto(memoryview(samples).cast('B'))
+
+        # wav samples are little-endian
+        if sys.byteorder == 'big':
+            samples.byteswap(inplace=True)
+
+        chunk = out[begin - first:begin - first + n]
+        if num_channels > 1:
+            samples = samples.reshape(n, num_channels).mean(axis=1)
+        np.multiply(samples, 1. / 32768, out=chunk, casting='unsafe')
+
+    def _labels(self, buffers, uri, start):
+        """Rasterize speaker activity of the whole batch at once"""
+
+        Annotations = self.sampler._annotation
+        batch_size, num_speakers = len(uri), self.num_speakers
+
+        rows = [self._rows[u] for u in uri.tolist()]
+        chunk = np.repeat(np.arange(batch_size), [len(r) for r in rows])
+        rows = np.concatenate(rows).astype(int)
+
+        # turn boundaries relative to chunk start
+        turn_start = Annotations.start[rows] - start[chunk]
+        turn_end = Annotations.end[rows] - start[chunk]
+        keep = (turn_start < self.duration) & (turn_end > 0)
+        chunk, rows = chunk[keep], rows[keep]
+        turn_start, turn_end = turn_start[keep], turn_end[keep]
+
+        # rank of each turn's speaker among speakers of its chunk
+        num_labels = len(Annotations.labels)
+        speakers, inverse = np.unique(
+            chunk * num_labels + Annotations.label[rows], return_inverse=True)
+        speaker_chunk = speakers // num_labels
+        rank = np.arange(len(speakers)) - np.searchsorted(speaker_chunk,
+                                                          speaker_chunk)
+        rank = rank[inverse]
+        keep = rank < num_speakers
+
+        # one column per (chunk, speaker)
+        data = rasterize(turn_start[keep], turn_end[keep],
+                         chunk[keep] * num_speakers + rank[keep],
+                         batch_size * num_speakers, self.step,
+                         self.num_frames)
+        buffers.labels[:] = data.reshape(
+            self.num_frames, batch_size, num_speakers).transpose(1, 0, 2)
+
+    def _fill(self, buffers, uri, start):
+        uris = self.sampler.uris
+        for b, (u, s) in enumerate(zip(uri.tolist(), start.tolist())):
+            self._read(buffers, b, uris[u], s)
+        self._labels(buffers, uri, start)
+        return buffers
+
+    def _sample(self):
+        # chunks are always drawn by the calling thread, so that batches do
+        # not depend on the number of workers
+        uri, start, _ = self.sampler.sample(self.batch_size)
+        return uri, start
+
+    def _shape(self):
+        return (self.batch_size, self.num_samples, self.num_frames,
+                self.num_speakers)
+
+    def __iter__(self):
+
+        batches = iter(range(self.num_batches) if self.num_batches is not None
+                       else itertools.count())
+        elapsed, t0 = self.elapsed, time.perf_counter()
+
+        if self.workers < 1:
+            buffers = _Buffers(*self._shape())
+            for _ in batches:
+                self._fill(buffers, *self._sample())
+                self.chunks += self.batch_size
+                self.elapsed = elapsed + time.perf_counter() - t0
+                yield buffers.audio, buffers.labels
+            return
+
+        # `prefetch` batches are being prepared while one is being consumed
+        pool = queue.SimpleQueue()
+        for _ in range(self.prefetch + 1):
+            pool.put(_Buffers(*self._shape()))
+
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending = deque()
+
+        def submit():
+            if next(batches, None) is not None:
+                pending.append(executor.submit(self._fill, pool.get(),
+                                               *self._sample()))
+
+        try:
+            for _ in range(self.prefetch):
+                submit()
+
+            current = None
+            while pending:
+                buffers = pending.popleft().result()
+                if current is not None:
+                    pool.put(current)
+                current = buffers
+                submit()
+                self.chunks += self.batch_size
+                self.elapsed = elapsed + time.perf_counter() - t0
+                yield current.audio, current.labels
+
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measure AMI batch loader throughput.')
+    parser.add_argument('root', help='path to "amicorpus" directory')
+    parser.add_argument('--protocol', default='MixHeadset',
+                        help='speaker diarization protocol')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=2.,
+                        help='chunk duration (in seconds)')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='number of worker threads')
+    parser.add_argument('--batches', type=int, default=100,
+                        help='number of batches')
+    args = parser.parse_args()
+
+    from pyannote.database import get_protocol
+    from .finder import AudioFinder
+
+    preprocessors = {'audio': AudioFinder(args.root, strict=False)}
+    protocol = get_protocol(f'AMI.SpeakerDiarization.{args.protocol}',
+                            preprocessors=preprocessors)
+
+    loader = BatchLoader(protocol, batch_size=args.batch_size,
+                         duration=args.duration, workers=args.workers,
+                         num_batches=args.batches)
+    for _ in loader:
+        pass
+    print(f'{loader.chunks} chunks in {loader.elapsed:.2f}s '
+          f'({loader.throughput:.1f} chunks/s)')
+
+
+if __name__ == '__main__':
+    main()
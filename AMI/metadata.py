@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Vectorized per-item statistics
+
+Annotated duration, speech duration, and number of speakers of protocol
+items, computed from metadata tables without building pyannote.core objects
+(see `metadata` method of AMI protocols).
+"""
+
+import numpy as np
+from pyannote.core import SlidingWindow
+from pyannote.core.segment import SEGMENT_PRECISION
+
+
+def _records(table):
+    names = table.dtype.names
+    return [dict(zip(names, row)) for row in table.tolist()]
+
+
+def recode(codes, source, target):
+    """Map `codes` into `source` vocabulary to codes into `target` (or -1)"""
+    index = {value: code for code, value in enumerate(target)}
+    mapping = np.array([index.get(value, -1) for value in source] + [-1],
+                       dtype=np.int64)
+    return mapping[codes]
+
+
+def to_table(uris, annotated, speech, speakers, records=False):
+    """Pack statistics as a NumPy structured array (or list of dicts)"""
+    width = max((len(uri) for uri in uris), default=1)
+    table = np.empty(len(uris), dtype=[('uri', f'U{width}'),
+                                       ('annotated', 'f8'),
+                                       ('speech', 'f8'),
+                                       ('speakers', 'i4')])
+    table['uri'] = uris
+    table['annotated'] = annotated
+    table['speech'] = speech
+    table['speakers'] = speakers
+    return _records(table) if records else table
+
+
+def merge(group, start, end):
+    """Union of (start, end) turns of every group
+
+    Overlapping or contiguous turns of the same group are merged.
+
+    Returns
+    -------
+    group : (k, ) int np.ndarray
+    start, end : (k, ) float np.ndarray
+        Regions, sorted by group and start time.
+    """
+
+    order = np.lexsort((start, group))
+    group, start, end = group[order], start[order], end[order]
+
+    # running maximum of turn ends within each group, computed on
+    # (exact) integer ranks offset by group
+    values, rank = np.unique(end, return_inverse=True)
+    offset = group.astype(np.int64) * len(values)
+    running = values[np.maximum.accumulate(offset + rank) - offset]
+
+    # a turn starts a new region unless it starts before the end of
+    # previous turns of the same group
+    new = np.ones(len(start), dtype=bool)
+    new[1:] = (group[1:] != group[:-1]) | (start[1:] > running[:-1])
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(start)) - 1
+
+    return group[first], start[first], running[last]
+
+
+class Coverage:
+    """Union of (start, end) turns of every group
+
+    Parameters
+    ----------
+    group : (n, ) int np.ndarray
+        Group (e.g. uri code) of each turn.
+    start, end : (n, ) float np.ndarray
+    num_groups : int
+    """
+
+    def __init__(self, group, start, end, num_groups):
+
+        self.num_groups = num_groups
+        self.group, self.start, self.end = merge(group, start, end)
+
+        # cumulated duration of previous regions of the same group
+        duration = self.end - self.start
+        cumulated = np.concatenate([[0.], np.cumsum(duration)])
+        self.bounds = np.searchsorted(self.group, np.arange(num_groups + 1))
+        self._before = cumulated[:-1] - cumulated[self.bounds[self.group]]
+
+        # sortable (group, time) keys
+        self._max = float(np.max(self.end, initial=0.))
+        self._scale = self._max + 1.
+        self._keys = self.group * self._scale + self.start
+
+    def total(self):
+        """Total duration of every group"""
+        return np.bincount(self.group, weights=self.end - self.start,
+                           minlength=self.num_groups)
+
+    def _cumulated(self, group, time):
+        """Duration of regions of `group` before `time`"""
+        if not len(self.start):
+            return np.zeros(len(group))
+        # keys of later times would overflow into the next group
+        time = np.minimum(time, self._max)
+        k = np.searchsorted(self._keys, group * self._scale + time,
+                            side='right') - 1
+        k = np.maximum(k, 0)
+        inside = (k >= self.bounds[group]) & (k < self.bounds[group + 1])
+        partial = np.clip(time - self.start[k], 0., self.end[k] - self.start[k])
+        return np.where(inside, self._before[k] + partial, 0.)
+
+    def within(self, group, start, end):
+        """Duration of regions of `group` within (start, end) windows"""
+        return self._cumulated(group, end) - self._cumulated(group, start)
+
+
+class Windows:
+    """Speech statistics of (uri, start, end) windows
+
+    Parameters
+    ----------
+    Annotations : AMI.turns.Turns
+        Speech turns.
+    uri : (w, ) int np.ndarray
+        Codes into `Annotations.uris` (or -1 for uris without speech).
+    start, end : (w, ) float np.ndarray
+    """
+
+    def __init__(self, Annotations, uri, start, end):
+
+        self.num_labels = len(Annotations.labels)
+        num_uris = len(Annotations.uris)
+
+        valid = uri >= 0
+        self.uri = uri[valid]
+        self.start = start[valid]
+        self.end = end[valid]
+        self._valid = valid
+
+        self.speech = Coverage(Annotations.uri, Annotations.start,
+                               Annotations.end, num_uris)
+
+        # one group per (uri, speaker) pair
+        pair = Annotations.uri.astype(np.int64) * self.num_labels + \
+            Annotations.label
+        self.speaker = Coverage(pair, Annotations.start, Annotations.end,
+                                num_uris * self.num_labels)
+        self._pairs = np.unique(pair)
+
+    def _expand(self, values):
+        expanded = np.zeros(len(self._valid), dtype=values.dtype)
+        expanded[self._valid] = values
+        return expanded
+
+    def speech_duration(self):
+        """Speech duration within each window"""
+        return self._expand(
+            self.speech.within(self.uri, self.start, self.end))
+
+    def num_speakers(self):
+        """Number of speakers within each window"""
+
+        # (window, speaker) pairs for every speaker of the window uri
+        pairs = self._pairs
+        bounds = np.searchsorted(pairs // self.num_labels,
+                                 np.arange(self.speech.num_groups + 1))
+        num_speakers = np.diff(bounds)[self.uri]
+        window = np.repeat(np.arange(len(self.uri)), num_speakers)
+        first = np.cumsum(num_speakers) - num_speakers
+        index = np.arange(len(window)) - first[window]
+        group = pairs[bounds[self.uri][window] + index]
+
+        duration = self.speaker.within(group, self.start[window],
+                                       self.end[window])
+        count = np.bincount(window[duration > SEGMENT_PRECISION],
+                            minlength=len(self.uri))
+        return self._expand(count)
+
+    def label_duration(self, label):
+        """Speech duration of `label` (codes, or -1) within each window"""
+        label = label[self._valid]
+        known = label >= 0
+        duration = np.zeros(len(label))
+        group = self.uri[known] * self.num_labels + label[known]
+        duration[known] = self.speaker.within(group, self.start[known],
+                                              self.end[known])
+        return self._expand(duration)
+
+
+def sessions(Annotated):
+    """Get (uri code, start, end) of 60s speaker spotting sessions
+
+    Sessions are sorted by uri, then time, like sessions of speaker
+    spotting protocols.
+    """
+    coverage = Coverage(Annotated.uri, Annotated.start, Annotated.end,
+                        len(Annotated.uris))
+    uris, starts, ends = [], [], []
+    # pyannote.core timelines iterate over sorted, non-empty, segments
+    segments = sorted(set(zip(Annotated.uri.tolist(),
+                              Annotated.start.tolist(),
+                              Annotated.end.tolist())))
+    for uri, segment_start, segment_end in segments:
+        if segment_end - segment_start <= SEGMENT_PRECISION:
+            continue
+        window = SlidingWindow(start=segment_start, duration=60., step=60.,
+                               end=segment_end - 60.)
+        for session in window:
+            uris.append(uri)
+            starts.append(session.start)
+            ends.append(session.end)
+    return (np.array(uris, dtype=np.int64), np.array(starts),
+            np.array(ends), coverage)
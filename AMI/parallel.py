@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Process-pool generation of protocol items
+
+Set the `workers` attribute of a protocol to N > 1 to build files, sessions
+and trials in a pool of N processes. Work is split by uri: workers crop
+speech turns with NumPy and send them back as compact arrays, from which the
+parent process builds pyannote.core (or columnar) objects, in the same order
+as the single-process implementation.
+"""
+
+import multiprocessing
+
+import numpy as np
+from pyannote.core import Segment, Timeline, Annotation, SlidingWindow
+from pyannote.core.segment import SEGMENT_PRECISION
+
+from .columnar import ColumnarTimeline
+from .columnar import ColumnarAnnotation
+from .columnar import get_codes
+
+# maximum number of trials per task
+CHUNK_SIZE = 512
+
+# per-process state of workers
+_STATE = {}
+
+
+def _initialize(data_dir, shared):
+    from .protocols import SpeakerSpotting
+    protocol = SpeakerSpotting()
+    protocol.data_dir = data_dir
+    protocol.snapshot = False
+    protocol.shared = shared
+    _STATE['protocol'] = protocol
+    _STATE['tables'] = {}
+
+
+def _tables(subset):
+    tables = _STATE['tables']
+    if subset not in tables:
+        data = _STATE['protocol']._load_data(subset)
+        Annotated, Annotations = data['annotated'], data['annotation']
+        tables[subset] = (Annotated, Annotated.groups(by='uri'),
+                          Annotations, Annotations.groups(by='uri'))
+    return tables[subset]
+
+
+def _trials(subset):
+    tables = _STATE['tables']
+    if (subset, 'trials') not in tables:
+        tables[subset, 'trials'] = \
+            _STATE['protocol']._load_table(subset, 'trials')
+    return tables[subset, 'trials']
+
+
+def _crop(start, end, segments):
+    """Crop (start, end) turns to every segment
+
+    Returns
+    -------
+    bounds : (k + 1, ) int np.ndarray
+        Cropped turns of k-th segment are in [bounds[k], bounds[k + 1]).
+    index : int np.ndarray
+        Index of cropped turns in (start, end) arrays.
+    start, end : float np.ndarray
+        Cropped turns.
+    """
+
+    if segments is None:
+        return np.array([0, len(start)]), np.arange(len(start)), start, end
+
+    indices, starts, ends = [], [], []
+    for segment_start, segment_end in segments.tolist():
+        s = np.maximum(start, segment_start)
+        e = np.minimum(end, segment_end)
+        keep = np.flatnonzero((e - s) > SEGMENT_PRECISION)
+        indices.append(keep)
+        starts.append(s[keep])
+        ends.append(e[keep])
+
+    bounds = np.cumsum([0] + [len(index) for index in indices])
+    return (bounds, np.concatenate(indices), np.concatenate(starts),
+            np.concatenate(ends))
+
+
+def _crop_task(subset, raw_uri, segments):
+    """Crop annotated regions and speech turns of `raw_uri` to segments
+
+    `segments` is a (k, 2) array of (start, end) or None not to crop.
+    """
+
+    Annotated, AnnotatedGroups, Annotations, AnnotationGroups = \
+        _tables(subset)
+
+    indices = AnnotatedGroups[raw_uri]
+    annotated_bounds, _, annotated_start, annotated_end = _crop(
+        Annotated.start[indices], Annotated.end[indices], segments)
+
+    # turn index in file is used as track name
+    indices = AnnotationGroups[raw_uri]
+    bounds, track, start, end = _crop(
+        Annotations.start[indices], Annotations.end[indices], segments)
+    label = Annotations.label[indices][track]
+
+    return (annotated_bounds, annotated_start, annotated_end,
+            bounds, start, end, track.astype(np.int32), label)
+
+
+def _sessions_task(subset, raw_uri, columnar):
+    """Crop annotated regions and speech turns of `raw_uri` to sessions"""
+
+    Annotated, AnnotatedGroups, _, _ = _tables(subset)
+    indices = AnnotatedGroups[raw_uri]
+    segments = zip(Annotated.start[indices].tolist(),
+                   Annotated.end[indices].tolist())
+    # pyannote.core timelines iterate over sorted, non-empty, segments
+    if not columnar:
+        segments = sorted(set(segments))
+
+    sessions = []
+    for start, end in segments:
+        if end - start <= SEGMENT_PRECISION:
+            continue
+        window = SlidingWindow(start=start, duration=60., step=60.,
+                               end=end - 60.)
+        sessions.extend((session.start, session.end) for session in window)
+    sessions = np.array(sessions, dtype=np.float64).reshape(-1, 2)
+
+    return (sessions, ) + _crop_task(subset, raw_uri, sessions)
+
+
+def _speakers(subset):
+    """Map model codes to the label code of their speaker (-1 if unknown)"""
+    tables = _STATE['tables']
+    if (subset, 'speakers') not in tables:
+        _, _, Annotations, _ = _tables(subset)
+        codes = {label: code for code, label in enumerate(Annotations.labels)}
+        # FIE038_m1 ==> FIE038
+        tables[subset, 'speakers'] = np.array(
+            [codes.get('_'.join(model_id.split('_')[:-1]), -1)
+             for model_id in _trials(subset).models], dtype=np.int32)
+    return tables[subset, 'speakers']
+
+
+def _trials_task(subset, first, last, diarization):
+    """Crop speech turns to trials [first, last) which share the same uri
+
+    Returns cropped turns (unless `diarization` is False) and reference
+    turns (i.e. cropped turns of the trial speaker) of every trial.
+    """
+
+    trials = _trials(subset)
+    raw_uri = trials.uris[trials.uri[first]]
+    segments = np.stack([trials.start[first:last],
+                         trials.end[first:last]], axis=1)
+    bounds, start, end, track, label = \
+        _crop_task(subset, raw_uri, segments)[3:]
+
+    speaker = _speakers(subset)[trials.model[first:last]]
+    # non-target trials have an empty reference
+    if not diarization:
+        speaker = np.where(trials.target[first:last], speaker, -1)
+
+    trial = np.repeat(np.arange(last - first), np.diff(bounds))
+    keep = label == speaker[trial]
+    reference_bounds = np.concatenate(
+        [[0], np.cumsum(np.bincount(trial[keep], minlength=last - first))])
+    reference = (reference_bounds, start[keep], end[keep])
+
+    if not diarization:
+        bounds = np.zeros(last - first + 1, dtype=int)
+        start, end = start[:0], end[:0]
+        track, label = track[:0], label[:0]
+
+    return (bounds, start, end, track, label) + reference
+
+
+class _Builder:
+    """Build protocol items from compact arrays sent by workers"""
+
+    def __init__(self, Annotations, columnar):
+        self.labels = Annotations.labels
+        self.codes = get_codes(self.labels) if columnar else None
+        self.columnar = columnar
+
+    def timeline(self, uri, start, end):
+        if self.columnar:
+            return ColumnarTimeline(uri, start, end)
+        return Timeline(uri=uri, segments=[
+            Segment(start=s, end=e)
+            for s, e in zip(start.tolist(), end.tolist())])
+
+    def annotation(self, uri, start, end, track, label):
+        if self.columnar:
+            return ColumnarAnnotation(uri, start, end, label, self.labels,
+                                      codes=self.codes)
+        labels = self.labels
+        annotation = Annotation(uri=uri)
+        for s, e, t, code in zip(start.tolist(), end.tolist(),
+                                 track.tolist(), label.tolist()):
+            annotation[Segment(start=s, end=e), t] = labels[code]
+        return annotation
+
+    def items(self, uri, annotated_bounds, annotated_start, annotated_end,
+              bounds, start, end, track, label):
+        for k in range(len(bounds) - 1):
+            a, b = annotated_bounds[k], annotated_bounds[k + 1]
+            annotated = self.timeline(uri, annotated_start[a:b],
+                                      annotated_end[a:b])
+            a, b = bounds[k], bounds[k + 1]
+            annotation = self.annotation(uri, start[a:b], end[a:b],
+                                         track[a:b], label[a:b])
+            yield {'database': 'AMI',
+                   'uri': uri,
+                   'annotated': annotated,
+                   'annotation': annotation}
+
+
+def _pool(protocol):
+    return multiprocessing.Pool(
+        processes=protocol.workers, initializer=_initialize,
+        initargs=(protocol._data_dir, getattr(protocol, 'shared', None)))
+
+
+def iter_files(protocol, subset):
+    """Build speaker diarization files in worker processes"""
+
+    Annotations = protocol._load_table(subset, 'annotation')
+    builder = _Builder(Annotations, getattr(protocol, 'columnar', False))
+    raw_uris = list(protocol._load_table(subset, 'annotated').uris)
+
+    with _pool(protocol) as pool:
+        tasks = [(subset, raw_uri, None) for raw_uri in raw_uris]
+        results = pool.imap(_star_crop_task, tasks)
+        for raw_uri, arrays in zip(raw_uris, results):
+            yield from builder.items(f'{raw_uri}.Mix-Headset', *arrays)
+
+
+def iter_sessions(protocol, subset):
+    """Build speaker spotting sessions in worker processes"""
+
+    columnar = getattr(protocol, 'columnar', False)
+    Annotations = protocol._load_table(subset, 'annotation')
+    builder = _Builder(Annotations, columnar)
+    raw_uris = list(protocol._load_table(subset, 'annotated').uris)
+
+    with _pool(protocol) as pool:
+        tasks = [(subset, raw_uri, columnar) for raw_uri in raw_uris]
+        results = pool.imap(_star_sessions_task, tasks)
+        for raw_uri, (_, *arrays) in zip(raw_uris, results):
+            yield from builder.items(f'{raw_uri}.Mix-Headset', *arrays)
+
+
+def iter_trials(protocol, subset):
+    """Build speaker spotting trials in worker processes"""
+
+    diarization = getattr(protocol, 'diarization', True)
+    columnar = getattr(protocol, 'columnar', False)
+    Annotations = protocol._load_table(subset, 'annotation')
+    builder = _Builder(Annotations, columnar)
+    trials = protocol._load_table(subset, 'trials')
+
+    # split trials into chunks of consecutive trials with the same uri
+    tasks = []
+    changes = np.flatnonzero(np.diff(trials.uri)) + 1
+    bounds = np.concatenate([[0], changes, [len(trials)]]).tolist()
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        for start in range(first, last, CHUNK_SIZE):
+            end = min(start + CHUNK_SIZE, last)
+            tasks.append((subset, start, end, diarization))
+
+    with _pool(protocol) as pool:
+        results = pool.imap(_star_trials_task, tasks)
+        for (_, first, last, _), arrays in zip(tasks, results):
+
+            (bounds, start, end, track, label,
+             reference_bounds, reference_start, reference_end) = arrays
+            bounds = bounds.tolist()
+            reference_bounds = reference_bounds.tolist()
+
+            uri = f'{trials.uris[trials.uri[first]]}.Mix-Headset'
+            models = trials.models
+            for k, (model, trial_start, trial_end) in enumerate(zip(
+                    trials.model[first:last].tolist(),
+                    trials.start[first:last].tolist(),
+                    trials.end[first:last].tolist())):
+
+                try_with = Segment(start=trial_start, end=trial_end)
+                a, b = reference_bounds[k], reference_bounds[k + 1]
+                current_trial = {
+                    'database': 'AMI',
+                    'uri': uri,
+                    'try_with': try_with,
+                    'model_id': models[model],
+                    'reference': builder.timeline(
+                        uri, reference_start[a:b], reference_end[a:b]),
+                }
+
+                if diarization:
+                    a, b = bounds[k], bounds[k + 1]
+                    current_trial['annotation'] = builder.annotation(
+                        uri, start[a:b], end[a:b], track[a:b], label[a:b])
+                    current_trial['annotated'] = builder.timeline(
+                        uri, np.array([trial_start]), np.array([trial_end]))
+
+                yield current_trial
+
+
+def _star_crop_task(args):
+    return _crop_task(*args)
+
+
+def _star_sessions_task(args):
+    return _sessions_task(*args)
+
+
+def _star_trials_task(args):
+    return _trials_task(*args)
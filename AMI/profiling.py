@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class _NullStage:
+    """No-op stage used when profiling is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class _Stage:
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        self.profiler.add(self.name, duration)
+        return False
+
+
+class Profiler:
+    """Per-stage profiler for AMI protocols
+
+    Stages are named after the operation they time: 'read_table', 'groupby',
+    'annotation' (building pyannote.core.Annotation), 'timeline' (building
+    pyannote.core.Timeline), 'crop', and 'label_timeline'.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        Called with (stage, duration) every time a stage completes.
+
+    Usage
+    -----
+    >>> protocol.profiler = Profiler()
+    >>> for current_file in protocol.train():
+    ...     pass
+    >>> protocol.profiler.durations
+    {'read_table': 0.41, 'groupby': 0.01, 'annotation': 1.23, ...}
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def add(self, stage, duration):
+        self.durations[stage] += duration
+        self.counts[stage] += 1
+        if self.callback is not None:
+            self.callback(stage, duration)
+
+    def stage(self, name):
+        """Context manager timing stage `name`"""
+        return _Stage(self, name)
+
+    def __str__(self):
+        lines = []
+        for stage, duration in sorted(self.durations.items(),
+                                      key=lambda item: -item[1]):
+            lines.append(f'{stage:16s} {duration:10.3f}s '
+                         f'{self.counts[stage]:10d} call(s)')
+        return '\n'.join(lines)
+
+
+@contextmanager
+def profile(protocol, callback=None):
+    """Temporarily attach a profiler to a protocol
+
+    Usage
+    -----
+    >>> with profile(protocol) as profiler:
+    ...     for current_trial in protocol.development_trial():
+    ...         pass
+    >>> print(profiler)
+    """
+    previous = getattr(protocol, 'profiler', None)
+    protocol.profiler = Profiler(callback=callback)
+    try:
+        yield protocol.profiler
+    finally:
+        protocol.profiler = previous
@@ -0,0 +1,860 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2016-2018 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+import numpy as np
+import pyannote.core.segment
+from pyannote.core import Segment, Timeline, Annotation, SlidingWindow
+from pyannote.database import Database
+from pyannote.database.protocol import SpeakerDiarizationProtocol
+from pyannote.database.protocol import SpeakerSpottingProtocol
+from pathlib import Path
+from functools import partial
+
+from .util import DATA_DIR
+from .turns import TABLES
+from .cache import CACHE
+from .columnar import ColumnarTimeline
+from .columnar import ColumnarAnnotation
+from .columnar import get_codes
+from .profiling import NULL_STAGE
+from .lazy import LazyFile
+
+
+_SUBSETS = {'train': 'trn', 'development': 'dev', 'test': 'tst'}
+
+
+class SpeakerDiarization(SpeakerDiarizationProtocol):
+
+    def _stage(self, name):
+        # set 'profiler' attribute to an AMI.profiling.Profiler instance
+        # to get per-stage durations
+        profiler = getattr(self, 'profiler', None)
+        if profiler is None:
+            return NULL_STAGE
+        return profiler.stage(name)
+
+    @property
+    def _data_dir(self):
+        # set 'data_dir' attribute to use alternate (e.g. synthetic, see
+        # AMI.synthetic) metadata instead of the bundled one
+        return Path(getattr(self, 'data_dir', DATA_DIR))
+
+    def _load_snapshot(self, subset, kind):
+        # prebuilt items are used when available (see AMI.snapshot).
+        # set 'snapshot' attribute to False to always build them from text.
+        if not getattr(self, 'snapshot', True):
+            return None
+        # snapshots contain pyannote.core objects
+        if kind != 'enrolments' and getattr(self, 'columnar', False):
+            return None
+        from .snapshot import load
+        return load(self._data_dir, subset, kind,
+                    lazy=getattr(self, 'lazy', True))
+
+    def _load_table(self, subset, kind):
+
+        # set 'shared' attribute to an AMI.shared.SharedTables instance to
+        # use tables published in shared memory instead of reading files
+        shared = getattr(self, 'shared', None)
+        if shared is not None and shared.data_dir == self._data_dir:
+            table = shared.get(subset, kind)
+            if table is not None:
+                return table
+
+        # tables are cached process-wide (see AMI.cache)
+        source, read = TABLES[kind]
+        with self._stage('read_table'):
+            return CACHE.get(self._data_dir / source.format(subset=subset),
+                             read)
+
+    def _load_data(self, subset):
+        return {'annotated': self._load_table(subset, 'annotated'),
+                'annotation': self._load_table(subset, 'annotation')}
+
+    def _xxx_iter(self, subset, indices=None):
+
+        current_files = self._xxx_files(subset, indices=indices)
+
+        # set 'frames' attribute to a frame step (in seconds) to get
+        # frame-level speaker activity (see AMI.frames)
+        step = getattr(self, 'frames', None)
+        if step is not None:
+            current_files = self._add_frames(subset, current_files, step)
+
+        # set 'regions' attribute to True to get (lazily loaded) overlapped
+        # speech regions and speaker change points (see AMI.regions)
+        if getattr(self, 'regions', False):
+            current_files = self._add_regions(subset, current_files)
+
+        return current_files
+
+    def _get_regions(self, subset):
+
+        from .regions import load_regions
+        from .snapshot import get_key
+
+        key = get_key(self._data_dir, subset, 'files')[:16]
+        cache = self.__dict__.setdefault('_regions', {})
+        if key not in cache:
+            Annotations = self._load_data(subset)['annotation']
+            with self._stage('regions'):
+                cache[key] = load_regions(Annotations, key)
+        return cache[key]
+
+    def _add_regions(self, subset, current_files):
+
+        columnar = getattr(self, 'columnar', False)
+
+        def overlap(uri):
+            regions, _ = self._get_regions(subset)[uri.split('.')[0]]
+            if columnar:
+                return ColumnarTimeline(uri, regions[:, 0], regions[:, 1])
+            return Timeline(uri=uri, segments=[Segment(start, end)
+                                               for start, end in regions])
+
+        def change(uri):
+            _, points = self._get_regions(subset)[uri.split('.')[0]]
+            return points
+
+        for current_file in current_files:
+            uri = current_file['uri']
+            if not isinstance(current_file, LazyFile):
+                current_file = LazyFile(current_file)
+            current_file.lazy('overlap', partial(overlap, uri))
+            current_file.lazy('change', partial(change, uri))
+            yield current_file
+
+    def _add_frames(self, subset, current_files, step):
+
+        from .frames import load_activity
+        from .snapshot import get_key
+
+        packed = getattr(self, 'packed_frames', False)
+        key = get_key(self._data_dir, subset, 'files')[:16]
+
+        data = self._load_data(subset)
+        Annotated = data['annotated']
+        Annotations = data['annotation']
+        AnnotatedGroups = Annotated.groups(by='uri')
+        AnnotationGroups = Annotations.groups(by='uri')
+
+        def frames(raw_uri):
+            duration = np.max(Annotated.end[AnnotatedGroups[raw_uri]])
+            with self._stage('frames'):
+                return load_activity(
+                    raw_uri, Annotations, AnnotationGroups[raw_uri],
+                    duration, step, key, packed=packed)
+
+        for current_file in current_files:
+            raw_uri = current_file['uri'].split('.')[0]
+            if isinstance(current_file, LazyFile):
+                current_file.lazy('frames', partial(frames, raw_uri))
+            else:
+                current_file['frames'] = frames(raw_uri)
+            yield current_file
+
+    def _xxx_files(self, subset, indices=None):
+
+        # `indices` (of files, in iteration order) are used to only build
+        # some files, in any order (see AMI.schedule, for instance)
+
+        snapshot = self._load_snapshot(subset, 'files')
+        if snapshot is not None:
+            if indices is None:
+                yield from snapshot
+            else:
+                yield from (snapshot[index] for index in indices)
+            return
+
+        # set 'workers' attribute to N > 1 to build files in a pool of N
+        # processes (see AMI.parallel)
+        if getattr(self, 'workers', 1) > 1 and indices is None:
+            from .parallel import iter_files
+            yield from iter_files(self, subset)
+            return
+
+        data = self._load_data(subset)
+        Annotated = data['annotated']
+        Annotations = data['annotation']
+
+        with self._stage('groupby'):
+            AnnotatedGroups = Annotated.groups(by='uri')
+            AnnotationGroups = Annotations.groups(by='uri')
+
+        # set 'columnar' attribute to True to get NumPy arrays instead of
+        # pyannote.core objects (see AMI.columnar)
+        columnar = getattr(self, 'columnar', False)
+        lazy = getattr(self, 'lazy', True)
+        if columnar:
+            codes = get_codes(Annotations.labels)
+
+        raw_uris = Annotated.uris
+        if indices is None:
+            indices = range(len(raw_uris))
+
+        for index in indices:
+
+            raw_uri = raw_uris[index]
+            uri = f'{raw_uri}.Mix-Headset'
+            rows = AnnotatedGroups[raw_uri]
+
+            if columnar:
+                turns = AnnotationGroups[raw_uri]
+                yield {
+                    'database': 'AMI',
+                    'uri': uri,
+                    'annotated': ColumnarTimeline(uri,
+                                                  Annotated.start[rows],
+                                                  Annotated.end[rows]),
+                    'annotation': ColumnarAnnotation(uri,
+                                                     Annotations.start[turns],
+                                                     Annotations.end[turns],
+                                                     Annotations.label[turns],
+                                                     Annotations.labels,
+                                                     codes=codes)}
+                continue
+
+            annotated = partial(self._build_annotated, uri, Annotated, rows)
+            annotation = partial(self._build_annotation,
+                                 uri, Annotations, AnnotationGroups[raw_uri])
+
+            # set 'lazy' attribute to False to build 'annotated' and
+            # 'annotation' right away, instead of on first access
+            if lazy:
+                current_file = LazyFile(database='AMI', uri=uri)
+                current_file.lazy('annotated', annotated)
+                current_file.lazy('annotation', annotation)
+            else:
+                current_file = {
+                    'database': 'AMI',
+                    'uri': uri,
+                    'annotated': annotated(),
+                    'annotation': annotation()}
+
+            yield current_file
+
+    def _build_annotated(self, uri, Annotated, indices):
+        with self._stage('timeline'):
+            segments = [Segment(start=start, end=end)
+                        for start, end, _ in Annotated.iter(indices)]
+            return Timeline(uri=uri, segments=segments)
+
+    def _build_annotation(self, uri, Annotations, indices):
+        with self._stage('annotation'):
+            annotation = Annotation(uri=uri)
+            turns = Annotations.iter(indices)
+            for t, (start, end, speaker) in enumerate(turns):
+                annotation[Segment(start=start, end=end), t] = speaker
+            return annotation
+
+    def metadata(self, subset='train', records=False):
+        """Get per-file statistics, without building files
+
+        Parameters
+        ----------
+        subset : {'train', 'development', 'test'}
+        records : bool, optional
+            Return a list of dictionaries instead of a NumPy array.
+
+        Returns
+        -------
+        metadata : np.ndarray
+            Structured array with one row per file (in iteration order) and
+            'uri', 'annotated' (duration), 'speech' (duration), and
+            'speakers' (number of speakers) fields.
+        """
+
+        from .metadata import Coverage, Windows, recode, to_table
+
+        subset = _SUBSETS[subset]
+        Annotated = self._load_table(subset, 'annotated')
+        Annotations = self._load_table(subset, 'annotation')
+
+        num_uris = len(Annotated.uris)
+        annotated = Coverage(Annotated.uri, Annotated.start, Annotated.end,
+                             num_uris).total()
+
+        # files cover their whole annotation
+        uri = recode(np.arange(num_uris), Annotated.uris, Annotations.uris)
+        start = np.zeros(num_uris)
+        end = np.full(num_uris, np.inf)
+        windows = Windows(Annotations, uri, start, end)
+
+        uris = [f'{raw_uri}.Mix-Headset' for raw_uri in Annotated.uris]
+        return to_table(uris, annotated, windows.speech_duration(),
+                        windows.num_speakers(), records=records)
+
+    def _num_items(self, subset, trials=False):
+        # number of files (or sessions, or trials) of `subset`
+        return len(self._load_table(_SUBSETS[subset], 'annotated').uris)
+
+    def _iter_items(self, subset, indices, trials=False):
+        # build (not preprocessed) items at `indices` of iteration order
+        return self._xxx_iter(_SUBSETS[subset], indices=indices)
+
+    def trn_iter(self):
+        return self._xxx_iter('trn')
+
+    def dev_iter(self):
+        return self._xxx_iter('dev')
+
+    def tst_iter(self):
+        return self._xxx_iter('tst')
+
+
+def _crop(value, segment):
+    # timestamps (e.g. speaker change points) are cropped with searchsorted
+    if isinstance(value, np.ndarray):
+        i = np.searchsorted(value, segment.start, side='left')
+        j = np.searchsorted(value, segment.end, side='right')
+        return value[i:j]
+    return value.crop(segment)
+
+
+class SpeakerSpotting(SpeakerDiarization, SpeakerSpottingProtocol):
+
+    # file keys cropped to sessions
+    _CROPPED = ('annotated', 'annotation', 'frames', 'overlap', 'change')
+
+    def _crop(self, current_file, key, segment):
+        with self._stage('crop'):
+            return _crop(current_file[key], segment)
+
+    def _session(self, current_file, session, lazy=True):
+
+        # when 'lazy' is set, sessions are cropped on first access
+        # from (lazily built and memoized) file values
+        if lazy:
+            session_file = current_file.copy()
+        else:
+            session_file = dict(current_file)
+
+        for key in self._CROPPED:
+            if key not in current_file:
+                continue
+            crop = partial(self._crop, current_file, key, session)
+            if lazy:
+                session_file.lazy(key, crop)
+            else:
+                session_file[key] = crop()
+
+        return session_file
+
+    def _sessionify(self, current_files):
+
+        lazy = getattr(self, 'lazy', True)
+
+        for current_file in current_files:
+
+            if lazy and not isinstance(current_file, LazyFile):
+                current_file = LazyFile(current_file)
+
+            for segment in current_file['annotated']:
+                sessions = SlidingWindow(start=segment.start,
+                                         duration=60., step=60.,
+                                         end=segment.end - 60.)
+
+                for session in sessions:
+                    yield self._session(current_file, session, lazy=lazy)
+
+    def _iter_sessions(self, subset, indices):
+
+        from .metadata import sessions
+
+        lazy = getattr(self, 'lazy', True)
+        Annotated = self._load_table(subset, 'annotated')
+        # file index, start and end of every session
+        file_index, start, end, _ = sessions(Annotated)
+
+        # sessions are cropped straight from tables, unless they need
+        # file-level 'frames' or 'regions'
+        if getattr(self, 'frames', None) is None and \
+                not getattr(self, 'regions', False):
+            from .parallel import _Builder
+
+            Annotations = self._load_table(subset, 'annotation')
+            AnnotatedGroups = Annotated.groups(by='uri')
+            AnnotationGroups = Annotations.groups(by='uri')
+            builder = _Builder(Annotations, getattr(self, 'columnar', False))
+
+            for index in indices:
+                raw_uri = Annotated.uris[file_index[index]]
+                uri = f'{raw_uri}.Mix-Headset'
+                segments = np.array([[start[index], end[index]]])
+                annotated = partial(self._crop_annotated, builder, uri,
+                                    Annotated, AnnotatedGroups[raw_uri],
+                                    segments)
+                annotation = partial(self._crop_annotation, builder, uri,
+                                     Annotations, AnnotationGroups[raw_uri],
+                                     segments)
+                if lazy:
+                    session_file = LazyFile(database='AMI', uri=uri)
+                    session_file.lazy('annotated', annotated)
+                    session_file.lazy('annotation', annotation)
+                else:
+                    session_file = {'database': 'AMI',
+                                    'uri': uri,
+                                    'annotated': annotated(),
+                                    'annotation': annotation()}
+                yield session_file
+            return
+
+        current_file, current_index = None, None
+        for index in indices:
+
+            # consecutive sessions of the same file share it
+            if file_index[index] != current_index:
+                current_index = file_index[index]
+                current_file = next(self._xxx_iter(subset, [current_index]))
+                if lazy and not isinstance(current_file, LazyFile):
+                    current_file = LazyFile(current_file)
+
+            session = Segment(start=start[index], end=end[index])
+            yield self._session(current_file, session, lazy=lazy)
+
+    def _crop_annotated(self, builder, uri, Annotated, rows, segments):
+        from .parallel import _crop
+        with self._stage('crop'):
+            _, _, start, end = _crop(Annotated.start[rows],
+                                     Annotated.end[rows], segments)
+            return builder.timeline(uri, start, end)
+
+    def _crop_annotation(self, builder, uri, Annotations, rows, segments):
+        from .parallel import _crop
+        with self._stage('crop'):
+            # turn index in file is used as track name
+            _, track, start, end = _crop(Annotations.start[rows],
+                                         Annotations.end[rows], segments)
+            return builder.annotation(uri, start, end, track,
+                                      Annotations.label[rows][track])
+
+    def metadata(self, subset='train', trials=False, records=False):
+        """Get per-session (or per-trial) statistics, without building them
+
+        Parameters
+        ----------
+        subset : {'train', 'development', 'test'}
+        trials : bool, optional
+            Get statistics of trials instead of sessions.
+        records : bool, optional
+            Return a list of dictionaries instead of a NumPy array.
+
+        Returns
+        -------
+        metadata : np.ndarray
+            Structured array with one row per session (or trial) in
+            iteration order and 'uri', 'annotated' (duration), 'speech'
+            (duration), and 'speakers' (number of speakers) fields.
+        """
+
+        from .metadata import Windows, recode, sessions, to_table
+
+        subset = _SUBSETS[subset]
+        Annotations = self._load_table(subset, 'annotation')
+
+        if not trials:
+            Annotated = self._load_table(subset, 'annotated')
+            uri, start, end, coverage = sessions(Annotated)
+            annotated = coverage.within(uri, start, end)
+            windows = Windows(Annotations,
+                              recode(uri, Annotated.uris, Annotations.uris),
+                              start, end)
+            uris = np.array([f'{raw_uri}.Mix-Headset'
+                             for raw_uri in Annotated.uris])[uri]
+            return to_table(uris, annotated, windows.speech_duration(),
+                            windows.num_speakers(), records=records)
+
+        table = self._load_table(subset, 'trials')
+        keep = self._trial_indices(subset)
+        windows = Windows(Annotations,
+                          recode(table.uri[keep], table.uris,
+                                 Annotations.uris),
+                          table.start[keep], table.end[keep])
+
+        uris = np.array([f'{raw_uri}.Mix-Headset'
+                         for raw_uri in table.uris])[table.uri[keep]]
+        return to_table(uris, (table.end - table.start)[keep],
+                        windows.speech_duration(), windows.num_speakers(),
+                        records=records)
+
+    def _has_reference(self, subset):
+        """Whether the 'reference' of every trial is not empty"""
+
+        from .metadata import Windows, recode
+
+        Annotations = self._load_table(subset, 'annotation')
+        table = self._load_table(subset, 'trials')
+        windows = Windows(Annotations,
+                          recode(table.uri, table.uris, Annotations.uris),
+                          table.start, table.end)
+
+        # reference is the speech of the model speaker (only for target
+        # trials when 'diarization' is False)
+        # FIE038_m1 ==> FIE038
+        speakers = ['_'.join(model_id.split('_')[:-1])
+                    for model_id in table.models]
+        label = recode(table.model, speakers, Annotations.labels)
+        reference = windows.label_duration(label) > \
+            pyannote.core.segment.SEGMENT_PRECISION
+        if not getattr(self, 'diarization', True):
+            reference &= table.target
+        return reference
+
+    def _trial_indices(self, subset):
+        """Indices (in the trial file) of trials yielded by xxx_try_iter"""
+        return np.arange(len(self._load_table(subset, 'trials')))
+
+    def _num_items(self, subset, trials=False):
+        from .metadata import sessions
+        subset = _SUBSETS[subset]
+        if trials:
+            return len(self._trial_indices(subset))
+        return len(sessions(self._load_table(subset, 'annotated'))[0])
+
+    def _iter_items(self, subset, indices, trials=False):
+        subset = _SUBSETS[subset]
+        if trials:
+            indices = self._trial_indices(subset)[np.asarray(indices,
+                                                             dtype=int)]
+            return self._xxx_try_iter(subset, indices=indices.tolist())
+        return self._xxx_sessions(subset, indices=indices)
+
+    def _xxx_sessions(self, subset, indices=None):
+
+        # `indices` (of sessions, in iteration order) are used to only build
+        # some sessions, in any order
+        if indices is not None:
+            return self._iter_sessions(subset, indices)
+
+        # sessions are cropped in worker processes, unless they need
+        # file-level 'frames' or 'regions'
+        if getattr(self, 'workers', 1) > 1 and \
+                getattr(self, 'frames', None) is None and \
+                not getattr(self, 'regions', False):
+            from .parallel import iter_sessions
+            return iter_sessions(self, subset)
+
+        return self._sessionify(self._xxx_iter(subset))
+
+    def trn_iter(self):
+        return self._xxx_sessions('trn')
+
+    def dev_iter(self):
+        return self._xxx_sessions('dev')
+
+    def tst_iter(self):
+        return self._xxx_sessions('tst')
+
+    def _xxx_enrol_iter(self, subset):
+
+        snapshot = self._load_snapshot(subset, 'enrolments')
+        if snapshot is not None:
+            yield from snapshot
+            return
+
+        # load enrolments
+        enrolments = self._load_table(subset, 'enrolments')
+
+        with self._stage('groupby'):
+            EnrolmentGroups = enrolments.groups(by='label')
+
+        for model_id, indices in EnrolmentGroups.items():
+
+            # enrolment uri is the one of the first turn
+            raw_uri = enrolments.uris[enrolments.uri[indices[0]]]
+            uri = f'{raw_uri}.Mix-Headset'
+
+            # gather enrolment data
+            with self._stage('timeline'):
+                segments = []
+                for start, end, _ in enrolments.iter(indices):
+                    segment = Segment(start=start, end=end)
+                    if segment:
+                        segments.append(segment)
+                enrol_with = Timeline(segments=segments, uri=uri)
+
+            current_enrolment = {
+                'database': 'AMI',
+                'uri': uri,
+                'model_id': model_id,
+                'enrol_with': enrol_with,
+            }
+
+            yield current_enrolment
+
+    def dev_enrol_iter(self):
+        return self._xxx_enrol_iter('dev')
+
+    def tst_enrol_iter(self):
+        return self._xxx_enrol_iter('tst')
+
+    def _xxx_try_iter(self, subset, indices=None):
+
+        # `indices` (of trials in the trial file) are used to only build
+        # some trials, in any order
+
+        diarization = getattr(self, 'diarization', True)
+
+        # snapshots only contain trials with diarization set to False
+        if not diarization:
+            snapshot = self._load_snapshot(subset, 'trials')
+            if snapshot is not None:
+                if indices is None:
+                    yield from snapshot
+                else:
+                    yield from (snapshot[index] for index in indices)
+                return
+
+        # set 'workers' attribute to N > 1 to build trials in a pool of N
+        # processes (see AMI.parallel)
+        if getattr(self, 'workers', 1) > 1 and indices is None:
+            from .parallel import iter_trials
+            yield from iter_trials(self, subset)
+            return
+
+        columnar = getattr(self, 'columnar', False)
+
+        # load "who speaks when" reference
+        data = self._load_data(subset)
+        Annotations = data['annotation']
+        speaker_codes = get_codes(Annotations.labels)
+
+        with self._stage('groupby'):
+            AnnotationGroups = Annotations.groups(by='uri')
+
+        # load trials
+        table = self._load_table(subset, 'trials')
+        trials = table if indices is None else \
+            (table[index] for index in indices)
+
+        for trial in trials:
+
+            model_id = trial.model_id
+
+            # FIE038_m1 ==> FIE038
+            # FIE038_m42 ==> FIE038
+            # Bernard_Pivot_m1 ==> Bernard_Pivot
+            speaker = '_'.join(model_id.split('_')[:-1])
+
+            # append Mix-Headset to uri
+            raw_uri = trial.uri
+            uri = f'{raw_uri}.Mix-Headset'
+
+            # trial session
+            try_with = Segment(start=trial.start, end=trial.end)
+
+            if columnar:
+                rows = AnnotationGroups[raw_uri]
+                annotation = ColumnarAnnotation(uri,
+                                                Annotations.start[rows],
+                                                Annotations.end[rows],
+                                                Annotations.label[rows],
+                                                Annotations.labels,
+                                                codes=speaker_codes)
+                with self._stage('crop'):
+                    annotation = annotation.crop(try_with)
+                # like below, reference of non-target trials is empty when
+                # 'diarization' is set to False
+                if diarization or trial.target:
+                    reference = annotation.label_timeline(speaker)
+                else:
+                    reference = ColumnarTimeline(uri, np.zeros(0),
+                                                 np.zeros(0))
+
+                current_trial = {
+                    'database': 'AMI',
+                    'uri': uri,
+                    'try_with': try_with,
+                    'model_id': model_id,
+                    'reference': reference,
+                }
+                if diarization:
+                    current_trial['annotation'] = annotation
+                    current_trial['annotated'] = ColumnarTimeline(
+                        uri, np.array([try_with.start]),
+                        np.array([try_with.end]))
+
+            elif diarization:
+                # 'annotation' & 'annotated' are needed when diarization is set
+                # therefore, this needs a bit more work than when set to False.
+
+                with self._stage('annotation'):
+                    annotation = Annotation(uri=uri)
+                    # only keep turns intersecting the trial session (this is
+                    # `segment & try_with`, vectorized) but keep their index
+                    # in the file as track name.
+                    rows = AnnotationGroups[raw_uri]
+                    intersection = \
+                        np.minimum(Annotations.end[rows], trial.end) - \
+                        np.maximum(Annotations.start[rows], trial.start)
+                    tracks = np.flatnonzero(
+                        intersection > pyannote.core.segment.SEGMENT_PRECISION)
+                    turns = Annotations.iter(rows[tracks])
+                    for t, (start, end, label) in zip(tracks.tolist(), turns):
+                        annotation[Segment(start=start, end=end), t] = label
+
+                with self._stage('crop'):
+                    annotation = annotation.crop(try_with)
+                with self._stage('label_timeline'):
+                    reference = annotation.label_timeline(speaker)
+                annotated = Timeline(uri=uri, segments=[try_with])
+
+                # pack & yield trial
+                current_trial = {
+                    'database': 'AMI',
+                    'uri': uri,
+                    'try_with': try_with,
+                    'model_id': model_id,
+                    'reference': reference,
+                    'annotation': annotation,
+                    'annotated': annotated,
+                }
+
+            else:
+                # 'annotation' & 'annotated' are not needed when diarization is
+                # set to False -- leading to a faster implementation...
+                with self._stage('timeline'):
+                    segments = []
+                    if trial.target:
+                        rows = AnnotationGroups[raw_uri]
+                        code = speaker_codes[speaker]
+                        rows = rows[Annotations.label[rows] == code]
+                        segments = [Segment(start=start, end=end) for
+                                    start, end, _ in Annotations.iter(rows)]
+                    reference = Timeline(uri=uri, segments=segments)
+                with self._stage('crop'):
+                    reference = reference.crop(try_with)
+
+                # pack & yield trial
+                current_trial = {
+                    'database': 'AMI',
+                    'uri': uri,
+                    'try_with': try_with,
+                    'model_id': model_id,
+                    'reference': reference,
+                }
+
+            yield current_trial
+
+    def dev_try_iter(self):
+        return self._xxx_try_iter('dev')
+
+    def tst_try_iter(self):
+        return self._xxx_try_iter('tst')
+
+
+def _same_site(trials):
+    """Whether models and trials of AMI.turns.Trials table share their site"""
+    # FEE041_m1 ==> second letter = E ==> Edimburgh
+    model_site = np.array([model_id[1] for model_id in trials.models])
+    # ES2003a ==> first letter = E ==> Edimburgh
+    trial_site = np.array([uri[0] for uri in trials.uris])
+    return model_site[trials.model] == trial_site[trials.uri]
+
+
+class SpeakerSpottingIntraSite(SpeakerSpotting):
+
+    def keep_trial(self, current_trial):
+
+        # keep all target trials
+        if current_trial['reference']:
+            return True
+
+        # only keep "same site" non-target trials
+        # FEE041_m1 ==> second letter = E ==> Edimburgh
+        model_site = current_trial['model_id'][1]
+        # ES2003a ==> first letter = E ==> Edimburgh
+        trial_site = current_trial['uri'][0]
+        return model_site == trial_site
+
+    def _keep_trials(self, trials, reference):
+        # vectorized `keep_trial`
+        return reference | _same_site(trials)
+
+    def _trial_indices(self, subset):
+        trials = self._load_table(subset, 'trials')
+        keep = self._keep_trials(trials, self._has_reference(subset))
+        return np.flatnonzero(keep)
+
+    def dev_try_iter(self):
+        trials = super(SpeakerSpottingIntraSite, self).dev_try_iter()
+        for current_trial in trials:
+            if self.keep_trial(current_trial):
+                yield current_trial
+
+    def tst_try_iter(self):
+        trials = super(SpeakerSpottingIntraSite, self).tst_try_iter()
+        for current_trial in trials:
+            if self.keep_trial(current_trial):
+                yield current_trial
+
+
+class SpeakerSpottingInterSite(SpeakerSpottingIntraSite):
+
+    def keep_trial(self, current_trial):
+
+        # keep all target trials
+        if current_trial['reference']:
+            return True
+
+        # only keep "different sites" non-target trials
+        model_site = current_trial['model_id'][1]
+        trial_site = current_trial['uri'][0]
+        return model_site != trial_site
+
+    def _keep_trials(self, trials, reference):
+        return reference | ~_same_site(trials)
+
+
+class AMI(Database):
+    """AMI corpus"""
+
+    def __init__(self, preprocessors={}, warmup=False, **kwargs):
+        super(AMI, self).__init__(preprocessors=preprocessors, **kwargs)
+
+        # set `warmup` to True (or to a list of subsets, e.g. ['train']) to
+        # start loading metadata tables in the background (see AMI.cache)
+        if warmup:
+            from .cache import warmup as warmup_cache
+            if warmup is True:
+                warmup_cache()
+            else:
+                warmup_cache(subsets=warmup)
+
+        self.register_protocol(
+            'SpeakerDiarization', 'MixHeadset', SpeakerDiarization)
+
+        self.register_protocol(
+            'SpeakerSpotting', 'MixHeadset', SpeakerSpotting)
+
+        self.register_protocol(
+            'SpeakerSpotting', 'MixHeadsetIntraSite', SpeakerSpottingIntraSite)
+
+        self.register_protocol(
+            'SpeakerSpotting', 'MixHeadsetInterSite', SpeakerSpottingInterSite)
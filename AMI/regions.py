@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Overlapped speech regions and speaker change points
+
+Both are computed once per subset, with a vectorized sweep over sorted turn
+boundaries (see AMI.turns.sweep), and cached on disk.
+"""
+
+import os
+import numpy as np
+from pyannote.core.segment import SEGMENT_PRECISION
+
+from .util import get_cache_dir
+from .turns import sweep
+from .metadata import merge
+
+# bump whenever cached regions change
+FORMAT = 3
+
+
+def overlap_regions(start, end, label):
+    """Get regions where at least two speakers speak
+
+    Turns of the same speaker are merged first, so that overlapping turns
+    of a single speaker are not counted as overlapped speech.
+
+    Parameters
+    ----------
+    start, end : (n, ) float np.ndarray
+    label : (n, ) int np.ndarray
+
+    Returns
+    -------
+    regions : (k, 2) float np.ndarray
+        Sorted, non-overlapping (start, end) regions.
+    """
+    _, start, end = merge(label, start, end)
+    boundaries, count = sweep(start, end)
+    overlap = (count > 1) & \
+        (boundaries[1:] - boundaries[:-1] > SEGMENT_PRECISION)
+    s, e = boundaries[:-1][overlap], boundaries[1:][overlap]
+
+    # merge regions that touch (up to SEGMENT_PRECISION), like
+    # pyannote.core.Timeline.support does
+    new = np.ones(len(s), dtype=bool)
+    new[1:] = s[1:] - e[:-1] > SEGMENT_PRECISION
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(s)) - 1
+    return np.stack([s[first], e[last]], axis=1)
+
+
+def change_points(start, end):
+    """Get sorted, unique, speech turn boundaries"""
+    return np.unique(np.concatenate([start, end]))
+
+
+def load_regions(Annotations, key):
+    """Load (or compute and cache) overlap regions and change points
+
+    Parameters
+    ----------
+    Annotations : AMI.turns.Turns
+        Speech turns table.
+    key : str
+        Cache key. Should change when speech turns change.
+
+    Returns
+    -------
+    regions : dict
+        Maps raw uri to (overlap, change) tuple where overlap is a (k, 2)
+        array of regions and change a (c, ) array of timestamps.
+    """
+
+    path = get_cache_dir() / 'regions' / f'{key}.{FORMAT}.npz'
+    uris = list(Annotations.groups(by='uri'))
+
+    try:
+        cached = np.load(path)
+        overlap, change = cached['overlap'], cached['change']
+        overlap_bounds = cached['overlap_bounds']
+        change_bounds = cached['change_bounds']
+
+    except (OSError, ValueError, KeyError):
+        overlap, change = [], []
+        for indices in Annotations.groups(by='uri').values():
+            start = Annotations.start[indices]
+            end = Annotations.end[indices]
+            label = Annotations.label[indices]
+            overlap.append(overlap_regions(start, end, label))
+            change.append(change_points(start, end))
+
+        overlap_bounds = np.cumsum([0] + [len(o) for o in overlap])
+        change_bounds = np.cumsum([0] + [len(c) for c in change])
+        overlap = np.concatenate(overlap) if overlap else np.zeros((0, 2))
+        change = np.concatenate(change) if change else np.zeros(0)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp.npz')
+        np.savez(tmp, overlap=overlap, change=change,
+                 overlap_bounds=overlap_bounds, change_bounds=change_bounds)
+        os.replace(tmp, path)
+
+    return {uri: (overlap[overlap_bounds[u]:overlap_bounds[u + 1]],
+                  change[change_bounds[u]:change_bounds[u + 1]])
+            for u, uri in enumerate(uris)}
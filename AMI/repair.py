@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Repair malformed AMI wav headers in place
+
+Usage: python -m AMI.repair [--dry-run] [--workers=<n>] <amicorpus>
+
+Only the RIFF and "data" chunk size fields are patched (through a memory
+map), so repairing a file touches a few bytes instead of rewriting it.
+Repaired uris are printed on standard output.
+"""
+
+import sys
+import mmap
+import struct
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from .finder import AudioFinder
+from .wav import HEADER_SIZE
+from .wav import TAIL_SIZE
+from .wav import parse_header
+from .wav import get_data_size
+from .wav import find_data_end
+
+
+def repair(path, dry_run=False):
+    """Patch RIFF and "data" chunk sizes of wav file in place
+
+    Parameters
+    ----------
+    path : str or Path
+    dry_run : bool, optional
+        Only check whether file needs to be repaired.
+
+    Returns
+    -------
+    repaired : bool
+        True when file was (or, in dry-run mode, would have been) repaired.
+    """
+
+    with open(path, 'rb' if dry_run else 'r+b') as fp:
+        access = mmap.ACCESS_READ if dry_run else mmap.ACCESS_WRITE
+        with mmap.mmap(fp.fileno(), 0, access=access) as buf:
+
+            file_size = len(buf)
+            header = parse_header(buf[:HEADER_SIZE])
+            tail_offset = max(header.data_offset, file_size - TAIL_SIZE)
+            tail = buf[tail_offset:]
+            data_size = get_data_size(header, file_size, tail=tail,
+                                      tail_offset=tail_offset)
+            # audio data is followed by a pad byte when its size is odd
+            data_end = header.data_offset + data_size + (data_size % 2)
+
+            # a file is well-formed when "data" chunk size is correct and
+            # RIFF chunk covers either the whole file (e.g. when there are
+            # trailing chunks) or stops right after audio data.
+            riff_end = header.riff_size + 8
+            riff_ok = riff_end in (file_size, data_end)
+            data_ok = header.data_size == data_size
+
+            if riff_ok and data_ok:
+                return False
+
+            if not dry_run:
+                # keep trailing chunks (if any) inside RIFF chunk
+                trailing = find_data_end(header, file_size, tail=tail,
+                                         tail_offset=tail_offset)
+                riff_end = file_size if trailing == data_end else data_end
+                struct.pack_into('<I', buf, 4, riff_end - 8)
+                struct.pack_into('<I', buf, header.data_offset - 4, data_size)
+                buf.flush()
+
+    return True
+
+
+def repair_all(paths, dry_run=False, workers=8):
+    """Repair wav files in parallel
+
+    Parameters
+    ----------
+    paths : dict
+        uri → path mapping (e.g. AudioFinder(root).paths)
+    dry_run : bool, optional
+        Only check which files need to be repaired.
+    workers : int, optional
+        Number of files processed concurrently. Defaults to 8.
+
+    Returns
+    -------
+    repaired : list
+        Sorted list of repaired uris.
+    failed : dict
+        Maps uri to exception for files that could not be parsed.
+    """
+
+    failed = {}
+
+    def task(uri):
+        try:
+            return repair(paths[uri], dry_run=dry_run)
+        except Exception as e:
+            failed[uri] = e
+            return False
+
+    uris = sorted(paths)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        repaired = [uri for uri, done in zip(uris, executor.map(task, uris))
+                    if done]
+
+    return repaired, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Repair malformed AMI wav headers in place.')
+    parser.add_argument('root', help='path to "amicorpus" directory')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='only report files that need to be repaired')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='number of files processed concurrently')
+    args = parser.parse_args()
+
+    paths = AudioFinder(args.root, cache=False, strict=False).paths
+    repaired, failed = repair_all(paths, dry_run=args.dry_run,
+                                  workers=args.workers)
+
+    for uri in repaired:
+        print(uri)
+    for uri, e in sorted(failed.items()):
+        print(f'{uri}: could not be repaired ({e})', file=sys.stderr)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Training samplers built directly on AMI metadata tables
+
+Samplers never build pyannote.core objects: they work on the columnar
+tables (see AMI.turns) that AMI protocols load.
+"""
+
+import os
+import numpy as np
+
+from .util import get_cache_dir
+from .turns import sweep
+from .metadata import merge
+from .columnar import ColumnarAnnotation
+from .columnar import get_codes
+
+
+class ChunkSampler:
+    """Draw fixed-duration chunks uniformly over annotated regions
+
+    A cumulative-duration index over all annotated segments is built once,
+    so that drawing a batch of chunks is a vectorized binary search.
+
+    Parameters
+    ----------
+    protocol : AMI.SpeakerDiarization
+        Any AMI protocol.
+    subset : {'train', 'development', 'test'}, optional
+        Defaults to 'train'.
+    duration : float, optional
+        Chunk duration, in seconds. Defaults to 2.
+    seed : int, optional
+        Random seed.
+
+    Usage
+    -----
+    >>> sampler = ChunkSampler(protocol, duration=2., seed=42)
+    >>> uri, start, end = sampler.sample(32)
+    >>> labels = sampler.labels(uri[0], start[0], end[0])
+    """
+
+    def __init__(self, protocol, subset='train', duration=2., seed=None):
+
+        from .protocols import _SUBSETS
+
+        self.protocol = protocol
+        self.subset = subset
+        self.duration = duration
+
+        data = protocol._load_data(_SUBSETS[subset])
+        Annotated = data['annotated']
+        self._annotation = data['annotation']
+        self._groups = self._annotation.groups(by='uri')
+        self._codes = get_codes(self._annotation.labels)
+
+        # a chunk fits in an annotated segment when it starts within its
+        # first (segment duration - chunk duration) seconds
+        room = Annotated.end - Annotated.start - duration
+        keep = room > 0
+        if not np.any(keep):
+            msg = f'No annotated segment is longer than {duration}s.'
+            raise ValueError(msg)
+
+        self._uri = Annotated.uri[keep]
+        self._start = Annotated.start[keep]
+        self._room = room[keep]
+        self._cumsum = np.cumsum(self._room)
+        self.uris = [f'{raw_uri}.Mix-Headset' for raw_uri in Annotated.uris]
+        self._raw_uris = Annotated.uris
+
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+
+    def sample(self, batch_size):
+        """Draw a batch of chunks
+
+        Returns
+        -------
+        uri : (batch_size, ) int np.ndarray
+            Codes into `uris` attribute.
+        start, end : (batch_size, ) float np.ndarray
+            Chunk boundaries, in seconds.
+        """
+        t = self._rng.uniform(0., self._cumsum[-1], size=batch_size)
+        i = np.searchsorted(self._cumsum, t, side='right')
+        i = np.minimum(i, len(self._cumsum) - 1)
+        start = self._start[i] + (t - (self._cumsum[i] - self._room[i]))
+        return self._uri[i], start, start + self.duration
+
+    def __iter__(self):
+        """Iterate over (uri, start, end) chunks forever"""
+        while True:
+            uri, start, end = self.sample(1024)
+            for u, s, e in zip(uri.tolist(), start.tolist(), end.tolist()):
+                yield self.uris[u], s, e
+
+    def labels(self, uri, start, end):
+        """Get speech turns of a chunk
+
+        Parameters
+        ----------
+        uri : int or str
+            Code into `uris`, or uri.
+        start, end : float
+
+        Returns
+        -------
+        annotation : AMI.columnar.ColumnarAnnotation
+            Speech turns, cropped to the chunk.
+        """
+        if not isinstance(uri, str):
+            uri = self.uris[uri]
+        raw_uri = uri.split('.')[0]
+        indices = self._groups.get(raw_uri, np.array([], dtype=int))
+
+        # only keep turns overlapping the chunk before cropping
+        Annotations = self._annotation
+        overlap = (Annotations.start[indices] < end) & \
+            (Annotations.end[indices] > start)
+        indices = indices[overlap]
+
+        from pyannote.core import Segment
+        annotation = ColumnarAnnotation(uri,
+                                        Annotations.start[indices],
+                                        Annotations.end[indices],
+                                        Annotations.label[indices],
+                                        Annotations.labels,
+                                        codes=self._codes)
+        return annotation.crop(Segment(start=start, end=end))
+
+
+def _single_speaker_turns(Annotations, groups):
+    """Remove overlapped speech from speech turns
+
+    Returns
+    -------
+    uri, label : int np.ndarray
+    start, end : float np.ndarray
+        Non-overlapped speech turns.
+    """
+
+    uri, label, start, end = [], [], [], []
+    for indices in groups.values():
+        if len(indices) == 0:
+            continue
+        # overlapping turns of the same speaker are not overlapped speech
+        turns = merge(Annotations.label[indices],
+                      Annotations.start[indices], Annotations.end[indices])
+        boundaries, count, active = sweep(turns[1], turns[2], turns[0])
+        single = (count == 1) & (boundaries[1:] > boundaries[:-1])
+        s, e, l = boundaries[:-1][single], boundaries[1:][single], \
+            active[single]
+
+        # merge contiguous regions of the same speaker
+        new = np.ones(len(s), dtype=bool)
+        new[1:] = (s[1:] != e[:-1]) | (l[1:] != l[:-1])
+        first = np.flatnonzero(new)
+        last = np.append(first[1:], len(s)) - 1
+
+        uri.append(np.full(len(first), Annotations.uri[indices[0]]))
+        label.append(l[first])
+        start.append(s[first])
+        end.append(e[last])
+
+    return (np.concatenate(uri), np.concatenate(label),
+            np.concatenate(start), np.concatenate(end))
+
+
+class SpeakerSampler:
+    """Draw speaker-balanced batches of speech segments
+
+    Each batch is made of `num_speakers` speakers with `per_speaker`
+    segments each. Segments of a speaker are drawn with probability
+    proportional to their duration, using a speaker → (turns, cumulative
+    speech duration) index built from the MDTM table and cached on disk.
+
+    Parameters
+    ----------
+    protocol : AMI.SpeakerDiarization
+        Any AMI protocol.
+    subset : {'train', 'development', 'test'}, optional
+        Defaults to 'train'.
+    num_speakers : int, optional
+        Number of speakers per batch. Defaults to 8.
+    per_speaker : int, optional
+        Number of segments per speaker. Defaults to 4.
+    duration : float, optional
+        When provided, segments are chunks of `duration` seconds drawn
+        uniformly within speech turns. Defaults to whole speech turns.
+    min_duration : float, optional
+        Ignore speech turns shorter than this. Defaults to `duration`
+        (or 0 when `duration` is not provided).
+    exclude_overlap : bool, optional
+        Remove overlapped speech regions from speech turns. Defaults to False.
+    seed : int, optional
+        Random seed.
+
+    Usage
+    -----
+    >>> sampler = SpeakerSampler(protocol, num_speakers=8, per_speaker=4,
+    ...                          duration=2., exclude_overlap=True)
+    >>> label, uri, start, end = sampler.sample()
+    >>> speakers = [sampler.labels[code] for code in label]
+    """
+
+    def __init__(self, protocol, subset='train', num_speakers=8, per_speaker=4,
+                 duration=None, min_duration=None, exclude_overlap=False,
+                 seed=None):
+
+        from .protocols import _SUBSETS
+        subset = _SUBSETS[subset]
+
+        self.num_speakers = num_speakers
+        self.per_speaker = per_speaker
+        self.duration = duration
+        if min_duration is None:
+            min_duration = 0. if duration is None else duration
+        self.min_duration = min_duration
+        self.exclude_overlap = exclude_overlap
+
+        data = protocol._load_data(subset)
+        Annotations = data['annotation']
+        self.labels = Annotations.labels
+        self.uris = [f'{raw_uri}.Mix-Headset' for raw_uri in Annotations.uris]
+
+        from .snapshot import get_key
+        key = get_key(protocol._data_dir, subset, 'files')[:16]
+        # turns are filtered with both `min_duration` and `duration`
+        chunk = 'turns' if duration is None else f'{duration:g}'
+        path = get_cache_dir() / 'speakers' / \
+            f'{key}.{subset}.{min_duration:g}.{chunk}.' \
+            f'{int(exclude_overlap)}.npz'
+
+        try:
+            index = np.load(path)
+            self._uri, self._label = index['uri'], index['label']
+            self._start, self._end = index['start'], index['end']
+        except (OSError, ValueError, KeyError):
+            self._build_index(Annotations)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            with open(tmp, 'wb') as fp:
+                np.savez(fp, uri=self._uri, label=self._label,
+                         start=self._start, end=self._end)
+            os.replace(tmp, path)
+
+        # cumulative weight of speech turns, sorted by speaker
+        weight = self._end - self._start
+        if self.duration is not None:
+            weight = weight - self.duration
+        self._weight = weight
+        self._cumsum = np.cumsum(weight)
+        self._bounds = np.searchsorted(self._label,
+                                       np.arange(len(self.labels) + 1))
+
+        # speakers with at least one usable turn
+        self._speakers = np.flatnonzero(np.diff(self._bounds) > 0)
+        if len(self._speakers) < num_speakers:
+            msg = (f'Only {len(self._speakers)} speakers have turns longer '
+                   f'than {min_duration}s.')
+            raise ValueError(msg)
+
+        self._rng = np.random.default_rng(seed)
+
+    def _build_index(self, Annotations):
+
+        groups = Annotations.groups(by='uri')
+        if self.exclude_overlap:
+            uri, label, start, end = _single_speaker_turns(Annotations,
+                                                           groups)
+        else:
+            uri, label = Annotations.uri, Annotations.label
+            start, end = Annotations.start, Annotations.end
+
+        # keep long enough turns (and strictly longer than chunks)
+        duration = end - start
+        keep = duration >= self.min_duration
+        if self.duration is not None:
+            keep &= duration > self.duration
+        uri, label, start, end = uri[keep], label[keep], start[keep], end[keep]
+
+        order = np.argsort(label, kind='stable')
+        self._uri = uri[order].astype(np.int32)
+        self._label = label[order].astype(np.int32)
+        self._start = start[order]
+        self._end = end[order]
+
+    def sample(self):
+        """Draw a batch
+
+        Returns
+        -------
+        label : (num_speakers x per_speaker, ) int np.ndarray
+            Codes into `labels` attribute.
+        uri : (num_speakers x per_speaker, ) int np.ndarray
+            Codes into `uris` attribute.
+        start, end : (num_speakers x per_speaker, ) float np.ndarray
+        """
+
+        speakers = self._rng.choice(self._speakers, size=self.num_speakers,
+                                    replace=False)
+        speakers = np.repeat(speakers, self.per_speaker)
+
+        # draw uniformly within each speaker cumulative weight range
+        first, last = self._bounds[speakers], self._bounds[speakers + 1]
+        low = np.where(first > 0, self._cumsum[first - 1], 0.)
+        high = self._cumsum[last - 1]
+        t = self._rng.uniform(low, high)
+        i = np.searchsorted(self._cumsum, t, side='right')
+        i = np.clip(i, first, last - 1)
+
+        start, end = self._start[i], self._end[i]
+        if self.duration is not None:
+            offset = t - (self._cumsum[i] - self._weight[i])
+            start = start + np.clip(offset, 0., self._weight[i])
+            end = start + self.duration
+
+        return self._label[i], self._uri[i], start, end
+
+    def __iter__(self):
+        """Iterate over batches forever"""
+        while True:
+            yield self.sample()
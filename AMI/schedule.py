@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Duration-aware scheduling of protocol items across workers
+
+Items (files, sessions, or trials) are assigned to workers with the longest
+processing time (LPT) first rule, using their annotated duration as cost:
+items are sorted by decreasing duration and each one goes to the least
+loaded worker. Long files can optionally be split at annotated segment
+boundaries beforehand.
+
+>>> from AMI.schedule import Schedule
+>>> schedule = Schedule(protocol, subset='train', num_workers=8)
+>>> schedule.makespan            # duration processed by the busiest worker
+>>> for current_file in schedule.iter(rank):  # in worker `rank`
+...     pass
+"""
+
+import heapq
+
+import numpy as np
+from pyannote.core import Segment, Timeline
+from pyannote.core.segment import SEGMENT_PRECISION
+
+from .columnar import ColumnarTimeline
+
+
+def lpt(durations, num_workers):
+    """Longest processing time first assignment
+
+    Parameters
+    ----------
+    durations : (n, ) float np.ndarray
+    num_workers : int
+
+    Returns
+    -------
+    assignment : (n, ) int np.ndarray
+        Worker of each item.
+    loads : (num_workers, ) float np.ndarray
+        Total duration assigned to each worker.
+    """
+
+    durations = np.asarray(durations, dtype=np.float64)
+    assignment = np.empty(len(durations), dtype=np.int64)
+
+    # ties are broken by item and worker index, for reproducibility
+    heap = [(0., worker) for worker in range(num_workers)]
+    order = np.argsort(-durations, kind='stable')
+    for index, duration in zip(order.tolist(), durations[order].tolist()):
+        load, worker = heapq.heappop(heap)
+        assignment[index] = worker
+        heapq.heappush(heap, (load + duration, worker))
+
+    loads = np.bincount(assignment, weights=durations, minlength=num_workers)
+    return assignment, loads
+
+
+def split_segments(segments, max_duration):
+    """Group consecutive segments into parts of at most `max_duration`
+
+    Segments longer than `max_duration` make their own part.
+
+    Returns
+    -------
+    parts : list of lists of (start, end) tuples
+    """
+
+    parts, part, duration = [], [], 0.
+    for start, end in segments:
+        if part and duration + end - start > max_duration:
+            parts.append(part)
+            part, duration = [], 0.
+        part.append((start, end))
+        duration += end - start
+    if part:
+        parts.append(part)
+    return parts
+
+
+class Schedule:
+    """Assignment of protocol items to workers
+
+    Parameters
+    ----------
+    protocol : AMI protocol
+        Speaker diarization protocols schedule files, speaker spotting
+        protocols schedule sessions (or trials).
+    subset : {'train', 'development', 'test'}, optional
+        Defaults to 'train'.
+    num_workers : int, optional
+        Defaults to 2.
+    trials : bool, optional
+        Schedule trials of speaker spotting protocols instead of sessions.
+    split : bool or float, optional
+        Split files whose annotated duration exceeds `split` seconds (or
+        total duration divided by `num_workers` when True) at annotated
+        segment boundaries. Parts are yielded as files whose 'annotated'
+        only contains their own segments. Defaults to not split files.
+
+    Attributes
+    ----------
+    durations : (n, ) np.ndarray
+        Duration of each (possibly split) item.
+    assignment : (n, ) np.ndarray
+        Worker of each item.
+    loads : (num_workers, ) np.ndarray
+        Total duration assigned to each worker.
+    makespan : float
+        Total duration assigned to the busiest worker.
+    """
+
+    def __init__(self, protocol, subset='train', num_workers=2,
+                 trials=False, split=False):
+
+        self.protocol = protocol
+        self.subset = subset
+        self.num_workers = num_workers
+        self.trials = trials
+
+        from .protocols import SpeakerSpotting
+        files = not isinstance(protocol, SpeakerSpotting)
+
+        if trials:
+            durations = protocol.metadata(subset, trials=True)['annotated']
+        else:
+            durations = protocol.metadata(subset)['annotated']
+
+        # (item index, segments) for each part, segments being None for
+        # whole items
+        self._parts = [(index, None) for index in range(len(durations))]
+
+        # only files can be split (sessions are 60s long already)
+        if split and files:
+            if split is True:
+                split = np.sum(durations) / num_workers
+            self._parts, durations = self._split(split)
+
+        self.durations = np.asarray(durations, dtype=np.float64)
+        self.assignment, self.loads = lpt(self.durations, num_workers)
+        self.makespan = float(np.max(self.loads, initial=0.))
+
+    def _split(self, max_duration):
+
+        from .protocols import _SUBSETS
+
+        Annotated = self.protocol._load_table(_SUBSETS[self.subset],
+                                              'annotated')
+        groups = Annotated.groups(by='uri')
+
+        parts, durations = [], []
+        for index, raw_uri in enumerate(Annotated.uris):
+            rows = groups[raw_uri]
+            # pyannote.core timelines iterate over sorted, non-empty, segments
+            segments = sorted(set(zip(Annotated.start[rows].tolist(),
+                                      Annotated.end[rows].tolist())))
+            segments = [(start, end) for start, end in segments
+                        if end - start > SEGMENT_PRECISION]
+            split = split_segments(segments, max_duration)
+            for part in split:
+                parts.append((index, part if len(split) > 1 else None))
+                durations.append(sum(end - start for start, end in part))
+
+        return parts, durations
+
+    def __len__(self):
+        return len(self._parts)
+
+    def indices(self, rank):
+        """Indices of items assigned to worker `rank`, in iteration order"""
+        return np.flatnonzero(self.assignment == rank)
+
+    def iter(self, rank, seed=None, epoch=0):
+        """Iterate over (preprocessed) items assigned to worker `rank`
+
+        Parameters
+        ----------
+        rank : int
+        seed : int, optional
+            Shuffle items of worker `rank` with this seed (see
+            `AMI.shuffle.permutation`). Defaults to iteration order.
+        epoch : int, optional
+            Epoch of the shuffle. Defaults to 0.
+        """
+
+        protocol = self.protocol
+        indices = self.indices(rank)
+        if seed is not None:
+            from .shuffle import permutation
+            indices = indices[permutation(len(indices), seed, epoch=epoch)]
+        parts = [self._parts[index] for index in indices.tolist()]
+        items = protocol._iter_items(self.subset,
+                                     [index for index, _ in parts],
+                                     trials=self.trials)
+
+        columnar = getattr(protocol, 'columnar', False)
+        for (_, segments), current_item in zip(parts, items):
+            if segments is not None:
+                uri = current_item['uri']
+                if columnar:
+                    start, end = np.array(segments).T
+                    annotated = ColumnarTimeline(uri, start, end)
+                else:
+                    annotated = Timeline(uri=uri, segments=[
+                        Segment(start=start, end=end)
+                        for start, end in segments])
+                current_item['annotated'] = annotated
+            yield protocol.preprocess(current_item)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Shared-memory publication of metadata tables
+
+Multi-process data loaders (e.g. PyTorch DataLoader with many workers) would
+otherwise parse metadata files, and keep their own copy of the resulting
+tables, in every worker. Instead, the parent process parses them once and
+publishes their arrays in a single shared memory block:
+
+>>> from AMI.shared import publish
+>>> protocol.shared = publish()
+
+Protocols (and their copies in worker processes, whether forked or spawned)
+then attach to the block by name, and get tables whose arrays are zero-copy
+views into shared memory. The block is unlinked when the parent exits.
+
+Requires Python 3.8 (multiprocessing.shared_memory).
+"""
+
+import os
+import atexit
+from pathlib import Path
+
+import numpy as np
+
+from .util import DATA_DIR
+from .util import SUBSETS
+from .turns import Turns
+from .turns import Trials
+from .turns import TABLES
+
+
+_TURNS_ARRAYS = ('uri', 'label', 'start', 'end', 'uri_order', 'label_order')
+_TRIALS_ARRAYS = ('model', 'uri', 'start', 'end', 'target')
+
+_ALIGNMENT = 64
+
+
+def _arrays(table):
+    """Get named arrays of a table (including Turns group orders)"""
+    if isinstance(table, Trials):
+        return {name: getattr(table, name) for name in _TRIALS_ARRAYS}
+    arrays = {name: getattr(table, name) for name in _TURNS_ARRAYS[:4]}
+    arrays['uri_order'] = table.group_order('uri')
+    arrays['label_order'] = table.group_order('label')
+    return arrays
+
+
+class _View:
+    """Read-only array interface to part of a shared memory block
+
+    Arrays built from it keep a reference to the block, so that it remains
+    mapped as long as they are in use.
+    """
+
+    def __init__(self, shm, offset, dtype, length):
+        self.shm = shm
+        address = np.frombuffer(shm.buf, dtype=np.uint8).ctypes.data
+        self.__array_interface__ = {'version': 3,
+                                    'data': (address + offset, True),
+                                    'typestr': dtype,
+                                    'shape': (length, )}
+
+
+class SharedTables:
+    """Metadata tables published in shared memory
+
+    Use `publish` to create one. Instances are cheap to pickle: only the
+    name of the shared memory block and the table layouts are transferred,
+    and tables are attached on first access.
+
+    Parameters
+    ----------
+    name : str
+        Shared memory block name.
+    data_dir : Path
+        Metadata directory tables were read from.
+    layout : dict
+        Maps (subset, kind) to (vocabularies, arrays) where `arrays` maps
+        array names to (offset, dtype, length) in the block.
+    """
+
+    def __init__(self, name, data_dir, layout):
+        self.name = name
+        self.data_dir = Path(data_dir)
+        self.layout = layout
+        self._owner = None
+        self._shm = None
+        self._tables = {}
+
+    def __getstate__(self):
+        return {'name': self.name,
+                'data_dir': self.data_dir,
+                'layout': self.layout}
+
+    def __setstate__(self, state):
+        self.__init__(state['name'], state['data_dir'], state['layout'])
+
+    def _attach(self):
+        if self._shm is None:
+            from multiprocessing.shared_memory import SharedMemory
+            self._shm = SharedMemory(name=self.name)
+        return self._shm
+
+    def get(self, subset, kind):
+        """Get published table
+
+        Returns
+        -------
+        table : AMI.turns.Turns or AMI.turns.Trials
+            None when table was not published.
+        """
+
+        key = (subset, kind)
+        if key not in self.layout:
+            return None
+
+        if key not in self._tables:
+            shm = self._attach()
+            vocabularies, layout = self.layout[key]
+            arrays = {name: np.asarray(_View(shm, offset, dtype, length))
+                      for name, (offset, dtype, length) in layout.items()}
+
+            if kind == 'trials':
+                table = Trials(vocabularies['models'], vocabularies['uris'],
+                               *(arrays[name] for name in _TRIALS_ARRAYS))
+            else:
+                table = Turns(vocabularies['uris'], vocabularies['labels'],
+                              *(arrays[name] for name in _TURNS_ARRAYS[:4]))
+                table.set_group_order('uri', arrays['uri_order'])
+                table.set_group_order('label', arrays['label_order'])
+            self._tables[key] = table
+
+        return self._tables[key]
+
+    @property
+    def nbytes(self):
+        return self._attach().size
+
+    def close(self):
+        """Detach (and unlink the block if called by the publisher)"""
+
+        # the block itself is unmapped once no table array references it
+        self._tables.clear()
+        if self._shm is None:
+            return
+
+        if self._owner == os.getpid():
+            self._shm.unlink()
+            self._owner = None
+        self._shm = None
+
+
+def publish(data_dir=None, subsets=SUBSETS, kinds=TABLES):
+    """Parse metadata tables once and publish them in shared memory
+
+    Parameters
+    ----------
+    data_dir : Path, optional
+        Metadata directory. Defaults to bundled metadata.
+    subsets : iterable, optional
+        Subsets to publish. Defaults to all of them.
+    kinds : iterable, optional
+        Tables to publish, among 'annotated', 'annotation', 'enrolments'
+        and 'trials'. Defaults to all of them. Missing files are skipped.
+
+    Returns
+    -------
+    shared : SharedTables
+        To be set as the `shared` attribute of protocols. The shared memory
+        block is unlinked when the calling process exits (or when `close()`
+        is called).
+    """
+
+    from multiprocessing.shared_memory import SharedMemory
+
+    data_dir = Path(DATA_DIR if data_dir is None else data_dir)
+
+    tables = {}
+    for subset in subsets:
+        for kind in kinds:
+            source, read = TABLES[kind]
+            path = data_dir / source.format(subset=subset)
+            if path.exists():
+                tables[subset, kind] = read(path)
+
+    # compute layout
+    size = 0
+    layout, buffers = {}, []
+    for key, table in tables.items():
+        if isinstance(table, Trials):
+            vocabularies = {'models': table.models, 'uris': table.uris}
+        else:
+            vocabularies = {'uris': table.uris, 'labels': table.labels}
+        arrays = {}
+        for name, array in _arrays(table).items():
+            size = -(-size // _ALIGNMENT) * _ALIGNMENT
+            arrays[name] = (size, array.dtype.str, len(array))
+            buffers.append((size, array))
+            size += array.nbytes
+        layout[key] = (vocabularies, arrays)
+
+    # copy arrays into shared memory
+    shm = SharedMemory(create=True, size=max(size, 1))
+    for offset, array in buffers:
+        shm.buf[offset:offset + array.nbytes] = array.tobytes()
+
+    shared = SharedTables(shm.name, data_dir, layout)
+    shared._shm = shm
+    shared._owner = os.getpid()
+    atexit.register(shared.close)
+    return shared
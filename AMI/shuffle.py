@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Deterministic shuffled iteration
+
+Protocol items (files, sessions, or trials) are shuffled by permuting their
+indices: only the item being yielded is built, the protocol is never
+materialized. Permutations only depend on the seed and the epoch, so that
+every process (e.g. every worker of a distributed training) agrees on them,
+and the permutation of each epoch is split into disjoint shards.
+
+>>> from AMI.shuffle import Shuffle
+>>> files = Shuffle(protocol, subset='train', seed=42,
+...                 rank=rank, num_shards=world_size)
+>>> for epoch in range(num_epochs):
+...     files.set_epoch(epoch)
+...     for current_file in files:
+...         pass
+"""
+
+import numpy as np
+
+
+def permutation(n, seed, epoch=0):
+    """Permutation of `n` indices, for a given seed and epoch
+
+    Parameters
+    ----------
+    n : int
+    seed : int
+    epoch : int, optional
+        Defaults to 0.
+
+    Returns
+    -------
+    permutation : (n, ) int np.ndarray
+    """
+    # seeding with (seed, epoch) gives independent, reproducible, streams
+    rng = np.random.default_rng([seed, epoch])
+    return rng.permutation(n)
+
+
+class Shuffle:
+    """Shuffled iteration over protocol items
+
+    Parameters
+    ----------
+    protocol : AMI protocol
+        Speaker diarization protocols shuffle files, speaker spotting
+        protocols shuffle sessions (or trials).
+    subset : {'train', 'development', 'test'}, optional
+        Defaults to 'train'.
+    seed : int, optional
+        Defaults to 0.
+    trials : bool, optional
+        Shuffle trials of speaker spotting protocols instead of sessions.
+    rank : int, optional
+        Shard to iterate over. Defaults to 0.
+    num_shards : int, optional
+        Number of disjoint shards of every epoch. Defaults to 1.
+
+    Attributes
+    ----------
+    epoch : int
+        Current epoch. Defaults to 0.
+    """
+
+    def __init__(self, protocol, subset='train', seed=0, trials=False,
+                 rank=0, num_shards=1):
+
+        if not 0 <= rank < num_shards:
+            msg = f'Rank must be in [0, {num_shards}) (not {rank}).'
+            raise ValueError(msg)
+
+        self.protocol = protocol
+        self.subset = subset
+        self.seed = seed
+        self.trials = trials
+        self.rank = rank
+        self.num_shards = num_shards
+        self.epoch = 0
+        self._length = protocol._num_items(subset, trials=trials)
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def indices(self, epoch=None):
+        """Indices of items of current shard, in iteration order
+
+        Parameters
+        ----------
+        epoch : int, optional
+            Defaults to current epoch.
+        """
+        epoch = self.epoch if epoch is None else epoch
+        indices = permutation(self._length, self.seed, epoch=epoch)
+        return indices[self.rank::self.num_shards]
+
+    def __len__(self):
+        return len(range(self.rank, self._length, self.num_shards))
+
+    def __iter__(self):
+        """Iterate over (preprocessed) items of current shard and epoch"""
+        protocol = self.protocol
+        items = protocol._iter_items(self.subset, self.indices().tolist(),
+                                     trials=self.trials)
+        for current_item in items:
+            yield protocol.preprocess(current_item)
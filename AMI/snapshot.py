@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Precompiled protocol snapshots
+
+Usage: python -m AMI.snapshot [--data-dir=<path>]
+
+Protocol items (speaker diarization files, speaker spotting enrolments, and
+speaker spotting trial references) are deterministic functions of the text
+metadata. Snapshots store them, already built, in one binary file per subset
+and kind of item, along with an offset index so that items are unpickled one
+at a time, on demand.
+
+Snapshots are stored in <data_dir>/snapshot, and are built at install time
+for the bundled metadata. They are keyed by a hash of the text files they
+were built from, of the code that builds them, the versions of this package
+and of pyannote.core, and the snapshot format version: protocols silently
+fall back to text files when keys do not match.
+"""
+
+import os
+import sys
+import mmap
+import json
+import pickle
+import struct
+import hashlib
+import argparse
+import tempfile
+from functools import partial
+from array import array
+from pathlib import Path
+
+from pyannote.core import Segment, Timeline, Annotation
+
+from .util import DATA_DIR
+from .lazy import LazyFile
+
+
+FORMAT_VERSION = 2
+
+MAGIC = b'AMISNAP'
+
+KINDS = {
+    # kind: (subsets, source files)
+    'files': (('trn', 'dev', 'tst'), ('speaker_diarization/{subset}.uem',
+                                      'speaker_diarization/{subset}.mdtm')),
+    'enrolments': (('dev', 'tst'), ('speaker_spotting/{subset}.enrol.txt',)),
+    'trials': (('dev', 'tst'), ('speaker_diarization/{subset}.mdtm',
+                                'speaker_spotting/{subset}.trial.txt')),
+}
+
+_KEYS = {}
+
+
+# items are pickled as is, except for files and (numerous) trials that are
+# stored as plain tuples to keep snapshots small, and rebuilt when loaded.
+# files are stored as (uri, annotated segments, annotation tracks) tuples so
+# that 'annotated' and 'annotation' can still be built on first access.
+
+def _encode_file(current_file):
+    annotated = [(segment.start, segment.end)
+                 for segment in current_file['annotated']]
+    tracks = [(segment.start, segment.end, track, label)
+              for segment, track, label
+              in current_file['annotation'].itertracks(yield_label=True)]
+    return (current_file['uri'], annotated, tracks)
+
+
+def _build_annotated(uri, segments):
+    segments = [Segment(start=s, end=e) for s, e in segments]
+    return Timeline(uri=uri, segments=segments)
+
+
+def _build_annotation(uri, tracks):
+    annotation = Annotation(uri=uri)
+    for start, end, track, label in tracks:
+        annotation[Segment(start=start, end=end), track] = label
+    return annotation
+
+
+def _decode_file(record):
+    uri, annotated, tracks = record
+    return {'database': 'AMI',
+            'uri': uri,
+            'annotated': _build_annotated(uri, annotated),
+            'annotation': _build_annotation(uri, tracks)}
+
+
+def _decode_lazy_file(record):
+    uri, annotated, tracks = record
+    current_file = LazyFile(database='AMI', uri=uri)
+    current_file.lazy('annotated', partial(_build_annotated, uri, annotated))
+    current_file.lazy('annotation', partial(_build_annotation, uri, tracks))
+    return current_file
+
+
+def _encode_trial(current_trial):
+    try_with = current_trial['try_with']
+    segments = [(segment.start, segment.end)
+                for segment in current_trial['reference']]
+    return (current_trial['model_id'], current_trial['uri'],
+            try_with.start, try_with.end, segments)
+
+
+def _decode_trial(record):
+    model_id, uri, start, end, segments = record
+    segments = [Segment(start=s, end=e) for s, e in segments]
+    return {'database': 'AMI',
+            'uri': uri,
+            'try_with': Segment(start=start, end=end),
+            'model_id': model_id,
+            'reference': Timeline(uri=uri, segments=segments)}
+
+
+ENCODERS = {'files': _encode_file, 'trials': _encode_trial}
+
+DECODERS = {'files': _decode_file, 'trials': _decode_trial}
+
+LAZY_DECODERS = dict(DECODERS, files=_decode_lazy_file)
+
+# modules whose code determines snapshot content
+BUILDERS = ('protocols.py', 'turns.py', 'snapshot.py')
+
+
+def get_key(data_dir, subset, kind):
+    """Compute snapshot key (cached for the lifetime of the process)"""
+
+    data_dir = Path(data_dir)
+    sources = [data_dir / source.format(subset=subset)
+               for source in KINDS[kind][1]]
+
+    cache_key = tuple(str(source) for source in sources)
+    if cache_key not in _KEYS:
+        from pyannote.core import __version__ as core_version
+        from . import __version__ as version
+        digest = hashlib.sha256()
+        digest.update(f'{FORMAT_VERSION} {core_version} {version}'.encode())
+        for builder in BUILDERS:
+            with open(Path(__file__).parent / builder, 'rb') as fp:
+                digest.update(fp.read())
+        for source in sources:
+            with open(source, 'rb') as fp:
+                digest.update(fp.read())
+        _KEYS[cache_key] = digest.hexdigest()
+
+    return _KEYS[cache_key]
+
+
+def get_path(data_dir, subset, kind):
+    return Path(data_dir) / 'snapshot' / f'{subset}.{kind}.snapshot'
+
+
+class Snapshot:
+    """Read-only, lazily unpickled, sequence of protocol items
+
+    Parameters
+    ----------
+    path : str or Path
+        Snapshot file.
+    decode : callable, optional
+        Function applied to every unpickled record.
+
+    Layout
+    ------
+    MAGIC | uint32 metadata size | JSON metadata | uint64 offsets | pickles
+    where offsets (n_items + 1 of them) are relative to the first pickle.
+    """
+
+    def __init__(self, path, decode=None):
+        self.decode = decode
+        with open(path, 'rb') as fp:
+            self._buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        position = len(MAGIC)
+        if self._buffer[:position] != MAGIC:
+            raise ValueError(f'{path} is not an AMI snapshot.')
+        size, = struct.unpack_from('<I', self._buffer, position)
+        position += 4
+        self.metadata = json.loads(self._buffer[position:position + size])
+        position += size
+
+        n_items = self.metadata['n_items']
+        self._offsets = array('Q')
+        self._offsets.frombytes(
+            self._buffer[position:position + 8 * (n_items + 1)])
+        if sys.byteorder != 'little':
+            self._offsets.byteswap()
+        self._start = position + 8 * (n_items + 1)
+
+    @property
+    def key(self):
+        return self.metadata['key']
+
+    def __len__(self):
+        return self.metadata['n_items']
+
+    def __getitem__(self, index):
+        start = self._start + self._offsets[index]
+        end = self._start + self._offsets[index + 1]
+        record = pickle.loads(self._buffer[start:end])
+        if self.decode is None:
+            return record
+        return self.decode(record)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @classmethod
+    def write(cls, path, items, key, encode=None):
+        """Write items to snapshot file
+
+        Items are passed through `encode` (when provided) before pickling.
+        """
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        offsets = array('Q', [0])
+        with tempfile.TemporaryFile() as payload:
+            for item in items:
+                if encode is not None:
+                    item = encode(item)
+                payload.write(pickle.dumps(item,
+                                           protocol=pickle.HIGHEST_PROTOCOL))
+                offsets.append(payload.tell())
+            if sys.byteorder != 'little':
+                offsets.byteswap()
+
+            metadata = json.dumps({'format': FORMAT_VERSION,
+                                   'key': key,
+                                   'n_items': len(offsets) - 1}).encode()
+
+            tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp, 'wb') as fp:
+                fp.write(MAGIC)
+                fp.write(struct.pack('<I', len(metadata)))
+                fp.write(metadata)
+                fp.write(offsets.tobytes())
+                payload.seek(0)
+                while True:
+                    chunk = payload.read(1 << 20)
+                    if not chunk:
+                        break
+                    fp.write(chunk)
+            os.replace(tmp, path)
+
+
+def load(data_dir, subset, kind, lazy=True):
+    """Load snapshot when it exists and is up to date, return None otherwise
+
+    When `lazy` is True, files 'annotated' and 'annotation' values are built
+    on first access (see AMI.lazy.LazyFile), like when built from text.
+    """
+
+    path = get_path(data_dir, subset, kind)
+    if not path.exists():
+        return None
+
+    decoders = LAZY_DECODERS if lazy else DECODERS
+    try:
+        snapshot = Snapshot(path, decode=decoders.get(kind, None))
+    except (OSError, ValueError):
+        return None
+
+    if snapshot.key != get_key(data_dir, subset, kind):
+        return None
+
+    return snapshot
+
+
+def build(data_dir=None, output_dir=None):
+    """Build all snapshots
+
+    Parameters
+    ----------
+    data_dir : str or Path, optional
+        Metadata directory. Defaults to the bundled one.
+    output_dir : str or Path, optional
+        Defaults to <data_dir>/snapshot.
+    """
+
+    from .protocols import SpeakerSpotting
+
+    if data_dir is None:
+        data_dir = DATA_DIR
+    data_dir = Path(data_dir)
+    if output_dir is None:
+        output_dir = data_dir / 'snapshot'
+    output_dir = Path(output_dir)
+
+    # build from text files, never from (possibly outdated) snapshots
+    protocol = SpeakerSpotting()
+    protocol.data_dir = data_dir
+    protocol.snapshot = False
+    # only reference is stored for trials: this is what diarization=False
+    # trials are made of.
+    protocol.diarization = False
+
+    iterators = {'files': protocol._xxx_files,
+                 'enrolments': protocol._xxx_enrol_iter,
+                 'trials': protocol._xxx_try_iter}
+
+    for kind, (subsets, sources) in KINDS.items():
+        for subset in subsets:
+            # e.g. there are no test trials
+            if not all((data_dir / source.format(subset=subset)).exists()
+                       for source in sources):
+                continue
+            path = output_dir / get_path(data_dir, subset, kind).name
+            Snapshot.write(path, iterators[kind](subset),
+                           get_key(data_dir, subset, kind),
+                           encode=ENCODERS.get(kind, None))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build precompiled AMI protocol snapshots.')
+    parser.add_argument('--data-dir', default=None,
+                        help='metadata directory (defaults to bundled one)')
+    args = parser.parse_args()
+    build(data_dir=args.data_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Synthetic AMI-like metadata
+
+Usage: python -m AMI.synthetic [--scale=<factor>] [--seed=<seed>] <output>
+
+Writes synthetic speaker_diarization/{trn|dev|tst}.{uem|mdtm} and
+speaker_spotting/{dev|tst}.{enrol|trial}.txt files whose statistical shape
+(meeting duration, turn duration, time between turn starts -- hence overlap
+rate --, speakers per meeting, models per speaker) is resampled from the
+bundled AMI files, with `scale` times as many meetings. Note that, like in
+AMI, every model is tried against every session: the number of trials grows
+with the square of `scale`.
+
+Protocols can then be pointed at the output directory:
+
+>>> protocol = get_protocol('AMI.SpeakerSpotting.MixHeadset')
+>>> protocol.data_dir = '/path/to/output'
+"""
+
+import argparse
+from pathlib import Path
+from collections import Counter
+from collections import defaultdict
+
+import numpy as np
+
+from .util import DATA_DIR
+from .util import SUBSETS
+
+
+SITES = 'EIT'
+
+# duration of speaker spotting sessions and enrolments
+SESSION = 60.
+
+ENROLMENT = 60.
+
+# meetings come in series (a, b, c, d) sharing the same speakers
+SERIES = 'abcd'
+
+
+def _read(path):
+    with open(path, 'r') as fp:
+        return [line.split() for line in fp if line.strip()]
+
+
+def fit(data_dir=None):
+    """Gather empirical distributions from AMI metadata
+
+    Returns
+    -------
+    stats : dict
+        'meetings' (number of meetings per subset), 'duration' (meeting
+        durations), 'turn' (turn durations), 'gap' (time between consecutive
+        turn starts), 'speakers' (number of speakers per meeting), and
+        'models' (number of models per speaker).
+    """
+
+    if data_dir is None:
+        data_dir = DATA_DIR
+    data_dir = Path(data_dir)
+
+    meetings, durations, turns, gaps, speakers = {}, [], [], [], []
+    for subset in SUBSETS:
+        uem = _read(data_dir / 'speaker_diarization' / f'{subset}.uem')
+        meetings[subset] = len(set(line[0] for line in uem))
+        durations.extend(float(line[3]) for line in uem)
+
+        mdtm = _read(data_dir / 'speaker_diarization' / f'{subset}.mdtm')
+        by_uri = defaultdict(list)
+        for uri, _, start, duration, _, _, _, speaker in mdtm:
+            by_uri[uri].append((float(start), float(duration), speaker))
+        for uri_turns in by_uri.values():
+            uri_turns.sort()
+            starts = np.array([start for start, _, _ in uri_turns])
+            turns.extend(duration for _, duration, _ in uri_turns)
+            gaps.extend(np.diff(starts))
+            speakers.append(len(set(speaker for _, _, speaker in uri_turns)))
+
+    models = []
+    for subset in ['dev', 'tst']:
+        enrol = _read(data_dir / 'speaker_spotting' / f'{subset}.enrol.txt')
+        model_ids = set(line[7] for line in enrol)
+        per_speaker = Counter(model_id.rsplit('_', 1)[0]
+                              for model_id in model_ids)
+        models.extend(per_speaker.values())
+
+    return {'meetings': meetings,
+            'duration': np.array(durations),
+            'turn': np.array(turns),
+            'gap': np.array(gaps),
+            'speakers': np.array(speakers),
+            'models': np.array(models)}
+
+
+def _turns(duration, speakers, stats, rng):
+    """Generate (start, duration, speaker) turns for one meeting"""
+
+    # draw a bit more turns than needed on average
+    n = int(1.2 * duration / np.mean(stats['gap'])) + 10
+    while True:
+        starts = np.cumsum(rng.choice(stats['gap'], size=n))
+        if starts[-1] > duration:
+            break
+        n *= 2
+    durations = rng.choice(stats['turn'], size=n)
+    keep = starts + durations < duration
+    labels = rng.choice(speakers, size=n)
+    return list(zip(starts[keep], durations[keep], labels[keep]))
+
+
+def generate(output, scale=1., seed=0, data_dir=None):
+    """Write synthetic AMI metadata to `output` directory
+
+    Parameters
+    ----------
+    output : str or Path
+    scale : float, optional
+        Number of synthetic meetings is `scale` times the number of actual
+        AMI meetings (per subset). Defaults to 1.
+    seed : int, optional
+        Random seed. Defaults to 0.
+    data_dir : str or Path, optional
+        Metadata to mimic. Defaults to bundled AMI metadata.
+    """
+
+    output = Path(output)
+    (output / 'speaker_diarization').mkdir(parents=True, exist_ok=True)
+    (output / 'speaker_spotting').mkdir(parents=True, exist_ok=True)
+
+    stats = fit(data_dir=data_dir)
+    rng = np.random.default_rng(seed)
+    num_series = 0
+
+    for subset in SUBSETS:
+
+        # meetings[raw_uri] = (duration, turns)
+        meetings = {}
+        series_speakers = {}
+
+        num_meetings = max(1, int(round(scale * stats['meetings'][subset])))
+        while len(meetings) < num_meetings:
+            num_series += 1
+            site = SITES[num_series % len(SITES)]
+            num_speakers = rng.choice(stats['speakers'])
+            # second letter of speaker identifier is the site
+            # (used by MixHeadset{Intra|Inter}Site protocols)
+            speakers = np.array([
+                f'{"MF"[rng.integers(2)]}{site}S{num_series:05d}{s:02d}'
+                for s in range(num_speakers)])
+            series_speakers[num_series] = speakers
+            for letter in SERIES[:num_meetings - len(meetings)]:
+                raw_uri = f'{site}S{num_series:05d}{letter}'
+                duration = float(rng.choice(stats['duration']))
+                turns = _turns(duration, speakers, stats, rng)
+                meetings[raw_uri] = (duration, turns)
+
+        with open(output / 'speaker_diarization' / f'{subset}.uem',
+                  'w') as uem, \
+             open(output / 'speaker_diarization' / f'{subset}.mdtm',
+                  'w') as mdtm:
+            for raw_uri, (duration, turns) in meetings.items():
+                uem.write(f'{raw_uri} 1 0.000 {duration:.3f}\n')
+                for start, turn, speaker in turns:
+                    mdtm.write(f'{raw_uri} 1 {start:.3f} {turn:.5f} '
+                               f'speaker NA unknown {speaker}\n')
+
+        # speaker spotting only uses dev and tst subsets
+        if subset == 'trn':
+            continue
+
+        # enrolments: each model is made of consecutive turns of one speaker
+        # in the first meeting of its series, adding up to about one minute.
+        enrolments = {}
+        for raw_uri, (duration, turns) in meetings.items():
+            letter = raw_uri[-1]
+            if letter != SERIES[0]:
+                continue
+            speakers = sorted(set(speaker for _, _, speaker in turns))
+            for speaker in speakers:
+                speaker_turns = [(start, turn) for start, turn, s in turns
+                                 if s == speaker]
+                num_models = rng.choice(stats['models'])
+                for m in range(1, num_models + 1):
+                    t = rng.integers(len(speaker_turns))
+                    enrol_with, total = [], 0.
+                    for start, turn in speaker_turns[t:]:
+                        enrol_with.append((start, turn))
+                        total += turn
+                        if total > ENROLMENT:
+                            break
+                    enrolments[f'{speaker}_m{m}'] = (raw_uri, enrol_with)
+
+        with open(output / 'speaker_spotting' / f'{subset}.enrol.txt',
+                  'w') as fp:
+            for model_id, (raw_uri, enrol_with) in enrolments.items():
+                for start, turn in enrol_with:
+                    fp.write(f'{raw_uri} 1 {start:.6f} {turn:.6f} '
+                             f'speaker NA NA {model_id}\n')
+
+        # trials: every model against every one-minute session of every
+        # meeting, except sessions overlapping its own enrolment.
+        with open(output / 'speaker_spotting' / f'{subset}.trial.txt',
+                  'w') as fp:
+            for raw_uri, (duration, turns) in meetings.items():
+
+                # first[speaker, session] / total[speaker, session]
+                first, total = {}, defaultdict(float)
+                for start, turn, speaker in turns:
+                    end = start + turn
+                    s = int(start // SESSION)
+                    while s * SESSION < end:
+                        overlap = min(end, (s + 1) * SESSION) - \
+                            max(start, s * SESSION)
+                        first.setdefault((speaker, s), max(start, s * SESSION))
+                        total[speaker, s] += overlap
+                        s += 1
+
+                for s in range(int(duration // SESSION)):
+                    start, end = s * SESSION, (s + 1) * SESSION
+                    for model_id, (enrol_uri, enrol_with) in \
+                            enrolments.items():
+                        if enrol_uri == raw_uri and \
+                           enrol_with[0][0] < end and \
+                           enrol_with[-1][0] + enrol_with[-1][1] > start:
+                            continue
+                        speaker = model_id.rsplit('_', 1)[0]
+                        if (speaker, s) in first:
+                            fp.write(f'{model_id} {raw_uri} {start:07.2f} '
+                                     f'{end:07.2f} target '
+                                     f'{first[speaker, s]:07.2f} '
+                                     f'{total[speaker, s]:07.2f}\n')
+                        else:
+                            fp.write(f'{model_id} {raw_uri} {start:07.2f} '
+                                     f'{end:07.2f} nontarget - -\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic AMI-like metadata.')
+    parser.add_argument('output', help='output directory')
+    parser.add_argument('--scale', type=float, default=1.,
+                        help='number of meetings, relative to AMI')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+    generate(args.output, scale=args.scale, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
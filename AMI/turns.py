@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Compact columnar storage of AMI metadata
+
+Tables are stored as parallel float64 (start, end) arrays and int32 codes
+into sorted, interned vocabularies (uris, labels). Unused columns (e.g. the
+"NA" and "gender" columns of MDTM files) are never stored.
+"""
+
+import numpy as np
+
+
+def _intern(values):
+    """Encode values as int32 codes into their sorted vocabulary"""
+    vocabulary = sorted(set(values))
+    index = {value: code for code, value in enumerate(vocabulary)}
+    codes = np.fromiter((index[value] for value in values),
+                        dtype=np.int32, count=len(values))
+    return vocabulary, codes
+
+
+class Turns:
+    """Columnar (uri, start, end, label) table
+
+    Parameters
+    ----------
+    uris, labels : list
+        Sorted vocabularies.
+    uri, label : (n, ) int32 np.ndarray
+        Codes into `uris` and `labels`.
+    start, end : (n, ) float64 np.ndarray
+    """
+
+    __slots__ = ('uris', 'labels', 'uri', 'label', 'start', 'end', '_groups')
+
+    def __init__(self, uris, labels, uri, label, start, end):
+        self.uris = uris
+        self.labels = labels
+        self.uri = uri
+        self.label = label
+        self.start = start
+        self.end = end
+        self._groups = {}
+
+    @classmethod
+    def read(cls, path, uri=0, start=2, end=None, duration=None, label=None):
+        """Read whitespace-separated file
+
+        Parameters
+        ----------
+        path : str or Path
+        uri, start, end, duration, label : int
+            Column indices. One of `end` or `duration` must be provided.
+            When `label` is None, all turns share the same None label.
+        """
+
+        uris, labels, starts, ends = [], [], [], []
+        with open(path, 'r') as fp:
+            for line in fp:
+                fields = line.split()
+                if not fields:
+                    continue
+                uris.append(fields[uri])
+                starts.append(float(fields[start]))
+                if end is None:
+                    ends.append(float(fields[duration]))
+                else:
+                    ends.append(float(fields[end]))
+                if label is not None:
+                    labels.append(fields[label])
+
+        starts = np.array(starts, dtype=np.float64)
+        ends = np.array(ends, dtype=np.float64)
+        if end is None:
+            ends += starts
+
+        uris, uri_codes = _intern(uris)
+        if label is None:
+            labels = [None]
+            label_codes = np.zeros(len(starts), dtype=np.int32)
+        else:
+            labels, label_codes = _intern(labels)
+
+        return cls(uris, labels, uri_codes, label_codes, starts, ends)
+
+    @classmethod
+    def from_uem(cls, path):
+        return cls.read(path, uri=0, start=2, end=3)
+
+    @classmethod
+    def from_mdtm(cls, path):
+        return cls.read(path, uri=0, start=2, duration=3, label=7)
+
+    @classmethod
+    def from_enrol(cls, path):
+        # turn label is the model identifier
+        return cls.read(path, uri=0, start=2, duration=3, label=7)
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in
+                   (self.uri, self.label, self.start, self.end))
+
+    def groups(self, by='uri'):
+        """Group turns by uri or label
+
+        Parameters
+        ----------
+        by : {'uri', 'label'}
+
+        Returns
+        -------
+        groups : dict
+            Maps uri (or label) to the indices of its turns, in file order.
+            Keys are in sorted order.
+        """
+
+        if by not in self._groups:
+            self.set_group_order(by, self.group_order(by))
+
+        return self._groups[by]
+
+    def group_order(self, by='uri'):
+        """Stable argsort of uri (or label) codes"""
+        return np.argsort(getattr(self, by), kind='stable')
+
+    def set_group_order(self, by, order):
+        """Set groups from (e.g. shared) precomputed `group_order(by)`"""
+        codes = getattr(self, by)
+        vocabulary = self.uris if by == 'uri' else self.labels
+        bounds = np.searchsorted(codes[order], np.arange(len(vocabulary) + 1))
+        self._groups[by] = {
+            key: order[bounds[code]:bounds[code + 1]]
+            for code, key in enumerate(vocabulary)}
+
+    def iter(self, indices):
+        """Iterate over (start, end, label) of selected turns"""
+        labels = self.labels
+        return zip(self.start[indices].tolist(),
+                   self.end[indices].tolist(),
+                   (labels[code] for code in self.label[indices].tolist()))
+
+
+def sweep(start, end, label=None):
+    """Split speech turns into elementary regions
+
+    Sweeps over sorted turn boundaries and counts active turns in between.
+
+    Parameters
+    ----------
+    start, end : (n, ) float np.ndarray
+    label : (n, ) int np.ndarray, optional
+        Turn labels.
+
+    Returns
+    -------
+    boundaries : (m + 1, ) float np.ndarray
+        Sorted boundaries of the m elementary regions.
+    count : (m, ) int np.ndarray
+        Number of active turns in each region.
+    label : (m, ) int np.ndarray
+        Label of the active turn in regions where count is 1 (meaningless
+        otherwise). Only returned when `label` is provided.
+    """
+
+    times = np.concatenate([start, end])
+    order = np.argsort(times, kind='stable')
+    boundaries = times[order]
+
+    # +1 (resp. -1) at every turn start (resp. end)
+    n = len(start)
+    delta = np.where(order < n, 1, -1)
+    count = np.cumsum(delta)[:-1] if n else np.zeros(0, dtype=int)
+
+    if label is None:
+        return boundaries, count
+
+    # when a single turn is active, the sum of active labels is its label
+    labels = np.concatenate([label, label])[order]
+    active = np.cumsum(delta * labels)[:-1] if n else np.zeros(0, dtype=int)
+    return boundaries, count, active
+
+
+class Trial:
+    """Speaker spotting trial record"""
+
+    __slots__ = ('model_id', 'uri', 'start', 'end', 'target')
+
+    def __init__(self, model_id, uri, start, end, target):
+        self.model_id = model_id
+        self.uri = uri
+        self.start = start
+        self.end = end
+        self.target = target
+
+
+class Trials:
+    """Columnar speaker spotting trials table
+
+    Parameters
+    ----------
+    models, uris : list
+        Sorted vocabularies.
+    model, uri : (n, ) int32 np.ndarray
+        Codes into `models` and `uris`.
+    start, end : (n, ) float64 np.ndarray
+    target : (n, ) bool np.ndarray
+    """
+
+    __slots__ = ('models', 'uris', 'model', 'uri', 'start', 'end', 'target')
+
+    def __init__(self, models, uris, model, uri, start, end, target):
+        self.models = models
+        self.uris = uris
+        self.model = model
+        self.uri = uri
+        self.start = start
+        self.end = end
+        self.target = target
+
+    @classmethod
+    def read(cls, path):
+        models, uris, starts, ends, targets = [], [], [], [], []
+        with open(path, 'r') as fp:
+            for line in fp:
+                fields = line.split()
+                if not fields:
+                    continue
+                models.append(fields[0])
+                uris.append(fields[1])
+                starts.append(float(fields[2]))
+                ends.append(float(fields[3]))
+                targets.append(fields[4] == 'target')
+
+        models, model_codes = _intern(models)
+        uris, uri_codes = _intern(uris)
+        return cls(models, uris, model_codes, uri_codes,
+                   np.array(starts, dtype=np.float64),
+                   np.array(ends, dtype=np.float64),
+                   np.array(targets, dtype=bool))
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in
+                   (self.model, self.uri, self.start, self.end, self.target))
+
+    def __getitem__(self, index):
+        return Trial(self.models[self.model[index]],
+                     self.uris[self.uri[index]],
+                     float(self.start[index]),
+                     float(self.end[index]),
+                     bool(self.target[index]))
+
+    def __iter__(self):
+        models, uris = self.models, self.uris
+        for model, uri, start, end, target in zip(
+                self.model.tolist(), self.uri.tolist(),
+                self.start.tolist(), self.end.tolist(),
+                self.target.tolist()):
+            yield Trial(models[model], uris[uri], start, end, target)
+
+
+# kind: (metadata file, table reader)
+TABLES = {
+    'annotated': ('speaker_diarization/{subset}.uem', Turns.from_uem),
+    'annotation': ('speaker_diarization/{subset}.mdtm', Turns.from_mdtm),
+    'enrolments': ('speaker_spotting/{subset}.enrol.txt', Turns.from_enrol),
+    'trials': ('speaker_spotting/{subset}.trial.txt', Trials.read),
+}
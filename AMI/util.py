@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+import os
+from pathlib import Path
+
+
+DATA_DIR = Path(__file__).parent / 'data'
+
+SUBSETS = ('trn', 'dev', 'tst')
+
+
+def get_cache_dir():
+    """Get directory where AMI caches are stored
+
+    Defaults to ~/.pyannote/cache/AMI and can be overridden with the
+    PYANNOTE_AMI_CACHE environment variable.
+    """
+    default = Path.home() / '.pyannote' / 'cache' / 'AMI'
+    cache_dir = Path(os.environ.get('PYANNOTE_AMI_CACHE', default))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def get_uris(data_dir=None):
+    """Get sorted list of Mix-Headset uris referenced by the protocols
+
+    Gathers uris from UEM files of every subset, as well as from
+    speaker spotting enrolment files.
+    """
+
+    if data_dir is None:
+        data_dir = DATA_DIR
+    data_dir = Path(data_dir)
+
+    paths = list((data_dir / 'speaker_diarization').glob('*.uem'))
+    paths += list((data_dir / 'speaker_spotting').glob('*.enrol.txt'))
+
+    raw_uris = set()
+    for path in paths:
+        with open(path, 'r') as fp:
+            for line in fp:
+                fields = line.split()
+                if fields:
+                    raw_uris.add(fields[0])
+
+    return sorted(f'{raw_uri}.Mix-Headset' for raw_uri in raw_uris)
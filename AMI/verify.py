@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Check integrity of local AMI audio corpus
+
+Usage: python -m AMI.verify --manifest=<path> [--workers=<n>] <amicorpus>
+       python -m AMI.verify --build --manifest=<path> [--workers=<n>] <amicorpus>
+
+Files are compared against a manifest (size and SHA-256 of every (repaired)
+Mix-Headset file). SHA-256 of local files are cached along with their size
+and modification time, so that only files that changed since last check are
+hashed again.
+
+--build generates the manifest from a reference copy of the corpus.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from .util import get_cache_dir
+from .util import get_uris
+from .finder import AudioFinder
+
+
+CHUNK_SIZE = 1 << 22
+
+
+def sha256(path):
+    """Compute SHA-256 hex digest of file at `path`"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest):
+    """Load manifest as {uri: (size, sha256)} dictionary"""
+    entries = {}
+    with open(manifest, 'r') as fp:
+        for line in fp:
+            uri, size, checksum = line.split()
+            entries[uri] = (int(size), checksum)
+    return entries
+
+
+def save_manifest(entries, manifest):
+    """Save {uri: (size, sha256)} dictionary as manifest"""
+    os.makedirs(os.path.dirname(os.path.abspath(manifest)), exist_ok=True)
+    with open(manifest, 'w') as fp:
+        for uri, (size, checksum) in sorted(entries.items()):
+            fp.write(f'{uri} {size} {checksum}\n')
+
+
+class ChecksumCache:
+    """Persistent path → (size, mtime, sha256) cache
+
+    Checksums are only computed (in parallel, using a process pool) for
+    files whose size or modification time changed since they were cached.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of hashing processes. Defaults to number of CPUs.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self.path = get_cache_dir() / 'checksums.json'
+        try:
+            with open(self.path, 'r') as fp:
+                self._cache = json.load(fp)
+        except (OSError, ValueError):
+            self._cache = {}
+
+    def __call__(self, paths):
+        """Get SHA-256 of files
+
+        Parameters
+        ----------
+        paths : dict
+            uri → path mapping
+
+        Returns
+        -------
+        checksums : dict
+            uri → (size, sha256) mapping
+        """
+
+        checksums, todo = {}, {}
+        for uri, path in paths.items():
+            path = os.path.abspath(path)
+            stat = os.stat(path)
+            cached = self._cache.get(path, None)
+            if cached is not None and \
+               cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+                checksums[uri] = (stat.st_size, cached[2])
+            else:
+                todo[uri] = (path, stat)
+
+        if todo:
+            uris = list(todo)
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                digests = executor.map(sha256,
+                                       [todo[uri][0] for uri in uris])
+                for uri, digest in zip(uris, digests):
+                    path, stat = todo[uri]
+                    checksums[uri] = (stat.st_size, digest)
+                    self._cache[path] = [stat.st_size, stat.st_mtime_ns,
+                                         digest]
+            self._save()
+
+        return checksums
+
+    def _save(self):
+        tmp = self.path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'w') as fp:
+            json.dump(self._cache, fp)
+        os.replace(tmp, self.path)
+
+
+def verify(paths, manifest, workers=None):
+    """Compare local files with manifest
+
+    Parameters
+    ----------
+    paths : dict
+        uri → path mapping (e.g. AudioFinder(root, strict=False).paths)
+    manifest : str or Path
+    workers : int, optional
+        Number of hashing processes. Defaults to number of CPUs.
+
+    Returns
+    -------
+    missing : list
+        Sorted list of uris that are in the manifest but not in `paths`.
+    corrupted : list
+        Sorted list of uris whose size or checksum do not match the manifest.
+    """
+
+    expected = load_manifest(manifest)
+
+    missing = sorted(uri for uri in expected if uri not in paths)
+
+    # cheap first pass: files with wrong size need not be hashed
+    corrupted, candidates = [], {}
+    for uri, (size, _) in expected.items():
+        if uri not in paths:
+            continue
+        if os.path.getsize(paths[uri]) != size:
+            corrupted.append(uri)
+        else:
+            candidates[uri] = paths[uri]
+
+    checksums = ChecksumCache(workers=workers)(candidates)
+    corrupted += [uri for uri, checksum in checksums.items()
+                  if checksum != expected[uri]]
+
+    return missing, sorted(corrupted)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Check integrity of local AMI audio corpus.')
+    parser.add_argument('root', help='path to "amicorpus" directory')
+    parser.add_argument('--build', action='store_true',
+                        help='generate manifest from this corpus')
+    parser.add_argument('--manifest', required=True,
+                        help='path to manifest (written with --build)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of hashing processes')
+    args = parser.parse_args()
+
+    manifest = args.manifest
+
+    # building the manifest requires a complete reference corpus
+    paths = AudioFinder(args.root, strict=args.build).paths
+
+    if args.build:
+        paths = {uri: paths[uri] for uri in get_uris()}
+        save_manifest(ChecksumCache(workers=args.workers)(paths),
+                      manifest=manifest)
+        print(f'Manifest written to {manifest}.')
+        sys.exit(0)
+
+    if not os.path.exists(manifest):
+        msg = (f'Manifest {manifest} not found. Generate one from a '
+               f'reference corpus with --build --manifest=<path>.')
+        print(msg, file=sys.stderr)
+        sys.exit(2)
+
+    missing, corrupted = verify(paths, manifest=manifest,
+                                workers=args.workers)
+    for uri in missing:
+        print(f'{uri}: missing')
+    for uri in corrupted:
+        print(f'{uri}: corrupted')
+
+    sys.exit(1 if missing or corrupted else 0)
+
+
+if __name__ == '__main__':
+    main()
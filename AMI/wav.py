@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Minimal RIFF/WAVE header handling
+
+Some AMI Mix-Headset files come with malformed chunk headers (e.g. wrong RIFF
+or data chunk sizes, or trailing chunks) that scipy cannot read. Helpers below
+only deal with headers, so that files never need to be decoded.
+"""
+
+import os
+import struct
+from collections import namedtuple
+
+
+# most AMI headers are 44 bytes long. this is more than enough to reach the
+# "data" chunk even when extra chunks are present.
+HEADER_SIZE = 65536
+
+CANONICAL_HEADER_SIZE = 44
+
+# trailing chunks are looked for in that many bytes at the end of file
+TAIL_SIZE = 65536
+
+# chunks that may follow audio data
+TRAILING_CHUNKS = (b'LIST', b'JUNK', b'PAD ', b'fact', b'cue ', b'bext',
+                   b'smpl', b'inst', b'id3 ', b'ID3 ')
+
+WavHeader = namedtuple('WavHeader', ['num_channels', 'sample_width',
+                                     'sample_rate', 'riff_size',
+                                     'data_offset', 'data_size'])
+WavHeader.__doc__ = """RIFF/WAVE header
+
+data_offset is the position of the first audio byte (right after the "data"
+chunk header) and data_size is the size declared by the "data" chunk header.
+"""
+
+
+class WavError(ValueError):
+    pass
+
+
+def parse_header(buf):
+    """Parse RIFF/WAVE header
+
+    Parameters
+    ----------
+    buf : bytes-like
+        Beginning of the file, up to (at least) the "data" chunk header.
+
+    Returns
+    -------
+    header : WavHeader
+    """
+
+    buf = memoryview(buf)
+    if len(buf) < 12 or buf[0:4] != b'RIFF' or buf[8:12] != b'WAVE':
+        raise WavError('Not a RIFF/WAVE file.')
+    riff_size, = struct.unpack_from('<I', buf, 4)
+
+    fmt = None
+    position = 12
+    while position + 8 <= len(buf):
+        chunk_id = bytes(buf[position:position + 4])
+        chunk_size, = struct.unpack_from('<I', buf, position + 4)
+        position += 8
+
+        if chunk_id == b'fmt ':
+            if position + 16 > len(buf):
+                break
+            fmt = struct.unpack_from('<HHIIHH', buf, position)
+
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise WavError('"data" chunk found before "fmt " chunk.')
+            _, num_channels, sample_rate, _, _, bits_per_sample = fmt
+            return WavHeader(num_channels=num_channels,
+                             sample_width=bits_per_sample // 8,
+                             sample_rate=sample_rate,
+                             riff_size=riff_size,
+                             data_offset=position,
+                             data_size=chunk_size)
+
+        # chunks are word-aligned
+        position += chunk_size + (chunk_size % 2)
+
+    raise WavError('Could not find "data" chunk header.')
+
+
+def read_header(path):
+    """Parse header of RIFF/WAVE file at `path`"""
+    with open(path, 'rb') as fp:
+        return parse_header(fp.read(HEADER_SIZE))
+
+
+def read_tail(path, header):
+    """Read last TAIL_SIZE bytes of audio data and whatever follows
+
+    Returns
+    -------
+    tail : bytes
+    tail_offset : int
+        Position of the first byte of `tail` in the file.
+    """
+    with open(path, 'rb') as fp:
+        file_size = fp.seek(0, 2)
+        tail_offset = max(header.data_offset, file_size - TAIL_SIZE)
+        fp.seek(tail_offset)
+        return fp.read(), tail_offset
+
+
+def _is_chunk_chain(buf, position, end):
+    """Check that chunks starting at `position` exactly end the file"""
+    while position + 8 <= end:
+        chunk_id = bytes(buf[position:position + 4])
+        if not (chunk_id.isascii() and chunk_id.decode().isprintable()):
+            return False
+        chunk_size, = struct.unpack_from('<I', buf, position + 4)
+        position += 8 + chunk_size + (chunk_size % 2)
+    # last chunk may lack its pad byte
+    return position in (end, end + 1)
+
+
+def find_data_end(header, file_size, tail=b'', tail_offset=None):
+    """Find where audio data stops in a file with unreliable "data" size
+
+    Audio data stops at the first known chunk header (e.g. "LIST") that
+    starts a chain of well-formed chunks ending exactly at the end of file.
+
+    Parameters
+    ----------
+    header : WavHeader
+    file_size : int
+    tail : bytes-like, optional
+        End of the file, starting at `tail_offset`.
+    tail_offset : int, optional
+        Defaults to file_size - len(tail).
+
+    Returns
+    -------
+    data_end : int
+        Position of the first trailing chunk, or `file_size` when no trailing
+        chunk could be found.
+    """
+
+    if tail_offset is None:
+        tail_offset = file_size - len(tail)
+    tail = bytes(tail)
+    end = file_size - tail_offset
+
+    candidates = set()
+    for chunk_id in TRAILING_CHUNKS:
+        position = tail.find(chunk_id)
+        while position >= 0:
+            candidates.add(position)
+            position = tail.find(chunk_id, position + 1)
+
+    for position in sorted(candidates):
+        if tail_offset + position < header.data_offset:
+            continue
+        if _is_chunk_chain(tail, position, end):
+            return tail_offset + position
+
+    return file_size
+
+
+def get_data_size(header, file_size, tail=b'', tail_offset=None):
+    """Get actual size of audio data
+
+    Declared "data" chunk size is not trusted: when it is zero or larger than
+    what the file actually contains, audio data is assumed to stop right
+    before trailing chunks found in `tail` (see `find_data_end`) or at the
+    end of file. It is then rounded down to a whole number of frames.
+
+    Parameters
+    ----------
+    header : WavHeader
+    file_size : int
+    tail : bytes-like, optional
+        End of the file, starting at `tail_offset`. See `read_tail`.
+    tail_offset : int, optional
+        Defaults to file_size - len(tail).
+    """
+    available = max(0, file_size - header.data_offset)
+    data_size = header.data_size
+    if data_size == 0 or data_size > available:
+        data_end = find_data_end(header, file_size, tail=tail,
+                                 tail_offset=tail_offset)
+        # note that the pad byte of an odd-sized "data" chunk cannot be
+        # told apart from audio here: it is counted as audio.
+        data_size = max(0, data_end - header.data_offset)
+    frame_size = header.num_channels * header.sample_width
+    return data_size - (data_size % frame_size)
+
+
+def get_duration(header, file_size, tail=b'', tail_offset=None):
+    """Get audio duration (in seconds) from header and file size"""
+    frame_size = header.num_channels * header.sample_width
+    data_size = get_data_size(header, file_size, tail=tail,
+                              tail_offset=tail_offset)
+    return data_size // frame_size / header.sample_rate
+
+
+def read_data_size(path):
+    """Get actual size of audio data of file at `path`
+
+    Returns
+    -------
+    header : WavHeader
+    data_size : int
+    """
+    header = read_header(path)
+    file_size = os.path.getsize(path)
+    tail, tail_offset = b'', None
+    if header.data_size == 0 or \
+       header.data_size > file_size - header.data_offset:
+        tail, tail_offset = read_tail(path, header)
+    return header, get_data_size(header, file_size, tail=tail,
+                                 tail_offset=tail_offset)
+
+
+def canonical_header(header, data_size):
+    """Build canonical 44-bytes PCM header
+
+    This is the header written by Python's `wave` module, which scipy reads
+    without complaint.
+    """
+    byte_rate = header.sample_rate * header.num_channels * header.sample_width
+    block_align = header.num_channels * header.sample_width
+    return struct.pack('<4sI4s4sIHHIIHH4sI',
+                       b'RIFF', 36 + data_size, b'WAVE',
+                       b'fmt ', 16, 1, header.num_channels,
+                       header.sample_rate, byte_rate, block_align,
+                       8 * header.sample_width,
+                       b'data', data_size)
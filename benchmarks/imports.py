@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Import time benchmarks
+
+`import AMI` happens for every pyannote.database entry point discovery, so
+it has to stay cheap. Besides asv, this file can be run as a script that
+fails when `import AMI` exceeds a time budget:
+
+$ python benchmarks/imports.py --budget 0.05
+"""
+
+import sys
+import argparse
+import subprocess
+
+
+def timeraw_import_AMI():
+    return "import AMI"
+
+
+def timeraw_import_AMI_protocols():
+    return "from AMI import AMI"
+
+
+def import_time(statement='import AMI', repeat=5):
+    """Best time (in seconds) of `statement` in a fresh interpreter"""
+    code = ('import time; t = time.perf_counter(); '
+            f'{statement}; print(time.perf_counter() - t)')
+    durations = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', code])
+        durations.append(float(output))
+    return min(durations)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Check that `import AMI` fits in a time budget.')
+    parser.add_argument('--budget', type=float, default=0.05,
+                        help='time budget in seconds')
+    args = parser.parse_args()
+
+    duration = import_time()
+    print(f'import AMI: {1000 * duration:.1f}ms '
+          f'(budget: {1000 * args.budget:.1f}ms)')
+    sys.exit(0 if duration <= args.budget else 1)
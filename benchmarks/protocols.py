@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Protocol iteration benchmarks (https://asv.readthedocs.io)
+
+Run with `asv run` and compare commits with `asv compare <ref1> <ref2>`.
+Throughput is measured on the first MAX_ITEMS items (or all of them when
+there are fewer), to keep trial benchmarks tractable.
+"""
+
+import time
+import itertools
+import warnings
+
+from AMI import AMI
+from AMI.cache import CACHE
+from AMI.turns import TABLES
+
+
+MAX_ITEMS = 2000
+
+PROTOCOLS = [('SpeakerDiarization', 'MixHeadset'),
+             ('SpeakerSpotting', 'MixHeadset'),
+             ('SpeakerSpotting', 'MixHeadsetIntraSite'),
+             ('SpeakerSpotting', 'MixHeadsetInterSite')]
+
+SUBSETS = ['trn', 'dev', 'tst']
+
+
+def get_protocol(task, protocol, diarization=True):
+    protocol = AMI().get_protocol(task, protocol)
+    protocol.diarization = diarization
+    return protocol
+
+
+def get_iter(protocol, subset, kind):
+    """Get raw iterator (i.e. without preprocessing)
+
+    kind is one of 'files' (or 'sessions' for speaker spotting protocols),
+    'enrolments', or 'trials'. Returns None when the protocol does not
+    provide this kind of item for this subset.
+    """
+    suffix = {'files': '', 'sessions': '',
+              'enrolments': '_enrol', 'trials': '_try'}[kind]
+    iterator = getattr(protocol, f'{subset}{suffix}_iter', None)
+    if iterator is None:
+        return None
+    return iterator()
+
+
+def throughput(items, max_items=MAX_ITEMS):
+    """Return number of items per second"""
+    start = time.perf_counter()
+    n = sum(1 for _ in itertools.islice(items, max_items))
+    return n / (time.perf_counter() - start)
+
+
+class _Base:
+
+    params = (PROTOCOLS, SUBSETS, [True, False])
+    param_names = ['protocol', 'subset', 'diarization']
+
+    # items of this kind
+    kind = None
+
+    def setup(self, protocol, subset, diarization):
+        warnings.simplefilter('ignore')
+        # measure cold metadata loading (see AMI.cache)
+        CACHE.clear()
+        self.protocol = get_protocol(*protocol, diarization=diarization)
+        if get_iter(self.protocol, subset, self.kind) is None:
+            raise NotImplementedError()
+
+    def _items(self, subset):
+        return get_iter(self.protocol, subset, self.kind)
+
+    def time_first_item(self, protocol, subset, diarization):
+        next(self._items(subset))
+
+    def peakmem_iterate(self, protocol, subset, diarization):
+        for _ in itertools.islice(self._items(subset), MAX_ITEMS):
+            pass
+
+
+class Files(_Base):
+    """Files of speaker diarization protocol"""
+
+    kind = 'files'
+
+    def setup(self, protocol, subset, diarization):
+        # speaker spotting protocols yield sessions (see Sessions)
+        # and 'diarization' only affects trials
+        if protocol[0] != 'SpeakerDiarization' or not diarization:
+            raise NotImplementedError()
+        super().setup(protocol, subset, diarization)
+
+    def track_files_per_second(self, protocol, subset, diarization):
+        return throughput(self._items(subset))
+
+    track_files_per_second.unit = 'files/s'
+
+
+class Sessions(_Base):
+    """60s sessions of speaker spotting protocols"""
+
+    kind = 'sessions'
+
+    def setup(self, protocol, subset, diarization):
+        if protocol[0] != 'SpeakerSpotting' or not diarization:
+            raise NotImplementedError()
+        super().setup(protocol, subset, diarization)
+
+    def track_sessions_per_second(self, protocol, subset, diarization):
+        return throughput(self._items(subset))
+
+    track_sessions_per_second.unit = 'sessions/s'
+
+
+class Enrolments(_Base):
+    """Enrolments of speaker spotting protocols"""
+
+    kind = 'enrolments'
+
+    def setup(self, protocol, subset, diarization):
+        if protocol[0] != 'SpeakerSpotting' or not diarization:
+            raise NotImplementedError()
+        super().setup(protocol, subset, diarization)
+
+    def track_enrolments_per_second(self, protocol, subset, diarization):
+        return throughput(self._items(subset))
+
+    track_enrolments_per_second.unit = 'enrolments/s'
+
+
+class Trials(_Base):
+    """Trials of speaker spotting protocols"""
+
+    kind = 'trials'
+
+    def setup(self, protocol, subset, diarization):
+        if protocol[0] != 'SpeakerSpotting':
+            raise NotImplementedError()
+        super().setup(protocol, subset, diarization)
+        # some subsets have no trial file (e.g. tst)
+        source, _ = TABLES['trials']
+        if not (self.protocol._data_dir /
+                source.format(subset=subset)).exists():
+            raise NotImplementedError()
+
+    def track_trials_per_second(self, protocol, subset, diarization):
+        return throughput(self._items(subset))
+
+    track_trials_per_second.unit = 'trials/s'
+
+
+class Workers:
+    """Items built in a pool of worker processes (see AMI.parallel)
+
+    Compare `workers` = 1 (items built in process) with N > 1: workers crop
+    speech turns, and the parent process still builds pyannote.core objects.
+    Items are built from text files and fully evaluated.
+    """
+
+    params = (['files', 'sessions', 'trials'], [1, 2, 4])
+    param_names = ['kind', 'workers']
+
+    # (task, subset) of benchmarked items
+    ITEMS = {'files': ('SpeakerDiarization', 'trn'),
+             'sessions': ('SpeakerSpotting', 'trn'),
+             'trials': ('SpeakerSpotting', 'dev')}
+
+    def setup(self, kind, workers):
+        warnings.simplefilter('ignore')
+        task, self.subset = self.ITEMS[kind]
+        self.protocol = get_protocol(task, 'MixHeadset')
+        self.protocol.snapshot = False
+        self.protocol.workers = workers
+        # metadata loading is not what is measured here
+        for table in ('annotated', 'annotation', 'trials'):
+            source, read = TABLES[table]
+            path = self.protocol._data_dir / source.format(subset=self.subset)
+            if path.exists():
+                CACHE.get(path, read)
+
+    def track_items_per_second(self, kind, workers):
+        items = get_iter(self.protocol, self.subset, kind)
+        # evaluate lazy values
+        return throughput(dict(item) for item in items)
+
+    track_items_per_second.unit = 'items/s'
@@ -27,16 +27,38 @@
 # Hervé BREDIN - http://herve.niderb.fr/
 
 
+import os
+import warnings
 import versioneer
 from setuptools import setup, find_packages
 
+cmdclass = versioneer.get_cmdclass()
+
+
+class build_py(cmdclass['build_py']):
+    """Also build precompiled protocol snapshots (see AMI/snapshot.py)"""
+
+    def run(self):
+        super().run()
+        try:
+            from AMI.snapshot import build
+        except ImportError as e:
+            # protocols will fall back to parsing text files
+            warnings.warn(f'Could not build AMI snapshots ({e}).')
+            return
+        output_dir = os.path.join(self.build_lib, 'AMI', 'data', 'snapshot')
+        build(output_dir=output_dir)
+
+
+cmdclass['build_py'] = build_py
+
 setup(
     name='pyannote.db.odessa.ami',
     description="ODESSA/AMI plugin for pyannote-database",
     author='Hervé Bredin',
     author_email='bredin@limsi.fr',
     version=versioneer.get_version(),
-    cmdclass=versioneer.get_cmdclass(),
+    cmdclass=cmdclass,
     packages=find_packages(),
     package_data={
         'AMI': [
@@ -45,10 +67,11 @@ setup(
         ],
     },
     include_package_data=True,
+    python_requires='>=3.8',
     install_requires=[
         'pyannote.core >= 2.1',
         'pyannote.database >= 1.5.5',
-        'pandas >= 0.20',
+        'numpy',
     ],
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -56,8 +79,7 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Natural Language :: English",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
         "Topic :: Scientific/Engineering"
     ],
     entry_points="""
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Plain reference implementation of AMI protocols
+
+Straightforward (and slow) re-implementation of the original pandas-based
+protocols, only relying on pyannote.core, against which optimized iteration
+modes are tested.
+"""
+
+from collections import defaultdict
+
+from pyannote.core import Segment, Timeline, Annotation, SlidingWindow
+
+from AMI.columnar import to_pyannote
+
+
+def read(path):
+    with open(path, 'r') as fp:
+        return [line.split() for line in fp if line.strip()]
+
+
+def group(rows, column):
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row[column]].append(row)
+    return groups
+
+
+def files(data_dir, subset):
+    data_dir = data_dir / 'speaker_diarization'
+    annotated = group(read(data_dir / f'{subset}.uem'), 0)
+    annotation = group(read(data_dir / f'{subset}.mdtm'), 0)
+
+    for raw_uri in sorted(annotated):
+        uri = f'{raw_uri}.Mix-Headset'
+        segments = [Segment(start=float(row[2]), end=float(row[3]))
+                    for row in annotated[raw_uri]]
+        reference = Annotation(uri=uri)
+        for t, row in enumerate(annotation[raw_uri]):
+            start = float(row[2])
+            reference[Segment(start=start, end=start + float(row[3])), t] = \
+                row[7]
+        yield {'database': 'AMI',
+               'uri': uri,
+               'annotated': Timeline(uri=uri, segments=segments),
+               'annotation': reference}
+
+
+def sessions(data_dir, subset):
+    for current_file in files(data_dir, subset):
+        annotated = current_file['annotated']
+        annotation = current_file['annotation']
+        for segment in annotated:
+            for session in SlidingWindow(start=segment.start, duration=60.,
+                                         step=60., end=segment.end - 60.):
+                session_file = dict(current_file)
+                session_file['annotated'] = annotated.crop(session)
+                session_file['annotation'] = annotation.crop(session)
+                yield session_file
+
+
+def enrolments(data_dir, subset):
+    path = data_dir / 'speaker_spotting' / f'{subset}.enrol.txt'
+    models = group(read(path), 7)
+    for model_id in sorted(models):
+        rows = models[model_id]
+        uri = f'{rows[0][0]}.Mix-Headset'
+        segments = []
+        for row in rows:
+            start = float(row[2])
+            segment = Segment(start=start, end=start + float(row[3]))
+            if segment:
+                segments.append(segment)
+        yield {'database': 'AMI',
+               'uri': uri,
+               'model_id': model_id,
+               'enrol_with': Timeline(segments=segments, uri=uri)}
+
+
+def trials(data_dir, subset, diarization=True, site=None):
+    """Iterate over trials
+
+    Parameters
+    ----------
+    site : {'intra', 'inter'}, optional
+        Only keep non-target trials of models from the same (or another)
+        site as the trial file. Defaults to keeping all trials.
+    """
+
+    path = data_dir / 'speaker_diarization' / f'{subset}.mdtm'
+    turns = group(read(path), 0)
+
+    for row in read(data_dir / 'speaker_spotting' / f'{subset}.trial.txt'):
+
+        model_id, raw_uri = row[0], row[1]
+        speaker = '_'.join(model_id.split('_')[:-1])
+        uri = f'{raw_uri}.Mix-Headset'
+        try_with = Segment(start=float(row[2]), end=float(row[3]))
+
+        if diarization:
+            annotation = Annotation(uri=uri)
+            for t, turn in enumerate(turns[raw_uri]):
+                start = float(turn[2])
+                segment = Segment(start=start, end=start + float(turn[3]))
+                if segment & try_with:
+                    annotation[segment, t] = turn[7]
+            annotation = annotation.crop(try_with)
+            current_trial = {
+                'database': 'AMI',
+                'uri': uri,
+                'try_with': try_with,
+                'model_id': model_id,
+                'reference': annotation.label_timeline(speaker),
+                'annotation': annotation,
+                'annotated': Timeline(uri=uri, segments=[try_with])}
+
+        else:
+            segments = []
+            if row[4] == 'target':
+                for turn in turns[raw_uri]:
+                    if turn[7] == speaker:
+                        start = float(turn[2])
+                        segments.append(Segment(start=start,
+                                                end=start + float(turn[3])))
+            current_trial = {
+                'database': 'AMI',
+                'uri': uri,
+                'try_with': try_with,
+                'model_id': model_id,
+                'reference': Timeline(uri=uri,
+                                      segments=segments).crop(try_with)}
+
+        if site is not None and not current_trial['reference']:
+            # FEE041_m1 ==> E ==> Edinburgh, ES2003a ==> E ==> Edinburgh
+            same = model_id[1] == raw_uri[0]
+            if same != (site == 'intra'):
+                continue
+
+        yield current_trial
+
+
+def plain(items, tracks=True):
+    """Convert items to lists of comparable (plain Python) values
+
+    Set `tracks` to False to ignore track names (columnar annotations only
+    keep track order).
+    """
+
+    converted = []
+    for item in items:
+        values = {}
+        for key, value in to_pyannote(dict(item)).items():
+            if isinstance(value, Annotation):
+                value = (value.uri, [(s.start, s.end, t if tracks else None, l)
+                                     for s, t, l
+                                     in value.itertracks(yield_label=True)])
+            elif isinstance(value, Timeline):
+                value = (value.uri, [(s.start, s.end) for s in value])
+            elif isinstance(value, Segment):
+                value = (value.start, value.end)
+            values[key] = value
+        converted.append(values)
+    return converted
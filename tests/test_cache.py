@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Metadata tables cache and its warmup"""
+
+import time
+
+import numpy as np
+import pytest
+
+from AMI import AMI
+from AMI.cache import CACHE, warmup
+from AMI.turns import TABLES
+from AMI.util import DATA_DIR
+
+
+@pytest.fixture
+def cache():
+    CACHE.clear()
+    yield CACHE
+    CACHE.clear()
+
+
+def get(subset, kind):
+    source, read = TABLES[kind]
+    return CACHE.get(DATA_DIR / source.format(subset=subset), read)
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_warmup(cache, workers):
+    futures = warmup(subsets=['development'], background=False,
+                     workers=workers)
+    # dev has annotated, annotation, enrolments and trials tables
+    assert len(futures) == len(cache) == 4
+    assert cache.cache_info().misses == 4
+
+    # tables parsed in worker processes are the ones read in process
+    for kind, (source, read) in TABLES.items():
+        table = get('dev', kind)
+        expected = read(DATA_DIR / source.format(subset='dev'))
+        assert table.uris == expected.uris
+        np.testing.assert_array_equal(table.start, expected.start)
+        np.testing.assert_array_equal(table.end, expected.end)
+    assert cache.cache_info().hits == 4
+
+
+def test_background(cache):
+    warmup(subsets=['train'])
+    # tables being loaded are waited for, not read again
+    get('trn', 'annotation')
+    get('trn', 'annotated')
+    assert cache.cache_info().misses == 2
+
+
+@pytest.mark.parametrize('subsets', [['trn'], ['train', 'dev']])
+def test_unknown_subset(cache, subsets):
+    with pytest.raises(ValueError):
+        warmup(subsets=subsets, background=False)
+
+
+def test_database(cache):
+    AMI(warmup=['train'])
+    for _ in range(100):
+        if len(cache) == 2:
+            break
+        time.sleep(0.1)
+    assert len(cache) == 2
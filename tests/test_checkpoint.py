@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Resuming from a checkpoint must yield the same items as not stopping"""
+
+import json
+import itertools
+
+import pytest
+
+from AMI import AMI
+from AMI.checkpoint import Resumable
+
+from reference import plain
+
+
+# items consumed before (and compared after) the checkpoint
+BEFORE, AFTER = 1000, 200
+
+
+def get_protocol(name, task='SpeakerSpotting', diarization=True):
+    protocol = AMI().get_protocol(task, name)
+    protocol.diarization = diarization
+    return protocol
+
+
+def check(get_protocol, subset, trials, iterate, before=BEFORE):
+
+    # uninterrupted iteration
+    expected = plain(itertools.islice(iterate(get_protocol()),
+                                      before + AFTER))
+
+    # stop after `before` items
+    items = Resumable(get_protocol(), subset=subset, trials=trials)
+    before = plain(itertools.islice(items, before))
+    checkpoint = json.loads(json.dumps(items.checkpoint()))
+
+    # resume with another protocol instance
+    items = Resumable.resume(get_protocol(), checkpoint)
+    after = plain(itertools.islice(items, AFTER))
+
+    assert before + after == expected
+
+
+def test_files():
+    check(lambda: get_protocol('MixHeadset', task='SpeakerDiarization'),
+          'train', False, lambda protocol: protocol.train(), before=50)
+
+
+@pytest.mark.parametrize('subset', ['train', 'development'])
+def test_sessions(subset):
+    check(lambda: get_protocol('MixHeadset'), subset, False,
+          lambda protocol: getattr(protocol, subset)())
+
+
+@pytest.mark.parametrize('name', ['MixHeadset', 'MixHeadsetIntraSite',
+                                  'MixHeadsetInterSite'])
+@pytest.mark.parametrize('diarization', [True, False])
+def test_trials(name, diarization):
+    check(lambda: get_protocol(name, diarization=diarization),
+          'development', True,
+          lambda protocol: protocol.development_trial())
+
+
+def test_mismatch():
+    items = Resumable(get_protocol('MixHeadsetIntraSite'),
+                      subset='development', trials=True)
+    next(items)
+    checkpoint = items.checkpoint()
+
+    with pytest.raises(ValueError):
+        Resumable.resume(get_protocol('MixHeadsetInterSite'), checkpoint)
+
+    with pytest.raises(ValueError):
+        Resumable.resume(get_protocol('MixHeadsetIntraSite',
+                                      diarization=False), checkpoint)
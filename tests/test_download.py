@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Downloader against a local, range-aware, HTTP server"""
+
+import re
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from AMI.download import Downloader
+from AMI.wav import CANONICAL_HEADER_SIZE
+from AMI.wav import parse_header
+
+
+URI = 'ES2002a.Mix-Headset'
+URL_PATH = f'/amicorpus/ES2002a/audio/{URI}.wav'
+
+# 16kHz, 16-bit, mono audio
+DATA = bytes(range(256)) * 400
+
+
+def make_wav(data, chunks=b'', data_size=None, trailing=b''):
+    """RIFF/WAVE file with extra `chunks` (before and after audio data) and
+    declared `data_size`"""
+    data_size = len(data) if data_size is None else data_size
+    fmt = struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, 1, 16000, 32000, 2, 16)
+    body = b'WAVE' + fmt + chunks + struct.pack('<4sI', b'data',
+                                                data_size) + data + trailing
+    return struct.pack('<4sI', b'RIFF', len(body)) + body
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers['Range']))
+        content = self.server.files.get(self.path)
+        if content is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        start, end = 0, len(content)
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers['Range'] or '')
+        if match:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(end, int(match.group(2)) + 1)
+            self.send_response(206)
+            self.send_header('Content-Range',
+                             f'bytes {start}-{end - 1}/{len(content)}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(end - start))
+        self.end_headers()
+
+        # simulate a dropped connection after `interrupt` bytes of audio
+        interrupt = self.server.interrupt
+        if interrupt is not None and start > 0 and end - start > interrupt:
+            self.server.interrupt = None
+            self.wfile.write(content[start:start + interrupt])
+            self.close_connection = True
+            return
+
+        self.wfile.write(content[start:end])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.files, server.requests = {}, []
+    server.interrupt = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get_downloader(server, root):
+    host, port = server.server_address
+    return Downloader(root, url=f'http://{host}:{port}/', workers=2)
+
+
+def check(path):
+    with open(path, 'rb') as fp:
+        content = fp.read()
+    header = parse_header(content)
+    assert header.data_offset == CANONICAL_HEADER_SIZE
+    assert header.data_size == len(DATA)
+    assert content[CANONICAL_HEADER_SIZE:] == DATA
+
+
+LIST = struct.pack('<4sI', b'LIST', 26) + b'INFOISFT' + bytes(18)
+
+
+@pytest.mark.parametrize('chunks, data_size, trailing', [
+    (b'', None, b''),
+    # extra LIST chunk
+    (LIST, None, b''),
+    # wrong (too large) data chunk size
+    (b'', 1 << 30, b''),
+    # zero data chunk size followed by a LIST chunk
+    (b'', 0, LIST),
+    # wrong (too large) data chunk size followed by a LIST chunk
+    (b'', 1 << 30, LIST),
+])
+def test_header(server, tmp_path, chunks, data_size, trailing):
+    server.files[URL_PATH] = make_wav(DATA, chunks=chunks,
+                                      data_size=data_size, trailing=trailing)
+    downloader = get_downloader(server, tmp_path)
+    assert downloader.download(URI)
+    check(downloader.path(URI))
+    # already downloaded files are skipped
+    assert not downloader.download(URI)
+
+
+def test_resume(server, tmp_path):
+    chunks = struct.pack('<4sI', b'LIST', 4) + b'INFO'
+    content = make_wav(DATA, chunks=chunks)
+    server.files[URL_PATH] = content
+    downloader = get_downloader(server, tmp_path)
+
+    # interrupted download
+    path = downloader.path(URI)
+    path.parent.mkdir(parents=True)
+    partial = path.with_name(path.name + '.part')
+    done = 1000
+    with open(partial, 'wb') as fp:
+        fp.write(bytes(CANONICAL_HEADER_SIZE) + DATA[:done])
+
+    assert downloader.download(URI)
+    check(path)
+    assert not partial.exists()
+
+    # only missing bytes were requested
+    data_offset = parse_header(content).data_offset
+    expected = f'bytes={data_offset + done}-{len(content) - 1}'
+    assert (URL_PATH, expected) in server.requests
+
+
+def test_interrupted(server, tmp_path):
+    server.files[URL_PATH] = make_wav(DATA)
+    server.interrupt = 5000
+    downloader = get_downloader(server, tmp_path)
+
+    failed = downloader([URI])
+    assert list(failed) == [URI]
+    path = downloader.path(URI)
+    assert not path.exists()
+
+    # second run resumes where the first one stopped
+    assert not downloader([URI])
+    check(path)
+    expected = f'bytes={CANONICAL_HEADER_SIZE + 5000}-' \
+               f'{CANONICAL_HEADER_SIZE + len(DATA) - 1}'
+    assert server.requests[-1] == (URL_PATH, expected)
+
+
+def test_not_found(server, tmp_path):
+    downloader = get_downloader(server, tmp_path)
+    failed = downloader([URI])
+    assert list(failed) == [URI]
+    assert '404' in str(failed[URI])
+    assert not downloader.path(URI).exists()
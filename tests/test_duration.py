@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Header-only audio duration probe"""
+
+import wave
+
+import pytest
+
+from AMI.duration import AudioDuration
+from AMI.duration import get_uem_durations
+from AMI.util import DATA_DIR
+
+# uri → number of 16kHz samples
+SAMPLES = {'EN2001a.Mix-Headset': 16000,
+           'ES2002a.Mix-Headset': 24000,
+           'IS1000a.Mix-Headset': 8000}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    paths = {}
+    for uri, num_samples in SAMPLES.items():
+        path = tmp_path / f'{uri}.wav'
+        with wave.open(str(path), 'wb') as fp:
+            fp.setnchannels(1)
+            fp.setsampwidth(2)
+            fp.setframerate(16000)
+            fp.writeframes(bytes(2 * num_samples))
+        paths[uri] = str(path)
+    return paths
+
+
+class Finder:
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def __call__(self, current_file):
+        return self.paths[current_file['uri']]
+
+
+def test_uem_durations():
+    durations = get_uem_durations(str(DATA_DIR))
+    assert durations == get_uem_durations()
+    assert all(uri in durations for uri in SAMPLES)
+
+
+def test_batch(paths, cache_dir, monkeypatch):
+
+    saved = []
+    monkeypatch.setattr(AudioDuration, '_save',
+                        lambda self: saved.append(dict(self._cache)))
+
+    durations = AudioDuration(Finder(paths), workers=2)
+    assert durations({'uri': 'ES2002a.Mix-Headset'}) == 1.5
+
+    # every available file was probed at once, and cache written once
+    assert len(saved) == 1 and len(saved[0]) == len(SAMPLES)
+    for uri, num_samples in SAMPLES.items():
+        assert durations({'uri': uri}) == num_samples / 16000
+    assert len(saved) == 1
+
+
+def test_cache(paths, cache_dir):
+    AudioDuration(Finder(paths))({'uri': 'EN2001a.Mix-Headset'})
+
+    # cached durations are used as long as files do not change
+    with wave.open(paths['IS1000a.Mix-Headset'], 'wb') as fp:
+        fp.setnchannels(1)
+        fp.setsampwidth(2)
+        fp.setframerate(16000)
+        fp.writeframes(bytes(2 * 32000))
+    durations = AudioDuration(Finder(paths))
+    assert durations({'uri': 'EN2001a.Mix-Headset'}) == 1.
+    assert durations({'uri': 'IS1000a.Mix-Headset'}) == 2.
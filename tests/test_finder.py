@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Audio paths resolved from a single scan of the corpus"""
+
+import os
+
+import pytest
+
+from AMI.finder import AudioFinder
+
+
+URIS = ['EN2001a.Mix-Headset', 'ES2002a.Mix-Headset']
+
+
+def add_audio(root, uri):
+    audio_dir = root / uri.split('.')[0] / 'audio'
+    audio_dir.mkdir(parents=True, exist_ok=True)
+    path = audio_dir / f'{uri}.wav'
+    path.write_bytes(b'')
+    # make sure the change is visible even with coarse timestamps
+    stat = os.stat(audio_dir)
+    os.utime(audio_dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    return path
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Metadata only referencing URIS"""
+    data_dir = tmp_path / 'data'
+    (data_dir / 'speaker_diarization').mkdir(parents=True)
+    with open(data_dir / 'speaker_diarization' / 'trn.uem', 'w') as fp:
+        for uri in URIS:
+            fp.write(f'{uri.split(".")[0]} 1 0.000 60.000\n')
+    return data_dir
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / 'amicorpus'
+    for uri in URIS:
+        add_audio(root, uri)
+    return root
+
+
+def test_paths(cache_dir, root, data_dir):
+    finder = AudioFinder(root, data_dir=data_dir)
+    for uri in URIS:
+        path = root / uri.split('.')[0] / 'audio' / f'{uri}.wav'
+        assert finder({'uri': uri}) == str(path)
+
+
+def test_bundled(cache_dir, root):
+    # most bundled uris are missing from this corpus
+    with pytest.raises(FileNotFoundError):
+        AudioFinder(root)
+
+
+def test_cache_hit(cache_dir, root, data_dir, monkeypatch):
+    paths = AudioFinder(root, data_dir=data_dir).paths
+    assert (cache_dir / 'audio_paths.json').exists()
+
+    def scan(self):
+        raise AssertionError('corpus should not be scanned again')
+
+    monkeypatch.setattr(AudioFinder, '_scan', scan)
+    assert AudioFinder(root, data_dir=data_dir).paths == paths
+
+
+def test_cache_invalidated(cache_dir, root, data_dir):
+    AudioFinder(root, data_dir=data_dir)
+    # audio added to an existing meeting
+    uri = 'EN2001a.Headset-0'
+    path = add_audio(root, uri)
+    assert AudioFinder(root, data_dir=data_dir)({'uri': uri}) == str(path)
+    # audio added to a new meeting
+    uri = 'IS1000a.Mix-Headset'
+    path = add_audio(root, uri)
+    assert AudioFinder(root, data_dir=data_dir)({'uri': uri}) == str(path)
+
+
+def test_missing(cache_dir, root, data_dir):
+    os.remove(root / 'ES2002a' / 'audio' / 'ES2002a.Mix-Headset.wav')
+    with pytest.raises(FileNotFoundError, match='ES2002a'):
+        AudioFinder(root, data_dir=data_dir)
+
+    finder = AudioFinder(root, data_dir=data_dir, strict=False)
+    assert finder({'uri': 'EN2001a.Mix-Headset'})
+    with pytest.raises(FileNotFoundError):
+        finder({'uri': 'ES2002a.Mix-Headset'})
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Frame-level speaker activity must match naive rasterization"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from AMI import AMI
+
+
+STEP = 0.02
+
+# number of checked files
+NUM_FILES = 5
+
+
+def naive(annotation, labels, num_frames, step):
+    """Frame i is active for a speaker when one of its turns covers
+    (i + 0.5) x step. Also return frames too close to a turn boundary for
+    the result to be reliable."""
+    middle = (np.arange(num_frames) + 0.5) * step
+    activity = np.zeros((num_frames, len(labels)), dtype=np.uint8)
+    ambiguous = np.zeros(num_frames, dtype=bool)
+    for segment, _, label in annotation.itertracks(yield_label=True):
+        # frames whose middle is in [start, end)
+        first, last = np.searchsorted(middle, [segment.start, segment.end])
+        activity[first:last, labels.index(label)] = 1
+        for boundary in (segment.start, segment.end):
+            near = np.searchsorted(middle, [boundary - 1e-6, boundary + 1e-6])
+            ambiguous[near[0]:near[1]] = True
+    return activity, ambiguous
+
+
+@pytest.mark.parametrize('packed', [False, True])
+def test_frames(cache_dir, packed):
+    protocol = AMI().get_protocol('SpeakerDiarization', 'MixHeadset')
+    protocol.frames = STEP
+    protocol.packed_frames = packed
+
+    for current_file in itertools.islice(protocol.train(), NUM_FILES):
+        frames = current_file['frames']
+        annotation = current_file['annotation']
+        assert sorted(frames.labels) == sorted(annotation.labels())
+        num_frames = int(np.ceil(current_file['annotated'].extent().end /
+                                 STEP))
+        assert len(frames) == num_frames
+
+        expected, ambiguous = naive(annotation, frames.labels, num_frames,
+                                    STEP)
+        np.testing.assert_array_equal(frames.data[~ambiguous],
+                                      expected[~ambiguous])
+        np.testing.assert_array_equal(frames.count()[~ambiguous],
+                                      expected.sum(axis=1)[~ambiguous])
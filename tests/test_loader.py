@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Batches of the streaming loader"""
+
+import wave
+
+import numpy as np
+import pytest
+
+from AMI import AMI
+from AMI.loader import BatchLoader
+
+
+# low sample rate keeps the fake audio file small
+SAMPLE_RATE = 10
+
+# longer than any AMI meeting
+DURATION = 6000
+
+
+@pytest.fixture(scope='module')
+def protocol(tmp_path_factory):
+    """MixHeadset protocol where every file points to the same random audio"""
+    path = tmp_path_factory.mktemp('audio') / 'random.wav'
+    samples = np.random.RandomState(0).randint(
+        -32768, 32768, size=DURATION * SAMPLE_RATE).astype('<i2')
+    with wave.open(str(path), 'wb') as fp:
+        fp.setnchannels(1)
+        fp.setsampwidth(2)
+        fp.setframerate(SAMPLE_RATE)
+        fp.writeframes(samples.tobytes())
+    database = AMI(preprocessors={'audio': lambda _: str(path)})
+    return database.get_protocol('SpeakerDiarization', 'MixHeadset')
+
+
+def batches(protocol, workers, num_batches=5):
+    loader = BatchLoader(protocol, batch_size=8, sample_rate=SAMPLE_RATE,
+                         seed=42, workers=workers, prefetch=2,
+                         num_batches=num_batches)
+    return [(audio.copy(), labels.copy()) for audio, labels in loader]
+
+
+def test_workers(protocol):
+    expected = batches(protocol, 0)
+    assert len(expected) == 5
+
+    # batches are not trivially identical
+    audio = np.stack([audio for audio, _ in expected])
+    assert np.all(np.any(audio != 0, axis=-1))
+    assert len(np.unique(audio.reshape(-1, audio.shape[-1]), axis=0)) > 1
+    assert any(labels.any() for _, labels in expected)
+
+    for workers in (1, 3):
+        actual = batches(protocol, workers)
+        assert len(actual) == len(expected)
+        for (audio, labels), (expected_audio, expected_labels) in zip(
+                actual, expected):
+            np.testing.assert_array_equal(audio, expected_audio)
+            np.testing.assert_array_equal(labels, expected_labels)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Metadata must describe the items that are iterated over"""
+
+import itertools
+
+import pytest
+
+from AMI import AMI
+
+
+# number of compared sessions and trials
+MAX_ITEMS = 300
+
+
+def describe(items, annotated='annotated'):
+    """Get (uri, annotated, speech, speakers) of items"""
+    for item in items:
+        annotation = item['annotation']
+        if annotated == 'annotated':
+            duration = item['annotated'].duration()
+        else:
+            duration = item[annotated].duration
+        yield (item['uri'], duration,
+               annotation.get_timeline().support().duration(),
+               len(annotation.labels()))
+
+
+def check(metadata, items, annotated='annotated', n=None):
+    expected = list(describe(itertools.islice(items, n),
+                             annotated=annotated))
+    rows = [(row['uri'], row['annotated'], row['speech'], row['speakers'])
+            for row in itertools.islice(metadata, n)]
+    assert len(rows) == len(expected)
+    for row, (uri, duration, speech, speakers) in zip(rows, expected):
+        assert row == (uri, pytest.approx(duration), pytest.approx(speech),
+                       speakers)
+
+
+@pytest.mark.parametrize('subset', ['train', 'development', 'test'])
+def test_files(subset):
+    protocol = AMI().get_protocol('SpeakerDiarization', 'MixHeadset')
+    check(protocol.metadata(subset), getattr(protocol, subset)())
+
+
+@pytest.mark.parametrize('subset', ['train', 'development', 'test'])
+def test_sessions(subset):
+    protocol = AMI().get_protocol('SpeakerSpotting', 'MixHeadset')
+    metadata = protocol.metadata(subset)
+    assert len(metadata) == protocol._num_items(subset)
+    check(metadata, getattr(protocol, subset)(), n=MAX_ITEMS)
+
+
+@pytest.mark.parametrize('name', ['MixHeadset', 'MixHeadsetIntraSite',
+                                  'MixHeadsetInterSite'])
+def test_trials(name):
+    protocol = AMI().get_protocol('SpeakerSpotting', name)
+    # count all trials (columnar trials without diarization are the
+    # fastest to build)
+    protocol.columnar, protocol.diarization = True, False
+    assert len(protocol.metadata('development', trials=True)) == \
+        sum(1 for _ in protocol.development_trial())
+
+    protocol.columnar, protocol.diarization = False, True
+    check(protocol.metadata('development', trials=True),
+          protocol.development_trial(), annotated='try_with', n=MAX_ITEMS)
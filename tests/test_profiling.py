@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Stages reported by the protocol profiler"""
+
+from collections import Counter
+
+import pytest
+
+from AMI import AMI
+from AMI.profiling import Profiler
+from AMI.profiling import profile
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+def test_counts(lazy):
+    protocol = AMI().get_protocol('SpeakerDiarization', 'MixHeadset')
+    protocol.lazy = lazy
+
+    calls = Counter()
+    durations = Counter()
+
+    def callback(stage, duration):
+        calls[stage] += 1
+        durations[stage] += duration
+
+    with profile(protocol, callback=callback) as profiler:
+        num_files = 0
+        for current_file in protocol.development():
+            current_file['annotation'], current_file['annotated']
+            num_files += 1
+
+    # profiler is detached on exit
+    assert getattr(protocol, 'profiler', None) is None
+
+    # one annotation and one timeline per file
+    assert profiler.counts['annotation'] == num_files
+    assert profiler.counts['timeline'] == num_files
+    assert profiler.counts['read_table'] > 0
+
+    # every reported stage is counted, once per call
+    assert dict(profiler.counts) == dict(calls)
+    assert set(profiler.durations) == set(calls)
+    for stage, duration in durations.items():
+        assert profiler.durations[stage] == pytest.approx(duration)
+
+    report = str(profiler).splitlines()
+    assert len(report) == len(calls)
+    for line in report:
+        stage, _, count, _ = line.split()
+        assert int(count) == calls[stage]
+
+
+def test_reset():
+    profiler = Profiler()
+    with profiler.stage('crop'):
+        pass
+    with profiler.stage('crop'):
+        pass
+    assert profiler.counts == {'crop': 2}
+    assert profiler.durations['crop'] >= 0.
+    profiler.reset()
+    assert not profiler.counts and not profiler.durations
+    assert str(profiler) == ''
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Optimized iteration modes must yield the same items as the reference"""
+
+import shutil
+import pickle
+import itertools
+from functools import lru_cache
+
+import pytest
+
+from AMI import AMI
+from AMI.lazy import LazyFile
+from AMI.util import DATA_DIR
+
+import reference
+from reference import plain
+
+
+# number of compared sessions and trials (per subset)
+MAX_ITEMS = 300
+
+SUBSETS = {'train': 'trn', 'development': 'dev', 'test': 'tst'}
+
+@lru_cache(maxsize=None)
+def shared():
+    # tables are published once (and released at exit)
+    from AMI.shared import publish
+    return publish()
+
+
+# protocol attributes of tested iteration modes (callables are called to get
+# attribute values)
+VARIANTS = {
+    'default': {},
+    'text': {'snapshot': False},
+    'columnar': {'columnar': True},
+    'shared': {'snapshot': False, 'shared': shared},
+    'workers': {'snapshot': False, 'workers': 2},
+    'eager': {'snapshot': False, 'lazy': False},
+}
+
+
+def get_protocol(name, variant, task='SpeakerSpotting', **attributes):
+    protocol = AMI().get_protocol(task, name)
+    for attribute, value in dict(VARIANTS[variant], **attributes).items():
+        setattr(protocol, attribute, value() if callable(value) else value)
+    return protocol
+
+
+@pytest.fixture(params=list(VARIANTS))
+def variant(request):
+    return request.param
+
+
+@pytest.fixture
+def compare(variant):
+    """Compare (the first `n`) items with the reference"""
+    # columnar annotations do not keep track names
+    tracks = not VARIANTS[variant].get('columnar', False)
+
+    def compare(items, expected, n=None):
+        items, expected = itertools.islice(items, n), \
+            itertools.islice(expected, n)
+        return plain(items, tracks=tracks) == plain(expected, tracks=tracks)
+
+    return compare
+
+
+@pytest.mark.parametrize('subset', list(SUBSETS))
+def test_files(variant, compare, subset):
+    protocol = get_protocol('MixHeadset', variant, task='SpeakerDiarization')
+    assert compare(getattr(protocol, subset)(),
+                   reference.files(DATA_DIR, SUBSETS[subset]))
+
+
+@pytest.mark.parametrize('subset', list(SUBSETS))
+def test_sessions(variant, compare, subset):
+    protocol = get_protocol('MixHeadset', variant)
+    assert compare(getattr(protocol, subset)(),
+                   reference.sessions(DATA_DIR, SUBSETS[subset]),
+                   n=MAX_ITEMS)
+
+
+@pytest.mark.parametrize('subset', ['development', 'test'])
+def test_enrolments(variant, compare, subset):
+    protocol = get_protocol('MixHeadset', variant)
+    assert compare(getattr(protocol, f'{subset}_enrolment')(),
+                   reference.enrolments(DATA_DIR, SUBSETS[subset]))
+
+
+@pytest.mark.parametrize('name, site', [('MixHeadset', None),
+                                        ('MixHeadsetIntraSite', 'intra'),
+                                        ('MixHeadsetInterSite', 'inter')])
+@pytest.mark.parametrize('diarization', [True, False])
+def test_trials(variant, compare, name, site, diarization):
+    protocol = get_protocol(name, variant, diarization=diarization)
+    assert compare(protocol.development_trial(),
+                   reference.trials(DATA_DIR, 'dev', site=site,
+                                    diarization=diarization),
+                   n=MAX_ITEMS)
+
+
+@pytest.mark.parametrize('variant', ['default', 'text'])
+@pytest.mark.parametrize('task', ['SpeakerDiarization', 'SpeakerSpotting'])
+def test_lazy(task, variant):
+    protocol = get_protocol('MixHeadset', variant, task=task)
+    current_file = next(protocol.train())
+    assert isinstance(current_file, LazyFile)
+    assert current_file.is_lazy('annotation')
+    # lazy files pickle to (and compare equal with) plain dictionaries
+    unpickled = pickle.loads(pickle.dumps(current_file))
+    assert type(unpickled) is dict
+    assert plain([unpickled]) == plain([current_file])
+    assert not current_file.is_lazy('annotation')
+
+
+def test_snapshot_key(monkeypatch):
+    import AMI as package
+    from AMI import snapshot
+
+    key = snapshot.get_key(DATA_DIR, 'dev', 'files')
+    # snapshots built by another version of the package are outdated
+    monkeypatch.setattr(package, '__version__', 'other', raising=False)
+    monkeypatch.setattr(snapshot, '_KEYS', {})
+    assert snapshot.get_key(DATA_DIR, 'dev', 'files') != key
+
+
+def test_non_target(variant, compare, tmp_path):
+    # non-target trials whose model speaker does speak during the trial
+    # (there are none in AMI) must have an empty reference as well
+    shutil.copytree(DATA_DIR / 'speaker_diarization',
+                    tmp_path / 'speaker_diarization')
+    (tmp_path / 'speaker_spotting').mkdir()
+    lines = (DATA_DIR / 'speaker_spotting' / 'dev.trial.txt').read_text()
+    lines = [line.replace(' target ', ' nontarget ')
+             for line in lines.splitlines(keepends=True)
+             if ' target ' in line]
+    (tmp_path / 'speaker_spotting' / 'dev.trial.txt').write_text(
+        ''.join(lines[:MAX_ITEMS]))
+
+    protocol = get_protocol('MixHeadset', variant, diarization=False,
+                            data_dir=tmp_path)
+    expected = list(reference.trials(tmp_path, 'dev', diarization=False))
+    assert not any(current_trial['reference'] for current_trial in expected)
+    assert compare(protocol.development_trial(), expected)
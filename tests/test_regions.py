@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Overlap regions and change points must match pyannote.core"""
+
+import numpy as np
+import pytest
+from pyannote.core.segment import SEGMENT_PRECISION
+
+from AMI import AMI
+from AMI.util import DATA_DIR
+
+import reference
+
+
+SUBSETS = {'train': 'trn', 'development': 'dev', 'test': 'tst'}
+
+
+@pytest.mark.parametrize('subset', list(SUBSETS))
+def test_regions(cache_dir, subset):
+    protocol = AMI().get_protocol('SpeakerDiarization', 'MixHeadset')
+    protocol.regions = True
+
+    expected = reference.files(DATA_DIR, SUBSETS[subset])
+    for current_file, expected in zip(getattr(protocol, subset)(), expected):
+        annotation = expected['annotation']
+
+        overlap = np.array([[s.start, s.end]
+                            for s in annotation.get_overlap()]).reshape(-1, 2)
+        actual = np.array([[s.start, s.end]
+                           for s in current_file['overlap']]).reshape(-1, 2)
+        assert actual.shape == overlap.shape, current_file['uri']
+        np.testing.assert_allclose(actual, overlap, atol=SEGMENT_PRECISION)
+
+        change = np.unique([t for s in annotation.itersegments()
+                            for t in (s.start, s.end)])
+        np.testing.assert_array_equal(current_file['change'], change)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Chunks and speaker segments drawn by samplers"""
+
+import numpy as np
+import pytest
+from pyannote.core import Segment
+from pyannote.core.segment import SEGMENT_PRECISION
+
+from AMI import AMI
+from AMI.samplers import ChunkSampler
+from AMI.samplers import SpeakerSampler
+
+
+DURATION = 2.
+
+# number of drawn chunks
+NUM_CHUNKS = 20000
+
+
+def turns(annotation):
+    return sorted((segment.start, segment.end, label) for segment, _, label
+                  in annotation.itertracks(yield_label=True))
+
+
+@pytest.fixture(scope='module')
+def files():
+    protocol = AMI().get_protocol('SpeakerDiarization', 'MixHeadset')
+    return {current_file['uri']: dict(current_file)
+            for current_file in protocol.train()}
+
+
+def test_chunks(files):
+    protocol = AMI().get_protocol('SpeakerDiarization', 'MixHeadset')
+    sampler = ChunkSampler(protocol, duration=DURATION, seed=42)
+    uri, start, end = sampler.sample(NUM_CHUNKS)
+    np.testing.assert_allclose(end - start, DURATION)
+
+    # concatenate the parts of annotated segments where a chunk may start
+    offsets, total = {}, 0.
+    for current_uri, current_file in files.items():
+        for segment in current_file['annotated']:
+            room = segment.duration - DURATION
+            if room > 0:
+                offsets[current_uri, segment] = total
+                total += room
+
+    position = np.zeros(NUM_CHUNKS)
+    for c, (u, s, e) in enumerate(zip(uri.tolist(), start.tolist(),
+                                      end.tolist())):
+        # chunks fall inside annotated segments
+        current_uri = sampler.uris[u]
+        chunk = Segment(s, e)
+        segment = next(segment
+                       for segment in files[current_uri]['annotated']
+                       if (current_uri, segment) in offsets and
+                       segment.start - SEGMENT_PRECISION <= chunk.start and
+                       chunk.end <= segment.end + SEGMENT_PRECISION)
+        position[c] = offsets[current_uri, segment] + s - segment.start
+
+    # ... uniformly (Kolmogorov-Smirnov statistic)
+    position = np.sort(position) / total
+    cdf = np.arange(1, NUM_CHUNKS + 1) / NUM_CHUNKS
+    assert np.max(np.abs(cdf - position)) < 1.63 / np.sqrt(NUM_CHUNKS)
+
+    # chunk labels are speech turns cropped to the chunk
+    for u, s, e in zip(uri[:20].tolist(), start[:20].tolist(),
+                       end[:20].tolist()):
+        current_uri = sampler.uris[u]
+        expected = files[current_uri]['annotation'].crop(Segment(s, e))
+        actual = sampler.labels(u, s, e).to_annotation()
+        assert turns(actual) == turns(expected)
+
+
+@pytest.mark.parametrize('duration', [None, DURATION])
+def test_exclude_overlap(cache_dir, files, duration):
+    protocol = AMI().get_protocol('SpeakerDiarization', 'MixHeadset')
+    sampler = SpeakerSampler(protocol, num_speakers=8, per_speaker=4,
+                             duration=duration, exclude_overlap=True,
+                             seed=42)
+
+    for _ in range(50):
+        for label, uri, start, end in zip(*sampler.sample()):
+            annotation = files[sampler.uris[uri]]['annotation']
+            segment = Segment(float(start), float(end))
+            cropped = annotation.crop(segment)
+            # segments only contain speech of the sampled speaker (i.e. no
+            # overlapped speech)...
+            assert cropped.labels() == [sampler.labels[label]]
+            # ... all along
+            assert cropped.get_timeline().support().duration() == \
+                pytest.approx(segment.duration)
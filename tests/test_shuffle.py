@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Shuffled iteration must yield the same items as plain iteration"""
+
+import numpy as np
+import pytest
+
+from AMI import AMI
+from AMI.shuffle import Shuffle
+
+from reference import plain
+
+
+def get_protocol(task, **attributes):
+    protocol = AMI().get_protocol(task, 'MixHeadset')
+    for attribute, value in attributes.items():
+        setattr(protocol, attribute, value)
+    return protocol
+
+
+@pytest.mark.parametrize('task', ['SpeakerDiarization', 'SpeakerSpotting'])
+@pytest.mark.parametrize('subset', ['train', 'development', 'test'])
+@pytest.mark.parametrize('attributes', [{}, {'lazy': False},
+                                        {'columnar': True}],
+                         ids=['default', 'eager', 'columnar'])
+def test_shuffle(task, subset, attributes):
+    protocol = get_protocol(task, **attributes)
+    expected = plain(getattr(protocol, subset)())
+
+    items = Shuffle(get_protocol(task, **attributes), subset=subset, seed=7)
+    items.set_epoch(3)
+    indices = items.indices()
+    assert sorted(indices.tolist()) == list(range(len(expected)))
+    assert plain(items) == [expected[index] for index in indices.tolist()]
+
+
+def test_shards():
+    protocol = get_protocol('SpeakerSpotting')
+    shards = [Shuffle(protocol, seed=7, rank=rank, num_shards=3)
+              for rank in range(3)]
+    indices = np.concatenate([shard.indices() for shard in shards])
+    assert sorted(indices.tolist()) == list(range(shards[0]._length))
+    assert sum(len(shard) for shard in shards) == len(indices)
+
+    # permutations only depend on seed and epoch
+    other = Shuffle(get_protocol('SpeakerSpotting'), seed=7, rank=1,
+                    num_shards=3)
+    assert other.indices().tolist() == shards[1].indices().tolist()
+    other.set_epoch(1)
+    assert other.indices().tolist() != shards[1].indices().tolist()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Protocols pointed at synthetic metadata"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from AMI import AMI
+
+
+ROOT = Path(__file__).parent.parent
+
+SUBSETS = ('train', 'development', 'test')
+
+SPEAKER_SPOTTING = ('MixHeadset', 'MixHeadsetInterSite',
+                    'MixHeadsetIntraSite')
+
+
+@pytest.fixture(scope='module')
+def data_dir(tmp_path_factory):
+    output = tmp_path_factory.mktemp('synthetic')
+    subprocess.run([sys.executable, '-m', 'AMI.synthetic', '--scale=0.1',
+                    '--seed=1', str(output)], cwd=ROOT, check=True)
+    return output
+
+
+def uris(data_dir, subset):
+    with open(data_dir / 'speaker_diarization' / f'{subset}.uem') as fp:
+        return sorted(f'{line.split()[0]}.Mix-Headset' for line in fp)
+
+
+def get_protocol(task, name, data_dir, snapshot):
+    protocol = AMI().get_protocol(task, name)
+    protocol.data_dir = data_dir
+    protocol.snapshot = snapshot
+    return protocol
+
+
+@pytest.mark.parametrize('snapshot', [True, False])
+def test_speaker_diarization(data_dir, snapshot, cache_dir):
+    protocol = get_protocol('SpeakerDiarization', 'MixHeadset', data_dir,
+                            snapshot)
+    for subset, short in zip(SUBSETS, ('trn', 'dev', 'tst')):
+        files = [dict(current_file)
+                 for current_file in getattr(protocol, subset)()]
+        assert sorted(f['uri'] for f in files) == uris(data_dir, short)
+        for current_file in files:
+            annotated = current_file['annotated']
+            assert annotated
+            assert current_file['annotation']
+            assert current_file['annotation'].get_timeline().extent() \
+                in annotated.extent()
+
+
+@pytest.mark.parametrize('snapshot', [True, False])
+@pytest.mark.parametrize('name', SPEAKER_SPOTTING)
+def test_speaker_spotting(data_dir, name, snapshot, cache_dir):
+    protocol = get_protocol('SpeakerSpotting', name, data_dir, snapshot)
+    for subset in SUBSETS:
+        for current_file in getattr(protocol, subset)():
+            dict(current_file)
+
+    for subset, short in zip(SUBSETS[1:], ('dev', 'tst')):
+        models = set()
+        for current_enrolment in getattr(protocol, f'{subset}_enrolment')():
+            current_enrolment = dict(current_enrolment)
+            assert current_enrolment['enrol_with']
+            models.add(current_enrolment['model_id'])
+
+        num_trials, session_uris = 0, set(uris(data_dir, short))
+        for current_trial in getattr(protocol, f'{subset}_trial')():
+            current_trial = dict(current_trial)
+            assert current_trial['model_id'] in models
+            assert current_trial['uri'] in session_uris
+            num_trials += 1
+        assert num_trials > 0
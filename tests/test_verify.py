@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+
+
+"""Manifest-based corpus verification"""
+
+import json
+import os
+
+from AMI.verify import ChecksumCache
+from AMI.verify import load_manifest
+from AMI.verify import save_manifest
+from AMI.verify import verify
+
+URIS = ['EN2001a.Mix-Headset', 'ES2002a.Mix-Headset', 'IS1000a.Mix-Headset']
+
+
+def make_corpus(root):
+    paths = {}
+    for u, uri in enumerate(URIS):
+        path = root / uri.split('.')[0] / 'audio' / f'{uri}.wav'
+        path.parent.mkdir(parents=True)
+        path.write_bytes(bytes([u]) * (1000 + u))
+        paths[uri] = str(path)
+    return paths
+
+
+def hashed(cache_dir):
+    with open(cache_dir / 'checksums.json', 'r') as fp:
+        return set(json.load(fp))
+
+
+def test_manifest(tmp_path, cache_dir):
+    paths = make_corpus(tmp_path / 'amicorpus')
+    manifest = tmp_path / 'manifest.txt'
+    save_manifest(ChecksumCache(workers=1)(paths), manifest)
+
+    entries = load_manifest(manifest)
+    assert sorted(entries) == URIS
+    assert entries[URIS[1]][0] == 1001
+
+    assert verify(paths, manifest, workers=1) == ([], [])
+
+
+def test_corrupted(tmp_path, cache_dir):
+    paths = make_corpus(tmp_path / 'amicorpus')
+    manifest = tmp_path / 'manifest.txt'
+    save_manifest(ChecksumCache(workers=1)(paths), manifest)
+    os.remove(cache_dir / 'checksums.json')
+
+    # wrong size: detected without hashing
+    with open(paths[URIS[0]], 'ab') as fp:
+        fp.write(b'\x00')
+    # same size, different content: detected by hashing
+    with open(paths[URIS[1]], 'r+b') as fp:
+        fp.write(b'\xff')
+
+    missing, corrupted = verify(paths, manifest, workers=1)
+    assert missing == []
+    assert corrupted == URIS[:2]
+    assert hashed(cache_dir) == {os.path.abspath(paths[uri])
+                                 for uri in URIS[1:]}
+
+
+def test_missing(tmp_path, cache_dir):
+    paths = make_corpus(tmp_path / 'amicorpus')
+    manifest = tmp_path / 'manifest.txt'
+    save_manifest(ChecksumCache(workers=1)(paths), manifest)
+
+    del paths[URIS[2]]
+    assert verify(paths, manifest, workers=1) == ([URIS[2]], [])
+
+
+def test_cached(tmp_path, cache_dir):
+    paths = make_corpus(tmp_path / 'amicorpus')
+    checksums = ChecksumCache(workers=1)(paths)
+
+    # unchanged files are not hashed again
+    with open(cache_dir / 'checksums.json', 'r') as fp:
+        cached = json.load(fp)
+    path = os.path.abspath(paths[URIS[0]])
+    cached[path][2] = 'cached'
+    with open(cache_dir / 'checksums.json', 'w') as fp:
+        json.dump(cached, fp)
+    assert ChecksumCache(workers=1)(paths)[URIS[0]] == \
+        (checksums[URIS[0]][0], 'cached')
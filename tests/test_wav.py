@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# The MIT License (MIT)
+
+# Copyright (c) 2019 CNRS
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# AUTHORS
+# Hervé BREDIN - http://herve.niderb.fr
+
+"""Actual audio data size and header repair on crafted wav files"""
+
+import struct
+
+import pytest
+
+from AMI.wav import parse_header
+from AMI.wav import read_data_size
+from AMI.repair import repair
+
+
+LIST = struct.pack('<4sI', b'LIST', 26) + b'INFOISFT' + bytes(18)
+
+
+def make_wav(data, data_size=None, riff_size=None, trailing=b'',
+             sample_width=2):
+    """Mono RIFF/WAVE file with declared `data_size` and `riff_size`"""
+    data_size = len(data) if data_size is None else data_size
+    fmt = struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, 1, 16000,
+                      16000 * sample_width, sample_width, 8 * sample_width)
+    pad = bytes(len(data) % 2) if trailing else b''
+    body = b'WAVE' + fmt + struct.pack('<4sI', b'data', data_size) + \
+        data + pad + trailing
+    riff_size = len(body) if riff_size is None else riff_size
+    return struct.pack('<4sI', b'RIFF', riff_size) + body
+
+
+# 1000 frames of 16-bit audio. it contains "LIST" on purpose: it must not
+# be mistaken for a trailing chunk.
+DATA = (b'LIST' + bytes(range(256)) * 8)[:2000]
+
+# 999 frames of 8-bit audio
+ODD = DATA[:999]
+
+ID3 = struct.pack('<4sI', b'id3 ', 3) + b'ID3\x00'
+
+
+@pytest.mark.parametrize('data, sample_width, data_size, trailing', [
+    (DATA, 2, 0, b''),
+    (DATA, 2, 0, LIST),
+    (DATA, 2, 1 << 30, b''),
+    (DATA, 2, 1 << 30, LIST),
+    (DATA, 2, 0, LIST + ID3),
+    (ODD, 1, 0, b''),
+    (ODD, 1, 1 << 30, b''),
+    (ODD, 1, None, LIST),
+], ids=['zero', 'zero-trailing', 'oversize', 'oversize-trailing',
+        'zero-two-trailing', 'odd-zero', 'odd-oversize', 'odd-trailing'])
+def test_data_size(tmp_path, data, sample_width, data_size, trailing):
+    path = tmp_path / 'file.wav'
+    path.write_bytes(make_wav(data, data_size=data_size, trailing=trailing,
+                              sample_width=sample_width))
+    _, actual = read_data_size(path)
+    assert actual == len(data)
+
+
+def test_truncated(tmp_path):
+    # incomplete last frame is dropped
+    path = tmp_path / 'file.wav'
+    path.write_bytes(make_wav(DATA[:1999], data_size=2000))
+    assert read_data_size(path)[1] == 1998
+
+
+@pytest.mark.parametrize('data, sample_width, trailing', [
+    (DATA, 2, b''),
+    (DATA, 2, LIST),
+    (ODD, 1, b''),
+], ids=['even', 'trailing', 'odd'])
+@pytest.mark.parametrize('data_size, riff_size', [
+    (0, None),
+    (1 << 30, None),
+    (0, 0),
+    (None, 36),
+], ids=['zero', 'oversize', 'zero-riff', 'wrong-riff'])
+def test_repair(tmp_path, data, sample_width, trailing, data_size,
+                riff_size):
+    expected = make_wav(data, trailing=trailing, sample_width=sample_width)
+    if len(data) % 2:
+        # RIFF chunk covers the (missing) pad byte
+        expected = expected[:4] + struct.pack('<I', len(expected) - 7) + \
+            expected[8:]
+    path = tmp_path / 'file.wav'
+    content = make_wav(data, data_size=data_size, riff_size=riff_size,
+                       trailing=trailing, sample_width=sample_width)
+    path.write_bytes(content)
+
+    # dry-run leaves file untouched
+    assert repair(path, dry_run=True)
+    assert path.read_bytes() == content
+
+    assert repair(path)
+    assert path.read_bytes() == expected
+    assert parse_header(expected).data_size == len(data)
+
+    # well-formed files are left alone
+    assert not repair(path)
+    assert path.read_bytes() == expected
+
+
+def test_well_formed(tmp_path):
+    # odd-sized "data" chunk followed by its pad byte and a trailing chunk
+    content = make_wav(ODD, trailing=LIST, sample_width=1)
+    path = tmp_path / 'file.wav'
+    path.write_bytes(content)
+    assert not repair(path)
+    assert path.read_bytes() == content